@@ -0,0 +1,322 @@
+"""
+Local dashboard API server.
+
+Serves the dashboard's aggregated series as JSON and rendered charts as
+PNG from the rollup tables maintained by rollups.py.
+
+- Responses are cached per panel and keyed by the rollup version
+  counter, so a panel is recomputed only after its rollup changes
+- ETag / If-None-Match lets repeat views skip the body entirely
+- A background thread folds new metric rows into the rollups;
+  request handlers never read the metric stores
+
+Endpoints:
+    GET /api/versions
+    GET /api/<panel>            panel in PANELS
+    GET /charts/<panel>.png
+
+`?points=N` sets the resolution of the performance and group recall
+series (LTTB + min/max envelopes, see downsampling.py); it is clamped
+to [MIN_POINTS, MAX_POINTS] and a non-integer value is a 400. Query
+parameters a panel does not use are ignored, and the response cache
+keeps at most CACHE_ENTRIES responses (least recently used first out).
+"""
+
+import matplotlib
+matplotlib.use("Agg")
+
+import argparse
+import io
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+import visualize_bias
+import visualize_drift_severity
+import visualize_feature_drift
+import visualize_performance
+from downsampling import DEFAULT_POINTS, downsample_frame, envelopes
+from rollups import SEVERITY_LEVELS, SEVERITY_MAP, load_rollup, rollup_versions, sort_batches, update_rollups
+
+# Configuration
+HOST = "127.0.0.1"
+PORT = 8050
+REFRESH_SECONDS = 5
+MIN_POINTS = 3  # LTTB keeps every point below 3
+MAX_POINTS = 5000
+CACHE_ENTRIES = 256
+
+
+class BadRequest(ValueError):
+    """
+    Invalid query parameter (answered with 400).
+    """
+
+
+def drift_severity_series(query: dict) -> dict:
+    df = load_rollup("severity_counts")
+    return {"batches": df["batch"].tolist(), **{level: df[level].tolist() for level in SEVERITY_LEVELS}}
+
+
+def feature_drift_series(query: dict) -> dict:
+    df = load_rollup("feature_severity")
+    df["severity_num"] = df["drift_level"].map(SEVERITY_MAP)
+    matrix = df.pivot(index="feature", columns="batch", values="severity_num")
+    batches = sort_batches(df.drop_duplicates("batch"))["batch"].tolist()
+    matrix = matrix[batches].astype(float)
+
+    return {
+        "features": matrix.index.tolist(),
+        "batches": batches,
+        "severity": np.where(matrix.isna(), None, matrix).tolist(),
+    }
+
+
+def _points(query: dict) -> int:
+    return query.get("points", DEFAULT_POINTS)
+
+
+def _downsampled_series(df, columns: list, points: int) -> dict:
+    """
+    LTTB points of metric columns on a shared batch axis plus
+    their min/max envelopes.
+    """
+    df = df.reset_index(drop=True)
+    sampled = downsample_frame(df, columns, points)
+    return {
+        "total_batches": len(df),
+        "batches": sampled["batch"].tolist(),
+        "position": sampled["position"].tolist(),
+        **{column: np.where(sampled[column].isna(), None, sampled[column]).tolist() for column in columns},
+        "envelope": envelopes(df, columns, points) if len(sampled) < len(df) else {},
+    }
+
+
+def performance_series(query: dict) -> dict:
+    df = sort_batches(load_rollup("performance_trend"))
+    return _downsampled_series(df, ["precision", "recall", "roc_auc"], _points(query))
+
+
+def group_recall_series(query: dict) -> dict:
+    df = load_rollup("group_recall")
+    if "feature" in query:
+        df = df[df["feature"] == query["feature"]]
+
+    series = {}
+    for feature, feature_df in df.groupby("feature", sort=False):
+        recall = sort_batches(
+            feature_df.pivot(index="batch", columns="group", values="recall").reset_index()
+        )
+        groups = [column for column in recall.columns if column != "batch"]
+        series[feature] = _downsampled_series(recall, groups, _points(query))
+    return series
+
+
+# Panel -> (rollup it depends on, JSON series, chart renderer)
+PANELS = {
+    "drift_severity": ("severity_counts", drift_severity_series, visualize_drift_severity.render),
+    "feature_drift": ("feature_severity", feature_drift_series, visualize_feature_drift.render),
+    "performance": ("performance_trend", performance_series, visualize_performance.render),
+    "group_recall": ("group_recall", group_recall_series, visualize_bias.render),
+}
+
+# Query parameters each panel uses
+PANEL_PARAMETERS = {
+    "drift_severity": [],
+    "feature_drift": [],
+    "performance": ["points"],
+    "group_recall": ["points", "feature"],
+}
+
+
+def normalize_query(panel: str, query: dict) -> dict:
+    """
+    The panel's own parameters, validated; `points` becomes a clamped int.
+    """
+    query = {key: value for key, value in query.items() if key in PANEL_PARAMETERS[panel]}
+
+    if "points" in query:
+        try:
+            points = int(query["points"])
+        except ValueError:
+            raise BadRequest(f"points must be an integer, got {query['points']!r}") from None
+        query["points"] = min(max(points, MIN_POINTS), MAX_POINTS)
+
+    return query
+
+
+class ResponseCache:
+    """
+    Rendered responses keyed by (panel, kind, query) and tagged with the
+    rollup version they were built from.
+    """
+
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self.versions = {}
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        # pyplot keeps global state: one chart render at a time
+        self.render_lock = threading.Lock()
+        self.key_locks = {}
+
+    def refresh(self):
+        """
+        Fold new metric rows into the rollups and pick up version counters.
+        """
+        update_rollups()
+        versions = rollup_versions()
+        with self.lock:
+            self.versions = versions
+
+    def get(self, panel: str, kind: str, query: dict):
+        """
+        Return (etag, body) for a panel, rebuilding it only when
+        its rollup version has changed. `query` is normalized
+        (normalize_query).
+        """
+        rollup, build_series, render = PANELS[panel]
+        cache_key = (panel, kind, tuple(sorted(query.items())))
+
+        with self.lock:
+            version = self.versions.get(rollup, 0)
+            entry = self.entries.get(cache_key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(cache_key)
+                return entry[1], entry[2]
+            if len(self.key_locks) > 2 * self.max_entries:
+                # Drop locks of queries that never made it into the cache
+                self.key_locks = {key: lock for key, lock in self.key_locks.items() if key in self.entries}
+            key_lock = self.key_locks.setdefault(cache_key, threading.Lock())
+
+        # Concurrent viewers of a stale panel wait for a single rebuild
+        with key_lock:
+            with self.lock:
+                entry = self.entries.get(cache_key)
+            if entry is not None and entry[0] == version:
+                return entry[1], entry[2]
+
+            if kind == "json":
+                body = json.dumps(build_series(query)).encode()
+            else:
+                buffer = io.BytesIO()
+                options = {}
+                if panel in ("performance", "group_recall"):
+                    options["points"] = _points(query)
+                if panel == "group_recall" and "feature" in query:
+                    options["feature"] = query["feature"]
+
+                with self.render_lock:
+                    render(buffer, **options)
+                body = buffer.getvalue()
+
+            etag = f'"{panel}-{kind}-{version}-{zlib.crc32(repr(cache_key[2]).encode()):08x}"'
+            with self.lock:
+                self.entries[cache_key] = (version, etag, body)
+                self.entries.move_to_end(cache_key)
+                while len(self.entries) > self.max_entries:
+                    evicted, _ = self.entries.popitem(last=False)
+                    self.key_locks.pop(evicted, None)
+
+            return etag, body
+
+
+CACHE = ResponseCache()
+
+
+class DashboardHandler(BaseHTTPRequestHandler):
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/json", etag: str = None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if status != 304:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+
+        if parts == ["api", "versions"]:
+            with CACHE.lock:
+                versions = dict(CACHE.versions)
+            self._send(200, json.dumps(versions).encode())
+            return
+
+        if len(parts) != 2 or parts[0] not in ("api", "charts"):
+            self._send(404, b'{"error": "not found"}')
+            return
+
+        kind = "json" if parts[0] == "api" else "png"
+        panel = parts[1][:-len(".png")] if kind == "png" and parts[1].endswith(".png") else parts[1]
+
+        if panel not in PANELS:
+            self._send(404, b'{"error": "unknown panel"}')
+            return
+
+        try:
+            query = normalize_query(panel, query)
+        except BadRequest as exc:
+            self._send(400, json.dumps({"error": str(exc)}).encode())
+            return
+
+        try:
+            etag, body = CACHE.get(panel, kind, query)
+        except (KeyError, ValueError) as exc:
+            # Rollup not built yet or bad query parameter
+            self._send(503, json.dumps({"error": str(exc)}).encode())
+            return
+
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, etag=etag)
+            return
+
+        content_type = "application/json" if kind == "json" else "image/png"
+        self._send(200, body, content_type, etag)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _refresh_loop(interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            CACHE.refresh()
+        except Exception as exc:  # keep serving the last good rollups
+            print(f"Rollup refresh failed: {exc}")
+
+
+def serve(host: str = HOST, port: int = PORT, refresh_seconds: float = REFRESH_SECONDS):
+    CACHE.refresh()
+    threading.Thread(target=_refresh_loop, args=(refresh_seconds,), daemon=True).start()
+
+    server = ThreadingHTTPServer((host, port), DashboardHandler)
+    print(f"Dashboard API serving on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local dashboard API server")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--refresh-seconds", type=float, default=REFRESH_SECONDS)
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.refresh_seconds)
@@ -0,0 +1,138 @@
+"""
+Downsampling for long-horizon metric series.
+
+- Largest-Triangle-Three-Buckets (LTTB) keeps the points that shape the
+  visible trend, including isolated spikes and dips
+- Min/max envelopes keep the full range of each bucket so anomalies
+  dropped by LTTB are still visible as a band
+
+Both work on batch positions (0..n-1), so charts and JSON payloads stay
+the same size however many batches are stored.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Default number of points per series
+DEFAULT_POINTS = 200
+
+# Maximum number of batch labels on the x-axis
+MAX_TICKS = 12
+
+
+def lttb_indices(y, n_out: int) -> np.ndarray:
+    """
+    Indices of the points LTTB keeps from series `y` (first and last
+    are always kept). Returns every index when no reduction is needed.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+
+    # n_out - 2 buckets over the interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average of the next bucket (the last point for the final bucket)
+        if i < n_out - 3:
+            next_x = x[end:edges[i + 2]].mean()
+            next_y = y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+
+        area = np.abs(
+            (x[anchor] - next_x) * (y[start:end] - y[anchor])
+            - (x[anchor] - x[start:end]) * (next_y - y[anchor])
+        )
+        anchor = start + int(np.argmax(area))
+        selected[i + 1] = anchor
+
+    return selected
+
+
+def minmax_envelope(y, n_buckets: int):
+    """
+    Per-bucket (position, min, max) of series `y`.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= n_buckets:
+        positions = np.arange(n, dtype=float)
+        return positions, y, y
+
+    starts = np.linspace(0, n, n_buckets + 1).astype(int)[:-1]
+    ends = np.append(starts[1:], n)
+
+    return (
+        (starts + ends - 1) / 2,
+        np.minimum.reduceat(y, starts),
+        np.maximum.reduceat(y, starts),
+    )
+
+
+def downsample_frame(df: pd.DataFrame, columns: list, points: int = DEFAULT_POINTS) -> pd.DataFrame:
+    """
+    Keep at most `points` rows of several metric columns that share a
+    batch axis: the union of per-column LTTB points at the largest
+    per-column budget whose union fits. Adds a `position` column with
+    the original batch position.
+    """
+    df = df.reset_index(drop=True).assign(position=np.arange(len(df)))
+    if len(df) <= points:
+        return df
+
+    series = [df[column].ffill().bfill().to_numpy() for column in columns]
+
+    def union(budget: int) -> np.ndarray:
+        return np.unique(np.concatenate([lttb_indices(y, budget) for y in series]))
+
+    # The union grows with the per-column budget; binary search the largest that fits
+    low, high = 3, points
+    keep = union(low)
+    while low < high:
+        budget = (low + high + 1) // 2
+        candidate = union(budget)
+        if len(candidate) <= points:
+            low, keep = budget, candidate
+        else:
+            high = budget - 1
+
+    # Too few points for every column's endpoints and extremes: thin evenly
+    if len(keep) > points:
+        keep = keep[np.unique(np.linspace(0, len(keep) - 1, points).astype(int))]
+
+    return df.iloc[keep]
+
+
+def envelopes(df: pd.DataFrame, columns: list, points: int = DEFAULT_POINTS) -> dict:
+    """
+    Min/max envelope per metric column, as JSON-ready lists.
+    """
+    result = {}
+    for column in columns:
+        positions, low, high = minmax_envelope(df[column].ffill().bfill().to_numpy(), points)
+        result[column] = {
+            "position": positions.tolist(),
+            "min": low.tolist(),
+            "max": high.tolist(),
+        }
+    return result
+
+
+def set_batch_ticks(ax, batches, max_ticks: int = MAX_TICKS):
+    """
+    Label at most `max_ticks` evenly spaced batch positions.
+    """
+    batches = list(batches)
+    positions = np.unique(np.linspace(0, len(batches) - 1, min(len(batches), max_ticks)).astype(int))
+    ax.set_xticks(positions)
+    ax.set_xticklabels([batches[p] for p in positions], rotation=45, ha="right")
@@ -0,0 +1,82 @@
+"""
+Headless dashboard renderer.
+
+Refreshes the rollup tables once, then regenerates the charts whose
+rollups changed in parallel worker processes (Agg backend, no display).
+"""
+
+import matplotlib
+matplotlib.use("Agg")
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import visualize_bias
+import visualize_drift_severity
+import visualize_feature_drift
+import visualize_performance
+from rollups import update_rollups
+
+# Chart -> (render function, output path, rollup it is drawn from)
+CHARTS = {
+    "drift_severity_composition": (
+        visualize_drift_severity.render,
+        visualize_drift_severity.OUTPUT_PATH,
+        "severity_counts",
+    ),
+    "feature_drift_heatmap": (
+        visualize_feature_drift.render,
+        visualize_feature_drift.OUTPUT_PATH,
+        "feature_severity",
+    ),
+    "performance_over_time": (
+        visualize_performance.render,
+        visualize_performance.OUTPUT_PATH,
+        "performance_trend",
+    ),
+    "bias_recall_gap": (
+        visualize_bias.render,
+        visualize_bias.OUTPUT_PATH,
+        "group_recall",
+    ),
+}
+
+
+def render_all(force: bool = False, max_workers: int = None) -> dict:
+    """
+    Update rollups and re-render stale charts in parallel.
+    Returns {chart name: output path} for the charts rendered.
+    """
+    changed = set(update_rollups())
+
+    stale = {
+        name: (render, output_path)
+        for name, (render, output_path, rollup) in CHARTS.items()
+        if force or rollup in changed or not output_path.exists()
+    }
+    if not stale:
+        return {}
+
+    for _, output_path in stale.values():
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            name: pool.submit(render, output_path)
+            for name, (render, output_path) in stale.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--force", action="store_true", help="re-render every chart")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes")
+    args = parser.parse_args()
+
+    rendered = render_all(force=args.force, max_workers=args.workers)
+
+    if not rendered:
+        print("Dashboard up to date.")
+    for name, output_path in rendered.items():
+        print(f"Rendered {name}: {output_path}")
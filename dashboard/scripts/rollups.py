@@ -0,0 +1,192 @@
+"""
+Dashboard Rollups
+
+Materialised tables behind each dashboard chart. They are updated
+incrementally from rows appended to the metric stores since the last
+refresh, so charts never re-aggregate the full metric history. Each
+rollup is itself append-only: a refresh appends the latest rows of
+the keys it touched, readers keep the latest row per key, and a
+rollup is only rewritten when its metric store was (a new store
+generation).
+
+- feature_severity:  latest drift severity per feature x batch
+- severity_counts:   LOW / MEDIUM / HIGH feature counts per batch
+- performance_trend: latest performance metrics per batch
+- group_recall:      latest recall per batch x sensitive group
+
+Charts follow the champion model; challenger rows are skipped.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Reuse the metric store helpers (scripts are run from the repository root)
+sys.path.append("monitoring/scripts")
+from metrics_store import append_rows, champion_rows, read_since, store_generation, store_lock  # noqa: E402
+
+# Paths
+ROLLUP_DIR = Path("dashboard/rollups")
+STATE_PATH = ROLLUP_DIR / "state.json"
+
+DRIFT_METRICS_PATH = Path("monitoring/metrics_store/drift_metrics.csv")
+PERFORMANCE_METRICS_PATH = Path("monitoring/metrics_store/performance_metrics.csv")
+BIAS_METRICS_PATH = Path("monitoring/metrics_store/bias_metrics.csv")
+
+SEVERITY_LEVELS = ["LOW", "MEDIUM", "HIGH"]
+SEVERITY_MAP = {"LOW": 0, "MEDIUM": 1, "HIGH": 2}
+
+# Rollups fed directly by a metric store, with their unique keys
+ROLLUPS = {
+    "feature_severity": {"source": DRIFT_METRICS_PATH, "keys": ["feature", "batch"]},
+    "performance_trend": {"source": PERFORMANCE_METRICS_PATH, "keys": ["batch"]},
+    "group_recall": {"source": BIAS_METRICS_PATH, "keys": ["batch", "feature", "group"]},
+}
+
+KEY_COLUMNS = ["batch", "feature", "group"]
+
+# Unique keys of every rollup, derived ones included
+ROLLUP_KEYS = {name: spec["keys"] for name, spec in ROLLUPS.items()}
+ROLLUP_KEYS["severity_counts"] = ["batch"]
+
+
+def rollup_path(name: str) -> Path:
+    return ROLLUP_DIR / f"{name}.csv"
+
+
+def load_rollup(name: str) -> pd.DataFrame:
+    """
+    Latest row per key of a rollup, in batch order. Later appends win;
+    rows carrying a timestamp are ordered by it first.
+    """
+    path = rollup_path(name)
+    if not path.exists():
+        return pd.DataFrame()
+
+    df = pd.read_csv(path, dtype={column: str for column in KEY_COLUMNS})
+    if "timestamp" in df.columns:
+        df = df.assign(_ts=pd.to_datetime(df["timestamp"])).sort_values("_ts", kind="stable").drop(columns="_ts")
+
+    return sort_batches(df.drop_duplicates(ROLLUP_KEYS[name], keep="last")).reset_index(drop=True)
+
+
+def save_rollup(name: str, df: pd.DataFrame):
+    """
+    Replace a rollup atomically so readers never see a partial table.
+    Only used to rebuild a rollup after its metric store was rewritten.
+    """
+    path = rollup_path(name)
+    with store_lock(path):
+        tmp_path = path.with_suffix(".tmp")
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+
+def load_state() -> dict:
+    if not STATE_PATH.exists():
+        return {"offsets": {}, "generations": {}, "versions": {}}
+
+    with open(STATE_PATH) as f:
+        return json.load(f)
+
+
+def save_state(state: dict):
+    tmp_path = STATE_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def rollup_versions() -> dict:
+    """
+    Version counter per rollup, bumped whenever its table changes.
+    """
+    return load_state()["versions"]
+
+
+def sort_batches(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Order rows by the numeric batch suffix (production_batch_2 before _10).
+    """
+    batch_index = pd.to_numeric(df["batch"].str.extract(r"(\d+)$")[0], errors="coerce")
+    return df.assign(_order=batch_index).sort_values(["_order", "batch"], kind="stable").drop(columns="_order")
+
+
+def _latest(rows: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """
+    Latest metric row per key among the rows read in one refresh.
+    """
+    return (
+        rows.assign(_ts=pd.to_datetime(rows["timestamp"]))
+            .sort_values("_ts", kind="stable")
+            .drop_duplicates(keys, keep="last")
+            .drop(columns="_ts")
+    )
+
+
+def _severity_counts(feature_severity: pd.DataFrame, touched_batches) -> pd.DataFrame:
+    """
+    Recount severity levels for the batches that received new drift rows only.
+    """
+    touched = feature_severity[feature_severity["batch"].isin(touched_batches)]
+    return (
+        touched.groupby(["batch", "drift_level"])
+               .size()
+               .unstack(fill_value=0)
+               .reindex(columns=SEVERITY_LEVELS, fill_value=0)
+               .reset_index()
+    )
+
+
+def update_rollups() -> list:
+    """
+    Fold metric rows appended since the last refresh into the rollups.
+    Returns the names of the rollups that changed.
+    """
+    ROLLUP_DIR.mkdir(parents=True, exist_ok=True)
+    state = load_state()
+    changed = []
+
+    for name, spec in ROLLUPS.items():
+        if not spec["source"].exists():
+            continue
+
+        offset = state["offsets"].get(name, 0)
+        generation = store_generation(spec["source"])
+        generations = state.setdefault("generations", {})
+
+        # Metric store was rewritten: rebuild this rollup from scratch
+        rebuild = spec["source"].stat().st_size < offset or generations.get(name, 0) != generation
+        if rebuild:
+            offset = 0
+
+        dtype = {key: str for key in spec["keys"]}
+        new_rows, state["offsets"][name] = read_since(spec["source"], offset, dtype=dtype)
+        generations[name] = generation
+        new_rows = champion_rows(new_rows)
+        if new_rows.empty and not rebuild:
+            continue
+
+        latest = _latest(new_rows, spec["keys"]) if not new_rows.empty else new_rows
+        if rebuild:
+            save_rollup(name, latest)
+        else:
+            append_rows(rollup_path(name), latest)
+        changed.append(name)
+
+        if name == "feature_severity":
+            if rebuild:
+                save_rollup("severity_counts", sort_batches(_severity_counts(latest, latest["batch"].unique())))
+            else:
+                table = load_rollup(name)
+                append_rows(rollup_path("severity_counts"), _severity_counts(table, new_rows["batch"].unique()))
+            changed.append("severity_counts")
+
+    for name in changed:
+        state["versions"][name] = state["versions"].get(name, 0) + 1
+
+    save_state(state)
+    return changed
@@ -1,43 +1,61 @@
-import json
-from pathlib import Path
-import pandas as pd
-import matplotlib.pyplot as plt
-
-BIAS_DIR = Path("monitoring/bias_reports")
-
-records = []
+import matplotlib
+matplotlib.use("Agg")
 
-for file in sorted(BIAS_DIR.glob("*_bias.json")):
-    with open(file) as f:
-        data = json.load(f)
-
-    batch = data["batch"]
+import matplotlib.pyplot as plt
+from pathlib import Path
 
-    for feature, groups in data["features"].items():
-        for g in groups:
-            records.append({
-                "batch": batch,
-                "feature": feature,
-                "group": g["group"],
-                "recall": g["recall"]
-            })
+from downsampling import DEFAULT_POINTS, downsample_frame, minmax_envelope, set_batch_ticks
+from rollups import load_rollup, sort_batches, update_rollups
 
-df = pd.DataFrame(records)
+OUTPUT_PATH = Path("dashboard/outputs/bias_recall_gap.png")
 
 # Example: visualize SeniorCitizen recall gap
-subset = df[df["feature"] == "SeniorCitizen"]
-
-plt.figure(figsize=(10, 5))
-for group in subset["group"].unique():
-    grp_df = subset[subset["group"] == group]
-    plt.plot(grp_df.index, grp_df["recall"], marker="o", label=f"Group {group}")
-
-plt.title("Recall by Group (SeniorCitizen)")
-plt.xlabel("Time")
-plt.ylabel("Recall")
-plt.legend()
-plt.grid(True)
-
-plt.tight_layout()
-plt.savefig("dashboard/bias_recall_gap.png")
-plt.show()
+FEATURE = "SeniorCitizen"
+
+
+def render(output_path=OUTPUT_PATH, feature=FEATURE, points=DEFAULT_POINTS):
+    # Latest recall per (batch, feature, group), maintained by rollups.py
+    df = load_rollup("group_recall")
+    subset = df[df["feature"] == feature]
+
+    # One row per batch, one column per group, on a shared batch axis
+    recall = sort_batches(
+        subset.pivot(index="batch", columns="group", values="recall").reset_index()
+    ).reset_index(drop=True)
+    groups = [column for column in recall.columns if column != "batch"]
+
+    sampled = downsample_frame(recall, groups, points)
+    downsampled = len(sampled) < len(recall)
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    for group in groups:
+        line, = ax.plot(
+            sampled["position"],
+            sampled[group],
+            marker=None if downsampled else "o",
+            label=f"Group {group}"
+        )
+        if downsampled:
+            positions, low, high = minmax_envelope(recall[group].ffill().bfill().to_numpy(), points)
+            ax.fill_between(positions, low, high, color=line.get_color(), alpha=0.2, linewidth=0)
+
+    ax.set_title(f"Recall by Group ({feature})")
+    ax.set_xlabel("Production Batch")
+    ax.set_ylabel("Recall")
+    ax.legend()
+    ax.grid(True)
+    set_batch_ticks(ax, recall["batch"])
+
+    fig.tight_layout()
+    fig.savefig(output_path)
+    plt.close(fig)
+
+    return output_path
+
+
+if __name__ == "__main__":
+    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    update_rollups()
+    render()
+
+    print(f"Saved recall by group plot to {OUTPUT_PATH}")
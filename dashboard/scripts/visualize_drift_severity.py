@@ -4,47 +4,50 @@ This answers the question:
 "Is the system getting worse over time?"
 """
 
-import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
 from pathlib import Path
 
+from rollups import SEVERITY_LEVELS, load_rollup, update_rollups
+
 # Paths
-DRIFT_METRICS_PATH = Path("monitoring/metrics_store/drift_metrics.csv")
-OUTPUT_PATH = Path("dashboard/drift_severity_composition.png")
+OUTPUT_PATH = Path("dashboard/outputs/drift_severity_composition.png")
+
 
-OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+def render(output_path=OUTPUT_PATH):
+    # Severity counts per batch (maintained by rollups.py)
+    severity_counts = load_rollup("severity_counts").set_index("batch")
 
-# Loading data
-df = pd.read_csv(DRIFT_METRICS_PATH)
+    # Ensuring consistent known order
+    severity_counts = severity_counts[SEVERITY_LEVELS]
 
-# Counts severity levels per batch
-severity_counts = (
-    df.groupby(["batch", "drift_level"])
-      .size()
-      .unstack(fill_value=0)
-      .sort_index()
-)
+    # Plot stacked bars
+    fig, ax = plt.subplots(figsize=(9, 5))
+    severity_counts.plot(
+        kind="bar",
+        stacked=True,
+        ax=ax,
+        color=["#2ecc71", "#f1c40f", "#e74c3c"]
+    )
 
-# Ensuring consistent known order
-severity_counts = severity_counts[["LOW", "MEDIUM", "HIGH"]]
+    ax.set_xlabel("Production Batch")
+    ax.set_ylabel("Number of Features")
+    ax.set_title("Drift Severity Composition per Batch")
+    ax.legend(title="Drift Level")
+    ax.grid(axis="y")
 
+    fig.tight_layout()
+    fig.savefig(output_path)
+    plt.close(fig)
 
-# Plot stacked bars
-severity_counts.plot(
-    kind="bar",
-    stacked=True,
-    figsize=(9, 5),
-    color=["#2ecc71", "#f1c40f", "#e74c3c"]
-)
+    return output_path
 
-plt.xlabel("Production Batch")
-plt.ylabel("Number of Features")
-plt.title("Drift Severity Composition per Batch")
-plt.legend(title="Drift Level")
-plt.grid(axis="y")
 
-plt.tight_layout()
-plt.savefig(OUTPUT_PATH)
-plt.show()
+if __name__ == "__main__":
+    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    update_rollups()
+    render()
 
-print(f"Saved drift severity composition plot to {OUTPUT_PATH}")
\ No newline at end of file
+    print(f"Saved drift severity composition plot to {OUTPUT_PATH}")
@@ -1,32 +1,52 @@
-import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
 import seaborn as sns
+from pathlib import Path
+
+from rollups import SEVERITY_MAP, load_rollup, sort_batches, update_rollups
+
+OUTPUT_PATH = Path("dashboard/outputs/feature_drift_heatmap.png")
+
+
+def render(output_path=OUTPUT_PATH):
+    # Latest drift level per (feature, batch), maintained by rollups.py
+    df = load_rollup("feature_severity")
+
+    # Map drift levels to numeric scale
+    df["severity_num"] = df["drift_level"].map(SEVERITY_MAP)
+
+    # Pivot for heatmap (rollup keys are unique per feature x batch)
+    heatmap_df = df.pivot(
+        index="feature",
+        columns="batch",
+        values="severity_num"
+    )
+    heatmap_df = heatmap_df[sort_batches(df.drop_duplicates("batch"))["batch"]]
+
+    fig, ax = plt.subplots(figsize=(10, 4))
+    sns.heatmap(
+        heatmap_df,
+        annot=True,
+        cmap="RdYlGn_r",
+        cbar_kws={"label": "Drift Severity"},
+        ax=ax
+    )
+
+    ax.set_title("Feature-Level Drift Severity Heatmap")
+    ax.set_xlabel("Production Batch")
+    ax.set_ylabel("Feature")
+    fig.tight_layout()
+    fig.savefig(output_path)
+    plt.close(fig)
+
+    return output_path
+
+
+if __name__ == "__main__":
+    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    update_rollups()
+    render()
 
-# Loading drift metrics
-df = pd.read_csv("monitoring/metrics_store/drift_metrics.csv")
-
-# Map drift levels to numeric scale
-severity_map = {"LOW": 0, "MEDIUM": 1, "HIGH": 2}
-df["severity_num"] = df["drift_level"].map(severity_map)
-
-# Pivot for heatmap
-heatmap_df = df.pivot(
-    index="feature",
-    columns="batch",
-    values="severity_num"
-)
-
-plt.figure(figsize=(10, 4))
-sns.heatmap(
-    heatmap_df,
-    annot=True,
-    cmap="RdYlGn_r",
-    cbar_kws={"label": "Drift Severity"}
-)
-
-plt.title("Feature-Level Drift Severity Heatmap")
-plt.xlabel("Production Batch")
-plt.ylabel("Feature")
-plt.tight_layout()
-plt.savefig("dashboard/feature_drift_heatmap.png")
-plt.show()
\ No newline at end of file
+    print(f"Saved feature drift heatmap to {OUTPUT_PATH}")
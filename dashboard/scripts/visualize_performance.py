@@ -1,36 +1,56 @@
-import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
 from pathlib import Path
 
-# Path to performance metrics
-PERFORMANCE_PATH = Path("monitoring/performance_reports/model_performance.csv")
+from downsampling import DEFAULT_POINTS, downsample_frame, minmax_envelope, set_batch_ticks
+from rollups import load_rollup, sort_batches, update_rollups
 
-# Loading performance data
-df = pd.read_csv(PERFORMANCE_PATH)
+OUTPUT_PATH = Path("dashboard/outputs/performance_over_time.png")
 
-import pandas as pd
-import matplotlib.pyplot as plt
-from pathlib import Path
+METRICS = {"precision": "Precision", "recall": "Recall", "roc_auc": "ROC-AUC"}
+
+
+def render(output_path=OUTPUT_PATH, points=DEFAULT_POINTS):
+    # Latest performance metrics per batch, maintained by rollups.py
+    df = load_rollup("performance_trend")
+
+    # Sort by batch index (important for correct trend)
+    df = sort_batches(df).reset_index(drop=True)
+
+    # Downsample long histories (LTTB points + min/max band)
+    sampled = downsample_frame(df, list(METRICS), points)
+    downsampled = len(sampled) < len(df)
+
+    # Plotting performance trends
+    fig, ax = plt.subplots(figsize=(10, 5))
+    for metric, label in METRICS.items():
+        line, = ax.plot(
+            sampled["position"],
+            sampled[metric],
+            marker=None if downsampled else "o",
+            label=label
+        )
+        if downsampled:
+            positions, low, high = minmax_envelope(df[metric].ffill().bfill().to_numpy(), points)
+            ax.fill_between(positions, low, high, color=line.get_color(), alpha=0.2, linewidth=0)
+
+    ax.set_title("Model Performance Over Batches")
+    ax.set_xlabel("Production Batch")
+    ax.set_ylabel("Metric Value")
+    ax.legend()
+    set_batch_ticks(ax, df["batch"])
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=300, bbox_inches="tight")
+    plt.close(fig)
+
+    return output_path
+
+
+if __name__ == "__main__":
+    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    update_rollups()
+    render()
 
-# Loading performance metrics
-PERF_PATH = Path("monitoring/performance_reports/model_performance.csv")
-df = pd.read_csv(PERF_PATH)
-
-# Sort by batch index (important for correct trend)
-df["batch_index"] = df["batch"].str.extract(r'(\d+)').astype(int)
-df = df.sort_values("batch_index")
-
-# Plotting performance trends
-plt.figure(figsize=(10, 5))
-plt.plot(df["batch"], df["precision"], marker="o", label="Precision")
-plt.plot(df["batch"], df["recall"], marker="o", label="Recall")
-plt.plot(df["batch"], df["roc_auc"], marker="o", label="ROC-AUC")
-
-plt.title("Model Performance Over Batches")
-plt.xlabel("Production Batch")
-plt.ylabel("Metric Value")
-plt.legend()
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.savefig("dashboard/performance_over_time.png", dpi=300, bbox_inches="tight")
-plt.show()
\ No newline at end of file
+    print(f"Saved performance trend plot to {OUTPUT_PATH}")
@@ -3,19 +3,29 @@ Data Cleaning Pipeline:
 - Converts raw Telco churn data into a clean, schema-consistent dataset
 - Enforce data contracts identified during EDA
 - Preparing data for reference / production split and model training
+- Chunked mode streams large raw exports through worker processes
+  with bounded memory (--chunksize)
 '''
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 from pathlib import Path
 
 RAW_DATA_PATH = Path("data/raw/telco_customer_churn.csv")
 CLEAN_DATA_PATH = Path("data/clean/cleaned_data.csv")
 
+# Rows sampled to fix column dtypes before streaming
+DTYPE_SAMPLE_ROWS = 1000
+
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     # Fix TotalCharges type issue identified in EDA
     df["TotalCharges"] = pd.to_numeric(df["TotalCharges"], errors="coerce")
 
-    # Drop identifier column
-    df = df.drop(columns=["customerID"])
+    # customerID is kept as the entity ID of the prediction log
+    # (monitoring/scripts/prediction_log.py); models drop it
 
     # Enforcing categorical schema
     # Ensuring categorical columns remain strings
@@ -27,18 +37,118 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     required_columns = {"Churn", "tenure", "MonthlyCharges", "TotalCharges"}
     missing = required_columns - set(df.columns)
     if missing:
-        raise ValueError(f"Missing required columns after cleaning: {missing}")    
+        raise ValueError(f"Missing required columns after cleaning: {missing}")
 
     return df
 
+def _text_dtypes(raw_path: Path) -> dict:
+    '''
+    Text columns seen in a sample of the raw file. Reading them as str in
+    every chunk keeps dtypes identical across chunks (a chunk without
+    blanks in TotalCharges would otherwise parse as numeric).
+    '''
+    sample = pd.read_csv(raw_path, nrows=DTYPE_SAMPLE_ROWS)
+    return {col: str for col in sample.select_dtypes(include=["object"]).columns}
+
+def _ordered_parallel_map(func, chunks, workers: int):
+    '''
+    Apply func to chunks in worker processes, yielding results in input
+    order with at most 2 * workers chunks in flight (bounded memory).
+    '''
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(func, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+class _ParquetSink:
+    '''
+    Incremental Parquet writer (requires pyarrow); the first chunk
+    fixes the file schema.
+    '''
+    def __init__(self, path: Path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)") from exc
+
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.writer = None
+
+    def write(self, df: pd.DataFrame):
+        if self.writer is None:
+            table = self.pa.Table.from_pandas(df, preserve_index=False)
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        else:
+            table = self.pa.Table.from_pandas(df, schema=self.writer.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+def clean_in_chunks(
+    raw_path: Path = RAW_DATA_PATH,
+    clean_path: Path = CLEAN_DATA_PATH,
+    chunksize: int = 100_000,
+    workers: int = None,
+    output_format: str = "csv",
+) -> int:
+    '''
+    Stream the raw file through clean_data in parallel worker processes
+    and write the cleaned output incrementally, preserving row order.
+    Returns the number of rows written.
+    '''
+    workers = workers or os.cpu_count() or 1
+    clean_path.parent.mkdir(parents=True, exist_ok=True)
+
+    chunks = pd.read_csv(raw_path, chunksize=chunksize, dtype=_text_dtypes(raw_path))
+    sink = _ParquetSink(clean_path) if output_format == "parquet" else None
+    rows = 0
+
+    try:
+        for i, df_clean in enumerate(_ordered_parallel_map(clean_data, chunks, workers)):
+            if sink is not None:
+                sink.write(df_clean)
+            else:
+                df_clean.to_csv(clean_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+            rows += len(df_clean)
+    finally:
+        if sink is not None:
+            sink.close()
+
+    return rows
+
 def main():
-    df = pd.read_csv(RAW_DATA_PATH)
+    parser = argparse.ArgumentParser(description="Clean raw Telco churn data")
+    parser.add_argument("--input", type=Path, default=RAW_DATA_PATH)
+    parser.add_argument("--output", type=Path, default=CLEAN_DATA_PATH)
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="stream the input in chunks of this many rows")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes for chunked mode (default: all cores)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                        help="output format for chunked mode")
+    args = parser.parse_args()
+
+    if args.chunksize:
+        rows = clean_in_chunks(args.input, args.output, args.chunksize, args.workers, args.format)
+        print(f"Cleaned {rows} rows saved to:", args.output)
+        return
+
+    df = pd.read_csv(args.input)
     df_clean = clean_data(df)
 
-    CLEAN_DATA_PATH.parent.mkdir(parents=True, exist_ok=True)
-    df_clean.to_csv(CLEAN_DATA_PATH, index=False)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    df_clean.to_csv(args.output, index=False)
 
-    print("Cleaned data saved to:", CLEAN_DATA_PATH)
+    print("Cleaned data saved to:", args.output)
 
 if __name__ == "__main__":
     main()
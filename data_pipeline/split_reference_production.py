@@ -3,7 +3,13 @@ Reference / Production Split
 - Creating a fixed reference dataset representing deployment-time data
 - Generating multiple production batches simulating post-deployment inputs
 - Preserve class balance to avoid misleading monitoring signals
+- Streaming mode (--stream) splits arbitrarily large histories in one
+  pass with constant memory, batching by row count or by time; the
+  split is stratified per class and keyed on the entity ID, and the
+  timestamp column used for batching is dropped from the outputs
 """
+import argparse
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from sklearn.model_selection import train_test_split
@@ -12,18 +18,31 @@ CLEAN_DATA_PATH = Path("data/clean/cleaned_data.csv")
 REFERENCE_DATA_PATH = Path("data/reference/reference_data.csv")
 PRODUCTION_DIR = Path("data/production_batches")
 
+TARGET_COLUMN = "Churn"
+ENTITY_ID_COLUMN = "customerID"
+TEST_SIZE = 0.4
+RANDOM_STATE = 42
+BATCH_SIZE = 500
+CHUNK_SIZE = 100_000
+
+# Time-based batching: period -> (pandas frequency, batch name format)
+PERIODS = {
+    "hourly": ("h", "%Y%m%d%H"),
+    "daily": ("D", "%Y%m%d"),
+}
+
 def main():
     # Loading cleaned data
     df = pd.read_csv(CLEAN_DATA_PATH)
-    if "Churn" not in df.columns:
+    if TARGET_COLUMN not in df.columns:
         raise ValueError("Target column 'Churn' missing from cleaned data")
-    
+
     # Reference vs Production split
     reference_df, production_df = train_test_split(
         df,
-        test_size=0.4,
-        random_state=42,
-        stratify=df["Churn"]
+        test_size=TEST_SIZE,
+        random_state=RANDOM_STATE,
+        stratify=df[TARGET_COLUMN]
     )
 
 
@@ -33,7 +52,7 @@ def main():
 
     # Creating production batches
     PRODUCTION_DIR.mkdir(parents=True, exist_ok=True)
-    batch_size = 500
+    batch_size = BATCH_SIZE
     for i in range(0, len(production_df), batch_size):
         batch = production_df.iloc[i:i + batch_size]
         batch.to_csv(
@@ -43,6 +62,198 @@ def main():
 
     print("Reference and production data created.")
 
+def production_mask(
+    chunk: pd.DataFrame, class_counts: dict, offset: int, test_size: float = TEST_SIZE, seed: int = RANDOM_STATE
+) -> np.ndarray:
+    """
+    Stratified assignment of one chunk. Within each class, rows are
+    visited in the order of a seeded hash of their entity ID (their row
+    number in the file when there is none, `offset` being the chunk's
+    first), and systematic sampling over the class's running count
+    sends every 1 / test_size-th row to production. Each class is split
+    test_size to within one row per chunk, and duplicate rows of
+    different entities are assigned independently.
+    `class_counts` carries the per-class counts across chunks.
+    """
+    if ENTITY_ID_COLUMN in chunk.columns:
+        keys = chunk[ENTITY_ID_COLUMN].astype(str)
+    else:
+        keys = pd.Series(np.arange(offset, offset + len(chunk)))
+    hashes = pd.util.hash_pandas_object(keys, index=False, hash_key=f"{seed:016d}").to_numpy()
+
+    labels = chunk[TARGET_COLUMN].astype(str).to_numpy()
+    mask = np.zeros(len(chunk), dtype=bool)
+
+    for label in np.unique(labels):
+        rows = np.flatnonzero(labels == label)
+        rows = rows[np.argsort(hashes[rows], kind="stable")]
+
+        seen = class_counts.get(label, 0) + np.arange(1, len(rows) + 1)
+        mask[rows] = np.floor(seen * test_size) > np.floor((seen - 1) * test_size)
+        class_counts[label] = class_counts.get(label, 0) + len(rows)
+
+    return mask
+
+class _BatchWriter:
+    """
+    Writes production batches as they fill: fixed-size batches in arrival
+    order, or one batch per time period of a timestamp column (which is
+    not written). At most `max_buffered_rows` rows of the latest period
+    are held; beyond that they are written early and later rows of the
+    period appended, so input that is not time-ordered cannot grow the
+    buffer without bound.
+    """
+    def __init__(
+        self, output_dir: Path, batch_size: int, timestamp_column: str = None, period: str = "daily",
+        max_buffered_rows: int = CHUNK_SIZE,
+    ):
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.timestamp_column = timestamp_column
+        self.max_buffered_rows = max_buffered_rows
+        self.freq, self.name_format = PERIODS[period]
+        self.buffer = []
+        self.buffered_rows = 0
+        self.batch_index = 0
+        self.written = set()
+
+    def _write(self, name: str, df: pd.DataFrame):
+        path = self.output_dir / f"production_batch_{name}.csv"
+        if self.timestamp_column:
+            df = df.drop(columns=[self.timestamp_column, "_period"])
+        # Late rows for an already written period are appended to it
+        first = name not in self.written
+        df.to_csv(path, mode="w" if first else "a", header=first, index=False)
+        self.written.add(name)
+
+    def add(self, rows: pd.DataFrame):
+        if rows.empty:
+            return
+        if self.timestamp_column:
+            self._add_timed(rows)
+        else:
+            self._add_sized(rows)
+
+    def _add_sized(self, rows: pd.DataFrame):
+        self.buffer.append(rows)
+        self.buffered_rows += len(rows)
+        if self.buffered_rows < self.batch_size:
+            return
+
+        # One concat per chunk; full batches are sliced off at running offsets
+        pending = pd.concat(self.buffer, ignore_index=True)
+        start = 0
+        while len(pending) - start >= self.batch_size:
+            self._write(str(self.batch_index), pending.iloc[start:start + self.batch_size])
+            self.batch_index += 1
+            start += self.batch_size
+
+        self.buffer = [pending.iloc[start:]]
+        self.buffered_rows = len(pending) - start
+
+    def _add_timed(self, rows: pd.DataFrame):
+        periods = pd.to_datetime(rows[self.timestamp_column]).dt.floor(self.freq)
+        if periods.isna().any():
+            raise ValueError(f"Timestamp column '{self.timestamp_column}' has missing values")
+        pending = pd.concat(self.buffer + [rows.assign(_period=periods)], ignore_index=True)
+
+        # Periods before the latest one seen are complete (input is time-ordered);
+        # an oversized buffer is written out as well
+        latest = pending["_period"].max()
+        complete = pending["_period"] < latest
+        if (~complete).sum() > self.max_buffered_rows:
+            complete[:] = True
+        for period, batch in pending[complete].groupby("_period"):
+            self._write(period.strftime(self.name_format), batch)
+
+        self.buffer = [pending[~complete]]
+        self.buffered_rows = int((~complete).sum())
+
+    def flush(self):
+        if not self.buffered_rows:
+            return
+        pending = pd.concat(self.buffer, ignore_index=True)
+        if self.timestamp_column:
+            for period, batch in pending.groupby("_period"):
+                self._write(period.strftime(self.name_format), batch)
+        else:
+            self._write(str(self.batch_index), pending)
+            self.batch_index += 1
+        self.buffer = []
+        self.buffered_rows = 0
+
+def split_streaming(
+    clean_path: Path = CLEAN_DATA_PATH,
+    reference_path: Path = REFERENCE_DATA_PATH,
+    production_dir: Path = PRODUCTION_DIR,
+    test_size: float = TEST_SIZE,
+    batch_size: int = BATCH_SIZE,
+    timestamp_column: str = None,
+    period: str = "daily",
+    chunksize: int = CHUNK_SIZE,
+    seed: int = RANDOM_STATE,
+) -> pd.DataFrame:
+    """
+    One pass over the cleaned data: each chunk is split into reference and
+    production rows, reference rows are appended to the reference file and
+    production rows are written as batches fill.
+    Returns per-class row counts for each side.
+    """
+    reference_path.parent.mkdir(parents=True, exist_ok=True)
+    production_dir.mkdir(parents=True, exist_ok=True)
+
+    writer = _BatchWriter(production_dir, batch_size, timestamp_column, period, max_buffered_rows=chunksize)
+    class_counts = {}
+    offset = 0
+    counts = []
+
+    for i, chunk in enumerate(pd.read_csv(clean_path, chunksize=chunksize)):
+        if TARGET_COLUMN not in chunk.columns:
+            raise ValueError("Target column 'Churn' missing from cleaned data")
+        if timestamp_column and timestamp_column not in chunk.columns:
+            raise ValueError(f"Timestamp column '{timestamp_column}' missing from cleaned data")
+
+        is_production = production_mask(chunk, class_counts, offset, test_size, seed)
+        offset += len(chunk)
+
+        # The timestamp only places rows in batches; it is not a feature
+        chunk[~is_production].drop(columns=[timestamp_column] if timestamp_column else []).to_csv(
+            reference_path, mode="w" if i == 0 else "a", header=i == 0, index=False
+        )
+        writer.add(chunk[is_production])
+
+        counts.append(
+            pd.crosstab(
+                chunk[TARGET_COLUMN],
+                np.where(is_production, "production", "reference"),
+                colnames=["split"],
+            )
+        )
+
+    writer.flush()
+
+    return pd.concat(counts).groupby(level=0).sum()
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Split cleaned data into reference and production batches")
+    parser.add_argument("--stream", action="store_true",
+                        help="single-pass, constant-memory split")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--timestamp-column", default=None,
+                        help="batch production rows by this column's time period instead of row count")
+    parser.add_argument("--period", choices=sorted(PERIODS), default="daily")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.stream or args.timestamp_column:
+        class_counts = split_streaming(
+            batch_size=args.batch_size,
+            timestamp_column=args.timestamp_column,
+            period=args.period,
+            chunksize=args.chunksize,
+        )
+        print(class_counts.to_string())
+        print("Reference and production data created.")
+    else:
+        main()
 
@@ -1,19 +1,23 @@
 """
 Model explainability script using SHAP.
-- Provide global and local explanations for the baseline model
+- Provide global and local explanations for the monitored model
+  (the registry champion unless a version is given)
 - Support trust, debugging, and monitoring decisions
 - Ensure explanations are consistent with training schema
 """
 
+import argparse
+import sys
 import pandas as pd
 import shap
-import joblib
 import numpy as np
 from pathlib import Path
 import matplotlib.pyplot as plt
 
+sys.path.append(str(Path(__file__).resolve().parents[1] / "monitoring" / "scripts"))
+import model_registry  # noqa: E402
+
 # Paths
-MODEL_PATH = Path("models/baseline_model.joblib")
 REFERENCE_DATA_PATH = Path("data/reference/reference_data.csv")
 OUTPUT_DIR = Path("models/explainability")
 
@@ -21,13 +25,14 @@ OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 # Constants
 TARGET_COLUMN = "Churn"
+ENTITY_ID_COLUMN = "customerID"
 POSITIVE_LABEL = "Yes"
 SAMPLE_SIZE = 200
 
 
-def main():
-    # Loading trained pipeline
-    model = joblib.load(MODEL_PATH)
+def main(version: str = None):
+    # Loading the trained pipeline that monitoring scores with
+    version, model = model_registry.load(version)
 
     # Loading reference data
     df = pd.read_csv(REFERENCE_DATA_PATH)
@@ -39,7 +44,7 @@ def main():
     for col in df.select_dtypes(include=["object"]).columns:
         df[col] = df[col].astype(str)
 
-    X = df.drop(columns=[TARGET_COLUMN])
+    X = df.drop(columns=[TARGET_COLUMN, ENTITY_ID_COLUMN], errors="ignore")
 
     # Sample data for explainability
     X_sample = X.sample(n=SAMPLE_SIZE, random_state=42)
@@ -101,8 +106,12 @@ def main():
     plt.savefig(OUTPUT_DIR / "local_explanation_instance_0.png")
     plt.close()
 
-    print("SHAP explainability artifacts generated successfully.")
+    print(f"SHAP explainability artifacts generated successfully for {version}.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="SHAP explanations of a registered model")
+    parser.add_argument("--version", default=None, help="model version (default: the champion)")
+    args = parser.parse_args()
+
+    main(args.version)
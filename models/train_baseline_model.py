@@ -5,7 +5,11 @@
   - Trained model
   - Evaluation metrics
   - Feature schema alignment
+- Register the trained model as the new champion, so monitoring
+  (which loads the registry champion) picks it up
 """
+import json
+import sys
 import pandas as pd
 from pathlib import Path
 import joblib
@@ -18,95 +22,143 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, roc_auc_score
 from sklearn.impute import SimpleImputer
 
+sys.path.append(str(Path(__file__).resolve().parents[1] / "monitoring" / "scripts"))
+import model_registry  # noqa: E402
+
 # Paths
 REFERENCE_DATA_PATH = Path("data/reference/reference_data.csv")
 MODEL_OUTPUT_PATH = Path("models/baseline_model.joblib")
 METRICS_OUTPUT_PATH = Path("models/baseline_metrics.txt")
+METADATA_PATH = Path("models/metadata.json")
 
-# Constants 
+# Constants
 TARGET_COLUMN = "Churn"
+ENTITY_ID_COLUMN = "customerID"
 POSITIVE_LABEL = "Yes" # Positive class for churn
 
-# Loading reference data
-df = pd.read_csv(REFERENCE_DATA_PATH)
-
-# Schema consistency fixes
-# Converting TotalCharges to numeric (known issue from EDA)
-if "TotalCharges" in df.columns:
-    df["TotalCharges"] = pd.to_numeric(df["TotalCharges"], errors="coerce")
-
-# Ensuring categorical columns are strings
-for col in df.select_dtypes(include=["object"]).columns:
-    df[col] = df[col].astype(str)
 
-# target split
-TARGET_COLUMN = "Churn"
-X = df.drop(columns=[TARGET_COLUMN])
-y = df[TARGET_COLUMN]
-
-# Feature types 
-categorical_features = X.select_dtypes(include=["object"]).columns
-numerical_features = X.select_dtypes(exclude=["object"]).columns
-
-# Preprocessing pipeline 
-preprocessor = ColumnTransformer(
-    transformers=[
-        (
-            "cat",
-            Pipeline(
-                steps=[
-                    ("imputer", SimpleImputer(strategy="most_frequent")),
-                    ("encoder", OneHotEncoder(handle_unknown="ignore")),
-                ]
+def prepare_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Schema consistency fixes shared by training and retraining.
+    """
+    # Entity ID identifies records, it is not a feature
+    df = df.drop(columns=[ENTITY_ID_COLUMN], errors="ignore")
+
+    # Converting TotalCharges to numeric (known issue from EDA)
+    if "TotalCharges" in df.columns:
+        df["TotalCharges"] = pd.to_numeric(df["TotalCharges"], errors="coerce")
+
+    # Ensuring categorical columns are strings
+    for col in df.select_dtypes(include=["object"]).columns:
+        df[col] = df[col].astype(str)
+
+    return df
+
+
+def build_pipeline(categorical_features, numerical_features, categories="auto") -> Pipeline:
+    """
+    Preprocessing + logistic regression pipeline.
+    Passing `categories` fixes the one-hot vocabulary (and layout).
+    """
+    preprocessor = ColumnTransformer(
+        transformers=[
+            (
+                "cat",
+                Pipeline(
+                    steps=[
+                        ("imputer", SimpleImputer(strategy="most_frequent")),
+                        ("encoder", OneHotEncoder(categories=categories, handle_unknown="ignore")),
+                    ]
+                ),
+                categorical_features,
             ),
-            categorical_features,
-        ),
-        (
-            "num",
-            Pipeline(
-                steps=[
-                    ("imputer", SimpleImputer(strategy="median")),
-                ]
+            (
+                "num",
+                Pipeline(
+                    steps=[
+                        ("imputer", SimpleImputer(strategy="median")),
+                    ]
+                ),
+                numerical_features,
             ),
-            numerical_features,
-        ),
-    ]
-)
+        ]
+    )
+
+    return Pipeline(
+        steps=[
+            ("preprocessing", preprocessor),
+            ("classifier", LogisticRegression(max_iter=1000)),
+        ]
+    )
+
+
+def main():
+    # Loading reference data
+    df = prepare_features(pd.read_csv(REFERENCE_DATA_PATH))
+
+    # target split
+    X = df.drop(columns=[TARGET_COLUMN])
+    y = df[TARGET_COLUMN]
+
+    # Feature types
+    categorical_features = X.select_dtypes(include=["object"]).columns
+    numerical_features = X.select_dtypes(exclude=["object"]).columns
+
+    # Model pipeline
+    model = build_pipeline(categorical_features, numerical_features)
+
+    # Train / validation split
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+
+    # Training model
+    model.fit(X_train, y_train)
 
-# Model pipeline
+    # Evaluate baseline
+    y_pred = model.predict(X_val)
+    y_pred_proba = model.predict_proba(X_val)[:, 1]
 
-model = Pipeline(
-    steps=[
-        ("preprocessing", preprocessor),
-        ("classifier", LogisticRegression(max_iter=1000)),
-    ]
-)
+    report = classification_report(y_val, y_pred)
+    roc_auc = roc_auc_score((y_val == POSITIVE_LABEL).astype(int), y_pred_proba)
 
-# Train / validation split
+    # Saving artifacts
+    MODEL_OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, MODEL_OUTPUT_PATH)
 
-X_train, X_val, y_train, y_val = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
+    with open(METRICS_OUTPUT_PATH, "w") as f:
+        f.write("Baseline Model Performance\n\n")
+        f.write(report)
+        f.write(f"\nROC AUC: {roc_auc:.4f}\n")
 
-# Training model
+    version = register_model(model, roc_auc)
 
-model.fit(X_train, y_train)
+    print(f"Baseline model training complete (registered {version} as champion).")
 
-# Evaluate baseline
-y_pred = model.predict(X_val) 
-y_pred_proba = model.predict_proba(X_val)[:, 1]
 
-report = classification_report(y_val, y_pred)
-roc_auc = roc_auc_score((y_val == "Yes").astype(int), y_pred_proba)
+def register_model(model, roc_auc: float) -> str:
+    """
+    Register the model written to MODEL_OUTPUT_PATH as the champion.
+    An empty registry takes it as the baseline (v1.0); otherwise it
+    becomes the next major version and the previous champion is archived.
+    """
+    if not model_registry.load_index()["versions"]:
+        return model_registry.resolve()["version"]
 
-# Saving artifacts
+    metadata = {}
+    if METADATA_PATH.exists():
+        with open(METADATA_PATH) as f:
+            metadata = json.load(f)
 
-MODEL_OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-joblib.dump(model, MODEL_OUTPUT_PATH)
+    version = model_registry.next_version(major=True)
+    model_registry.register(
+        model,
+        version,
+        stage="champion",
+        metadata={**metadata, "model_version": version, "validation_roc_auc": roc_auc},
+    )
+    return version
 
-with open(METRICS_OUTPUT_PATH, "w") as f:
-    f.write("Baseline Model Performance\n\n")
-    f.write(report)
-    f.write(f"\nROC AUC: {roc_auc:.4f}\n")
 
-print("Baseline model training complete.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
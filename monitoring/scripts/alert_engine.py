@@ -2,131 +2,129 @@
 Alert Engine for ML Model Monitoring
 
 Reads stored monitoring metrics (performance, drift, bias)
-and raises alerts when predefined thresholds are violated.
+and raises alerts when rules defined in
+monitoring/config/alert_rules.yaml are violated.
+
+- Rules are evaluated over all batches at once (see rule_engine.py)
+- Console checks report the latest batch; backfill_alerts() keeps
+  the full alert history
+- run_all_alerts() only reports alerts that changed since its last run
+  (see alert_state.py); the first run starts from the current history
+  unless --backfill pages it
 """
 
-import pandas as pd
+import argparse
 from pathlib import Path
 
-# Metric store paths
-PERFORMANCE_METRICS_PATH = Path("monitoring/metrics_store/performance_metrics.csv")
-BIAS_METRICS_PATH = Path("monitoring/metrics_store/bias_metrics.csv")
-DRIFT_METRICS_PATH = Path("monitoring/metrics_store/drift_metrics.csv")
-
-# Alert thresholds
-PERFORMANCE_THRESHOLDS = {
-    "precision_min": 0.60,
-    "recall_min": 0.55,
-    "roc_auc_min": 0.80,
-}
-
-DRIFT_THRESHOLDS = {
-    "max_high_drift_features": 2
-}
-
-BIAS_THRESHOLDS = {
-    "max_recall_gap": 0.15
-}
-
+from alert_state import FIRING, RESOLVED, SUPPRESSED, evaluate_new_alerts
+from rule_engine import SOURCES, evaluate_rules, load_rules, load_sources
 
-def check_performance_alerts():
-    if not PERFORMANCE_METRICS_PATH.exists():
-        print("Performance metrics file not found.")
+# Metric store paths
+PERFORMANCE_METRICS_PATH = SOURCES["performance"]["path"]
+BIAS_METRICS_PATH = SOURCES["bias"]["path"]
+DRIFT_METRICS_PATH = SOURCES["drift"]["path"]
+
+# Structured alert history (rebuilt by backfill_alerts)
+ALERT_HISTORY_PATH = Path("monitoring/alerts/alert_history.csv")
+
+
+def describe_alert(alert) -> str:
+    """
+    Human-readable line for one evaluated rule.
+    """
+    text = f"{alert['message']}: {alert['value']:.3f}"
+    if alert["key"]:
+        text += f" [{alert['key']}]"
+    if isinstance(alert["detail"], str) and alert["detail"]:
+        text += f" ({alert['detail']})"
+    return text
+
+
+def check_source_alerts(source: str, label: str, ok_message: str):
+    """
+    Evaluate the rules of one metric source and report
+    alerts raised for its latest batch.
+    """
+    if not SOURCES[source]["path"].exists():
+        print(f"{label.capitalize()} metrics file not found.")
         return
 
-    df = pd.read_csv(PERFORMANCE_METRICS_PATH)
-    if df.empty:
-        print("Performance metrics file is empty.")
+    frames = load_sources([source])
+    if source not in frames:
+        print(f"{label.capitalize()} metrics file is empty.")
         return
 
-    latest = df.sort_values("timestamp").iloc[-1]
+    rules = [rule for rule in load_rules() if rule["source"] == source]
+    latest_batch = frames[source]["batch"].iloc[-1]
 
-    alerts = []
+    alerts = evaluate_rules(rules, frames)
+    alerts = alerts[alerts["batch"] == latest_batch]
 
-    if latest["precision"] < PERFORMANCE_THRESHOLDS["precision_min"]:
-        alerts.append(f"Low precision: {latest['precision']:.3f}")
+    if alerts.empty:
+        print(ok_message)
+        return
 
-    if latest["recall"] < PERFORMANCE_THRESHOLDS["recall_min"]:
-        alerts.append(f"Low recall: {latest['recall']:.3f}")
+    print(f" {label.upper()} ALERT ({latest_batch})")
+    for alert in alerts.to_dict("records"):
+        print(f"  - {describe_alert(alert)}")
 
-    if latest["roc_auc"] < PERFORMANCE_THRESHOLDS["roc_auc_min"]:
-        alerts.append(f"Low ROC-AUC: {latest['roc_auc']:.3f}")
 
-    if alerts:
-        print(f" PERFORMANCE ALERT ({latest['batch']})")
-        for alert in alerts:
-            print(f"  - {alert}")
-    else:
-        print("Performance within acceptable thresholds.")
+def check_performance_alerts():
+    check_source_alerts(
+        "performance", "performance", "Performance within acceptable thresholds."
+    )
 
 
 def check_drift_alerts():
-    if not DRIFT_METRICS_PATH.exists():
-        print("Drift metrics file not found.")
-        return
-
-    df = pd.read_csv(DRIFT_METRICS_PATH)
-    if df.empty:
-        print("Drift metrics file is empty.")
-        return
-
-    latest_batch = df.sort_values("timestamp")["batch"].iloc[-1]
-    batch_df = df[df["batch"] == latest_batch]
-
-    high_drift_features = batch_df[batch_df["drift_level"] == "HIGH"]
-
-    if len(high_drift_features) > DRIFT_THRESHOLDS["max_high_drift_features"]:
-        print(f" DRIFT ALERT ({latest_batch})")
-        print(f"  High drift detected in {len(high_drift_features)} features:")
-        for feature in high_drift_features["feature"]:
-            print(f"  - {feature}")
-    else:
-        print("Drift levels acceptable.")
+    check_source_alerts("drift", "drift", "Drift levels acceptable.")
 
 
 def check_bias_alerts():
-    if not BIAS_METRICS_PATH.exists():
-        print("Bias metrics file not found.")
-        return
-
-    df = pd.read_csv(BIAS_METRICS_PATH)
-    if df.empty:
-        print("Bias metrics file is empty.")
-        return
+    check_source_alerts("bias", "bias", "No significant bias detected.")
 
-    latest_batch = df.sort_values("timestamp")["batch"].iloc[-1]
-    batch_df = df[df["batch"] == latest_batch]
 
-    alerts_triggered = False
+def backfill_alerts(output_path: Path = ALERT_HISTORY_PATH):
+    """
+    Re-evaluate every rule over the full metric history
+    and save all raised alerts as a structured CSV.
+    """
+    alerts = evaluate_rules(load_rules(), load_sources())
 
-    for feature in batch_df["feature"].unique():
-        feature_df = batch_df[batch_df["feature"] == feature]
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    alerts.drop(columns=["fired"]).to_csv(output_path, index=False)
 
-        # Skip if only one group present
-        if feature_df["group"].nunique() < 2:
-            continue
+    print(f"Backfilled {len(alerts)} alerts to {output_path}")
+    return alerts
 
-        recall_gap = feature_df["recall"].max() - feature_df["recall"].min()
 
-        if recall_gap > BIAS_THRESHOLDS["max_recall_gap"]:
-            if not alerts_triggered:
-                print(f" BIAS ALERT ({latest_batch})")
-                alerts_triggered = True
+def run_all_alerts(backfill: bool = False):
+    print("\n RUNNING ALERT ENGINE")
+    events = evaluate_new_alerts(backfill=backfill)
 
-            print(f"  Feature: {feature}")
-            print(f"  Recall gap: {recall_gap:.3f}")
+    for event in events:
+        if event["event"] == FIRING:
+            print(f" {event['category'].upper()} ALERT ({event['batch']})")
+            print(f"  - {describe_alert(event)}")
+        elif event["event"] == RESOLVED:
+            print(f" RESOLVED {event['category'].upper()} ALERT ({event['batch']})")
+            print(f"  - {describe_alert(event)}")
 
-    if not alerts_triggered:
-        print("No significant bias detected.")
+    suppressed = sum(event["event"] == SUPPRESSED for event in events)
+    if suppressed:
+        print(f" {suppressed} alert(s) suppressed by cooldown")
 
+    if not events:
+        print("No new alerts since last run.")
 
-def run_all_alerts():
-    print("\n RUNNING ALERT ENGINE")
-    check_performance_alerts()
-    check_drift_alerts()
-    check_bias_alerts()
     print("\n ALERT CHECK COMPLETE")
 
 
 if __name__ == "__main__":
-    run_all_alerts()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--backfill", action="store_true",
+        help="evaluate the metric history of sources seen for the first time instead of only seeding them"
+    )
+    args = parser.parse_args()
+
+    run_all_alerts(backfill=args.backfill)
@@ -0,0 +1,222 @@
+"""
+Incremental Alert Evaluation
+
+Keeps a persisted watermark per metric source so each run reads only
+the metric rows appended since the previous run, and remembers which
+alerts are already open so a condition is paged once, not on every run.
+
+- Alerts are deduplicated by (rule, key), e.g. "recall_gap|SeniorCitizen"
+- A re-fire within the rule's cooldown window is logged, not paged
+- Every state change is appended to an event log (JSON lines)
+- A source seen for the first time only seeds its watermark, so the
+  first run does not page the whole history (backfill=True evaluates it)
+- Runs hold the state file's lock (metrics_store.store_lock), so
+  concurrent runs neither page twice nor lose each other's state
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from metrics_store import read_since, store_generation, store_lock
+from rule_engine import SOURCES, evaluate_rules, key_dtypes, load_rules, prepare_source
+
+# Paths
+STATE_PATH = Path("monitoring/alerts/alert_state.json")
+EVENT_LOG_PATH = Path("monitoring/alerts/alert_events.jsonl")
+
+# Event types written to the log
+FIRING = "FIRING"
+SUPPRESSED = "SUPPRESSED"
+RESOLVED = "RESOLVED"
+
+
+def load_state(path: Path = STATE_PATH) -> dict:
+    if not path.exists():
+        return {"watermarks": {}, "context": {}, "alerts": {}}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state: dict, path: Path = STATE_PATH):
+    """
+    Write state atomically so an interrupted run never leaves a partial file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, default=str)
+
+    os.replace(tmp_path, path)
+
+
+def append_events(events: list, path: Path = EVENT_LOG_PATH):
+    if not events:
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        for event in events:
+            f.write(json.dumps(event, default=str) + "\n")
+
+
+def read_new_rows(source: str, watermark: dict):
+    """
+    Read rows appended to a source since its watermark.
+    Returns (new_rows, updated_watermark).
+    """
+    path = SOURCES[source]["path"]
+    offset = watermark.get("offset", 0)
+    last_timestamp = watermark.get("timestamp")
+    generation = store_generation(path)
+
+    # Store was rewritten since the last run: rescan, keep only newer rows
+    rewritten = path.stat().st_size < offset or generation != watermark.get("generation", 0)
+    if rewritten:
+        offset = 0
+
+    rows, offset = read_since(path, offset, dtype=key_dtypes(source))
+
+    if rewritten and last_timestamp is not None:
+        rows = rows[pd.to_datetime(rows["timestamp"]) > pd.Timestamp(last_timestamp)]
+
+    if not rows.empty:
+        last_timestamp = str(pd.to_datetime(rows["timestamp"]).max())
+
+    return rows, {"offset": offset, "timestamp": last_timestamp, "generation": generation}
+
+
+def _context_size(rules: list) -> int:
+    """
+    Number of trailing batches kept between runs: rate-of-change rules
+    need earlier batches, the others only the batch in progress.
+    """
+    periods = [
+        rule.get("periods", 1)
+        for rule in rules
+        if rule["type"] == "rate_of_change"
+    ]
+    return max(periods, default=1)
+
+
+def _context_records(frame: pd.DataFrame, n_batches: int) -> list:
+    batches = frame["batch"].drop_duplicates().iloc[-n_batches:]
+    context = frame[frame["batch"].isin(batches)].drop(columns=["batch_timestamp"])
+    context = context.assign(timestamp=context["timestamp"].map(str))
+    return context.to_dict("records")
+
+
+def _event(event_type: str, dedup_key: str, row) -> dict:
+    return {
+        "event": event_type,
+        "dedup_key": dedup_key,
+        "rule": row.rule,
+        "category": row.category,
+        "severity": row.severity,
+        "batch": row.batch,
+        "batch_timestamp": str(row.batch_timestamp),
+        "key": row.key,
+        "value": row.value,
+        "threshold": row.threshold,
+        "message": row.message,
+        "detail": row.detail if isinstance(row.detail, str) else "",
+        "evaluated_at": str(datetime.utcnow()),
+    }
+
+
+def apply_transitions(evaluations: pd.DataFrame, alerts: dict, cooldowns: dict) -> list:
+    """
+    Update open/resolved alert state from evaluated rules (ordered by
+    batch time) and return the resulting events.
+    """
+    events = []
+
+    for row in evaluations.itertuples(index=False):
+        dedup_key = f"{row.rule}|{row.key}"
+        alert = alerts.get(dedup_key)
+        is_open = alert is not None and alert["status"] == "open"
+        seen_at = str(row.batch_timestamp)
+
+        if row.fired and is_open:
+            # Same condition still active: no new page
+            alert.update(last_seen_at=seen_at, last_seen_batch=row.batch, value=row.value)
+
+        elif row.fired:
+            last_notified = alert["last_notified_at"] if alert else None
+            cooling = (
+                last_notified is not None
+                and row.batch_timestamp - pd.Timestamp(last_notified)
+                < pd.Timedelta(minutes=cooldowns.get(row.rule, 0))
+            )
+
+            alerts[dedup_key] = {
+                "status": "open",
+                "rule": row.rule,
+                "key": row.key,
+                "opened_at": seen_at,
+                "last_seen_at": seen_at,
+                "last_seen_batch": row.batch,
+                "last_notified_at": last_notified if cooling else seen_at,
+                "value": row.value,
+            }
+            events.append(_event(SUPPRESSED if cooling else FIRING, dedup_key, row))
+
+        elif is_open:
+            alert.update(status="resolved", resolved_at=seen_at, value=row.value)
+            events.append(_event(RESOLVED, dedup_key, row))
+
+    return events
+
+
+def evaluate_new_alerts(
+    rules: list = None,
+    state_path: Path = STATE_PATH,
+    event_log_path: Path = EVENT_LOG_PATH,
+    backfill: bool = False,
+) -> list:
+    """
+    Evaluate alert rules over metric rows appended since the last run,
+    update alert state and append resulting events to the log.
+    Sources without a watermark are only seeded (watermark and trailing
+    context, no events) unless `backfill` is set.
+    """
+    rules = load_rules() if rules is None else rules
+    cooldowns = {rule["name"]: rule.get("cooldown_minutes", 0) for rule in rules}
+
+    events = []
+
+    with store_lock(state_path):
+        state = load_state(state_path)
+
+        for source in sorted({rule["source"] for rule in rules}):
+            if not SOURCES[source]["path"].exists():
+                continue
+
+            seeding = source not in state["watermarks"] and not backfill
+            watermark = state["watermarks"].get(source, {})
+            new_rows, state["watermarks"][source] = read_new_rows(source, watermark)
+            if new_rows.empty:
+                continue
+
+            # Carry the trailing batches so rules spanning batches see them
+            source_rules = [rule for rule in rules if rule["source"] == source]
+            context = pd.DataFrame(state["context"].get(source, []))
+            rows = pd.concat([context, new_rows], ignore_index=True) if not context.empty else new_rows
+            frame = prepare_source(rows, SOURCES[source]["keys"])
+
+            if not seeding:
+                evaluations = evaluate_rules(source_rules, {source: frame}, fired_only=False)
+                evaluations = evaluations[evaluations["batch"].isin(new_rows["batch"].unique())]
+                events += apply_transitions(evaluations, state["alerts"], cooldowns)
+
+            state["context"][source] = _context_records(frame, _context_size(source_rules))
+
+        append_events(events, event_log_path)
+        save_state(state, state_path)
+
+    return events
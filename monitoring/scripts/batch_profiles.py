@@ -0,0 +1,436 @@
+"""
+Batch Profiles
+
+Mergeable summaries of production batches. Drift and summary statistics
+for any group of batches (a day, a week, a hand-picked set) come from
+merging small stored profiles instead of re-reading the raw batches.
+
+- Numerical features: count, missing, sum, sum of squares, min, max and
+  a histogram over fixed edges derived once from the reference data
+  (plus an open bin below and above)
+- Categorical features: missing and per-category counts
+- merge_profiles is associative and commutative; means, stds, missing
+  rates and category frequencies of a merged profile equal those of the
+  concatenated batches
+- Numerical PSI uses the fixed reference edges, so it is comparable
+  across groups (data_drift.compute_psi re-derives edges per batch)
+- Profiles are written beside each batch (<batch>.profile.json) by
+  data_drift.py and rebuilt when the batch file or the reference changed
+
+Usage (from the repository root):
+    python monitoring/scripts/batch_profiles.py build
+    python monitoring/scripts/batch_profiles.py drift --period weekly
+    python monitoring/scripts/batch_profiles.py drift --batches production_batch_0 production_batch_1
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from drift_reports import REPORT_DIR, columnar_report, save_report
+from metrics_store import store_lock
+
+# Paths
+REFERENCE_PATH = Path("data/reference/reference_data.csv")
+PRODUCTION_DIR = Path("data/production_batches")
+REFERENCE_PROFILE_PATH = Path("data/reference/reference_profile.json")
+PROFILE_SUFFIX = ".profile.json"
+PROFILE_VERSION = 2  # bumped when the profiled columns change; stored profiles are rebuilt
+
+# Configuration
+ENTITY_ID_COLUMN = "customerID"
+TARGET_COLUMN = "Churn"  # not profiled: production batches may not be labelled yet
+HISTOGRAM_BINS = 10  # between the reference min and max, as data_drift.compute_psi
+EPSILON = 1e-6  # PSI smoothing, as in data_drift.py
+
+# Time-based batch names (split_reference_production.PERIODS), by suffix length
+BATCH_TIME_FORMATS = {8: "%Y%m%d", 10: "%Y%m%d%H"}
+GROUP_PERIODS = {"daily": "D", "weekly": "W", "monthly": "M"}
+
+
+# Profiles
+def histogram_edges(reference_df: pd.DataFrame) -> dict:
+    """
+    Fixed histogram edges of every numerical feature and the list of
+    categorical features, identified by a hash of their content.
+    """
+    numerical = {}
+    for feature in reference_df.select_dtypes(exclude=["object"]).columns:
+        values = reference_df[feature].dropna()
+        if values.empty:
+            numerical[feature] = [0.0]
+        else:
+            numerical[feature] = np.linspace(values.min(), values.max(), HISTOGRAM_BINS + 1).tolist()
+
+    categorical = list(reference_df.select_dtypes(include=["object"]).columns)
+
+    content = json.dumps({"numerical": numerical, "categorical": categorical}, sort_keys=True)
+    return {
+        "id": hashlib.sha256(content.encode()).hexdigest()[:16],
+        "numerical": numerical,
+        "categorical": categorical,
+    }
+
+
+def build_profile(df: pd.DataFrame, edges: dict) -> dict:
+    numerical = {}
+    for feature, inner in edges["numerical"].items():
+        column = df[feature]
+        values = column.dropna().to_numpy(dtype=float)
+        # Bin 0 is below the first edge, the last bin at or above the last
+        codes = np.searchsorted(inner, values, side="right")
+
+        numerical[feature] = {
+            "count": int(len(values)),
+            "missing": int(column.isna().sum()),
+            "sum": float(values.sum()),
+            "sum_squares": float(np.square(values).sum()),
+            "min": float(values.min()) if len(values) else None,
+            "max": float(values.max()) if len(values) else None,
+            "histogram": np.bincount(codes, minlength=len(inner) + 1).tolist(),
+        }
+
+    categorical = {}
+    for feature in edges["categorical"]:
+        column = df[feature]
+        categorical[feature] = {
+            "missing": int(column.isna().sum()),
+            "counts": {str(category): int(count) for category, count in column.value_counts().items()},
+        }
+
+    return {
+        "edges_id": edges["id"],
+        "rows": len(df),
+        "numerical": numerical,
+        "categorical": categorical,
+    }
+
+
+def merge_profiles(profiles) -> dict:
+    """
+    Profile of the union of the profiled batches.
+    """
+    profiles = list(profiles)
+    if not profiles:
+        raise ValueError("No profiles to merge")
+    if len({profile["edges_id"] for profile in profiles}) > 1:
+        raise ValueError("Profiles were built on different histogram edges")
+
+    numerical = {}
+    for feature in profiles[0]["numerical"]:
+        parts = [profile["numerical"][feature] for profile in profiles]
+        minimums = [part["min"] for part in parts if part["min"] is not None]
+        maximums = [part["max"] for part in parts if part["max"] is not None]
+
+        numerical[feature] = {
+            "count": sum(part["count"] for part in parts),
+            "missing": sum(part["missing"] for part in parts),
+            "sum": sum(part["sum"] for part in parts),
+            "sum_squares": sum(part["sum_squares"] for part in parts),
+            "min": min(minimums, default=None),
+            "max": max(maximums, default=None),
+            "histogram": np.sum([part["histogram"] for part in parts], axis=0).tolist(),
+        }
+
+    categorical = {}
+    for feature in profiles[0]["categorical"]:
+        parts = [profile["categorical"][feature] for profile in profiles]
+        counts = Counter()
+        for part in parts:
+            counts.update(part["counts"])
+
+        categorical[feature] = {
+            "missing": sum(part["missing"] for part in parts),
+            "counts": dict(counts),
+        }
+
+    return {
+        "edges_id": profiles[0]["edges_id"],
+        "rows": sum(profile["rows"] for profile in profiles),
+        "numerical": numerical,
+        "categorical": categorical,
+    }
+
+
+# Statistics
+def numerical_summary(part: dict) -> dict:
+    """
+    Mean, sample std (as pandas) and missing rate of a numerical feature.
+    """
+    count = part["count"]
+    total = count + part["missing"]
+    mean = part["sum"] / count if count else np.nan
+
+    if count > 1:
+        variance = max(part["sum_squares"] - count * mean * mean, 0.0) / (count - 1)
+        std = float(np.sqrt(variance))
+    else:
+        std = np.nan
+
+    return {
+        "mean": mean,
+        "std": std,
+        "missing_rate": part["missing"] / total if total else np.nan,
+    }
+
+
+def category_frequencies(part: dict) -> pd.Series:
+    counts = pd.Series(part["counts"], dtype=float)
+    return counts / max(counts.sum(), 1)
+
+
+def histogram_psi(reference: list, production: list) -> float:
+    ref_counts = np.asarray(reference, dtype=float)
+    prod_counts = np.asarray(production, dtype=float)
+
+    ref_dist = ref_counts / max(ref_counts.sum(), 1)
+    prod_dist = prod_counts / max(prod_counts.sum(), 1)
+
+    return float(np.sum((prod_dist - ref_dist) * np.log((prod_dist + EPSILON) / (ref_dist + EPSILON))))
+
+
+def categorical_psi(ref_freq: pd.Series, prod_freq: pd.Series) -> float:
+    """
+    Same convention as data_drift.compute_categorical_psi: categories
+    missing on one side count with frequency EPSILON.
+    """
+    categories = ref_freq.index.union(prod_freq.index)
+    r = ref_freq.reindex(categories).fillna(EPSILON).to_numpy()
+    p = prod_freq.reindex(categories).fillna(EPSILON).to_numpy()
+
+    return float(np.sum((p - r) * np.log(p / r)))
+
+
+def profile_drift(reference: dict, profile: dict) -> dict:
+    """
+    Drift signals of a (merged) profile against the reference profile,
+    shaped like data_drift.compute_batch_drift output (without the
+    bootstrap intervals and p-values, which need the raw rows).
+    """
+    if reference["edges_id"] != profile["edges_id"]:
+        raise ValueError("Profile and reference profile were built on different histogram edges")
+
+    drift = {}
+
+    for feature, part in profile["numerical"].items():
+        ref_part = reference["numerical"][feature]
+        ref_summary = numerical_summary(ref_part)
+        prod_summary = numerical_summary(part)
+
+        drift[feature] = {
+            "reference_mean": ref_summary["mean"],
+            "production_mean": prod_summary["mean"],
+            "mean_difference": prod_summary["mean"] - ref_summary["mean"],
+            "reference_std": ref_summary["std"],
+            "production_std": prod_summary["std"],
+            "reference_missing_rate": ref_summary["missing_rate"],
+            "production_missing_rate": prod_summary["missing_rate"],
+            "psi": histogram_psi(ref_part["histogram"], part["histogram"]),
+        }
+
+    for feature, part in profile["categorical"].items():
+        ref_freq = category_frequencies(reference["categorical"][feature])
+        prod_freq = category_frequencies(part)
+
+        drift[feature] = {
+            "psi": categorical_psi(ref_freq, prod_freq),
+            "distribution_shift": {
+                category: {
+                    "reference_freq": float(ref_freq.get(category, 0.0)),
+                    "production_freq": float(prod_freq.get(category, 0.0)),
+                }
+                for category in ref_freq.index.union(prod_freq.index)
+            },
+        }
+
+    return drift
+
+
+# Storage
+def profile_path(batch_file: Path) -> Path:
+    return batch_file.with_name(batch_file.stem + PROFILE_SUFFIX)
+
+
+def _source(path: Path) -> dict:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _write_json(path: Path, content: dict):
+    """
+    Replace a JSON file atomically; concurrent writers each use their
+    own temporary file.
+    """
+    with tempfile.NamedTemporaryFile("w", dir=path.parent, suffix=".tmp", delete=False) as f:
+        json.dump(content, f)
+    os.replace(f.name, path)
+
+
+def _read_json(path: Path):
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _stored_reference_profile(reference_path: Path, profile_path: Path):
+    """
+    Stored (edges, profile) if it is current, else None.
+    """
+    stored = _read_json(profile_path)
+    if (
+        stored is not None
+        and stored.get("version") == PROFILE_VERSION
+        and stored["source"] == _source(reference_path)
+    ):
+        return stored["edges"], stored["profile"]
+    return None
+
+
+def reference_profile(reference_path: Path = REFERENCE_PATH, profile_path: Path = REFERENCE_PROFILE_PATH) -> tuple:
+    """
+    (edges, profile) of the reference data, rebuilt when the reference
+    file changed. Only one process rebuilds it; the others wait and
+    read the result.
+    """
+    stored = _stored_reference_profile(reference_path, profile_path)
+    if stored is not None:
+        return stored
+
+    with store_lock(profile_path):
+        stored = _stored_reference_profile(reference_path, profile_path)
+        if stored is not None:
+            return stored
+        return _build_reference_profile(reference_path, profile_path)
+
+
+def _build_reference_profile(reference_path: Path, profile_path: Path) -> tuple:
+    reference_df = pd.read_csv(reference_path).drop(columns=[ENTITY_ID_COLUMN, TARGET_COLUMN], errors="ignore")
+    edges = histogram_edges(reference_df)
+    profile = build_profile(reference_df, edges)
+
+    _write_json(profile_path, {
+        "version": PROFILE_VERSION,
+        "source": _source(reference_path),
+        "edges": edges,
+        "profile": profile,
+    })
+    return edges, profile
+
+
+def save_batch_profile(batch_file: Path, df: pd.DataFrame, edges: dict) -> dict:
+    """
+    Profile a batch that is already loaded and store it beside the batch.
+    """
+    profile = build_profile(df, edges)
+    _write_json(profile_path(batch_file), {"source": _source(batch_file), **profile})
+    return profile
+
+
+def load_batch_profile(batch_file: Path, edges: dict) -> dict:
+    """
+    Stored profile of a batch; the batch is re-read only when it has no
+    profile, changed since it was profiled (late rows appended to a
+    time-based batch) or was profiled on other edges.
+    """
+    stored = _read_json(profile_path(batch_file))
+    if stored is not None:
+        source = stored.pop("source")
+        if stored["edges_id"] == edges["id"] and source == _source(batch_file):
+            return stored
+
+    return save_batch_profile(batch_file, pd.read_csv(batch_file), edges)
+
+
+# Grouping
+def batch_period(batch: str, period: str):
+    """
+    Period of a time-based batch (production_batch_<YYYYmmdd[HH]>), or
+    None for batches split by row count.
+    """
+    suffix = batch.rsplit("_", 1)[-1]
+    time_format = BATCH_TIME_FORMATS.get(len(suffix))
+    if time_format is None or not suffix.isdigit():
+        return None
+
+    return pd.Timestamp(datetime.strptime(suffix, time_format)).to_period(GROUP_PERIODS[period])
+
+
+def batch_groups(batch_files: list, period: str = None) -> tuple:
+    """
+    ({group: [batch files]}, skipped batch names). Without a period all
+    batches form one group.
+    """
+    groups = {}
+    skipped = []
+
+    for batch_file in batch_files:
+        key = "all" if period is None else batch_period(batch_file.stem, period)
+        if key is None:
+            skipped.append(batch_file.stem)
+            continue
+        groups.setdefault(str(key), []).append(batch_file)
+
+    return dict(sorted(groups.items())), skipped
+
+
+def grouped_drift(period: str = None, batches: list = None, production_dir: Path = PRODUCTION_DIR) -> tuple:
+    """
+    Drift of every batch group from merged profiles.
+    Returns ({group: drift}, skipped batch names).
+    """
+    edges, reference = reference_profile()
+
+    batch_files = sorted(production_dir.glob("production_batch_*.csv"))
+    if batches:
+        batches = set(batches)
+        batch_files = [batch_file for batch_file in batch_files if batch_file.stem in batches]
+
+    groups, skipped = batch_groups(batch_files, period)
+    drift = {
+        group: profile_drift(reference, merge_profiles(load_batch_profile(batch_file, edges) for batch_file in files))
+        for group, files in groups.items()
+    }
+    return drift, skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "drift"])
+    parser.add_argument("--period", choices=sorted(GROUP_PERIODS), default=None,
+                        help="group time-based batches by period (default: one group)")
+    parser.add_argument("--batches", nargs="+", default=None, help="batch names (default: all)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        edges, _ = reference_profile()
+        batch_files = sorted(PRODUCTION_DIR.glob("production_batch_*.csv"))
+        for batch_file in batch_files:
+            load_batch_profile(batch_file, edges)
+        print(f"Batch profiles up to date ({len(batch_files)} batches)")
+    else:
+        drift, skipped = grouped_drift(args.period, args.batches)
+        if skipped:
+            print(f"Skipped {len(skipped)} batch(es) without a time-based name")
+        if not drift:
+            raise SystemExit("No batches to profile")
+
+        report = columnar_report(drift)
+        report_path = REPORT_DIR / f"drift_rollup_{args.period or 'group'}.npz"
+        save_report(report, report_path)
+
+        psi = pd.DataFrame(
+            report["values"][:, :, list(report["statistics"]).index("psi")],
+            index=report["batches"],
+            columns=report["features"],
+        )
+        print(psi.round(4).to_string())
+        print(f"Saved grouped drift report: {report_path}")
@@ -0,0 +1,112 @@
+"""
+Batch Scoring
+
+Shared by performance and bias monitoring: each production batch is read
+and schema-fixed once, then scored by every monitored model version.
+
+- Monitored models are the registry champion plus its challengers
+- Models whose fitted preprocessing is identical (same preprocessing
+  hash) share one feature transform per batch; only the classifiers
+  run separately
+- The entity ID (customerID) identifies records in the prediction log
+  and is never passed to a model
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+import model_registry
+
+# Paths
+PRODUCTION_BATCH_DIR = Path("data/production_batches")
+
+# Configuration
+TARGET_COLUMN = "Churn"
+ENTITY_ID_COLUMN = "customerID"
+MONITORED_STAGES = ["champion", "challenger"]
+
+
+def monitored_models(versions=None) -> list:
+    """
+    Registry entries and loaded models to score, champion first.
+    `versions` restricts scoring to the given versions.
+    """
+    index = model_registry.ensure_baseline()
+    entries = [
+        entry for entry in index["versions"].values()
+        if (entry["version"] in versions if versions is not None else entry["stage"] in MONITORED_STAGES)
+    ]
+    entries.sort(key=lambda entry: entry["stage"] != "champion")
+
+    return [(entry, model_registry.load(entry["version"])[1]) for entry in entries]
+
+
+def read_batch(batch_file: Path) -> pd.DataFrame:
+    df = pd.read_csv(batch_file)
+
+    # Enforcing schema consistency (matches training); missing labels
+    # stay missing until they arrive (label_ingestion.py)
+    for col in df.select_dtypes(include=["object"]).columns:
+        if col != TARGET_COLUMN:
+            df[col] = df[col].astype(str)
+
+    return df
+
+
+def feature_frame(df: pd.DataFrame) -> pd.DataFrame:
+    return df.drop(columns=[TARGET_COLUMN, ENTITY_ID_COLUMN], errors="ignore")
+
+
+def entity_ids(df: pd.DataFrame, batch: str) -> pd.Series:
+    """
+    Entity ID per record; data cleaned before IDs were kept falls back
+    to the record's position in its batch.
+    """
+    if ENTITY_ID_COLUMN in df.columns:
+        return df[ENTITY_ID_COLUMN].astype(str)
+
+    return pd.Series([f"{batch}/{i}" for i in range(len(df))], index=df.index)
+
+
+def batch_labels(df: pd.DataFrame) -> pd.Series:
+    """
+    Ground truth of a batch, missing where labels have not arrived yet.
+    """
+    if TARGET_COLUMN in df.columns:
+        return df[TARGET_COLUMN]
+
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def predict_all(X: pd.DataFrame, models: list) -> dict:
+    """
+    Predictions of every model for one feature frame.
+    Returns {version: (y_pred, y_pred_proba)}.
+    """
+    predictions = {}
+    transformed = {}
+
+    for entry, model in models:
+        key = entry["preprocessing_hash"]
+        if key not in transformed:
+            transformed[key] = model.named_steps["preprocessing"].transform(X)
+
+        classifier = model.named_steps["classifier"]
+        predictions[entry["version"]] = (
+            classifier.predict(transformed[key]),
+            classifier.predict_proba(transformed[key])[:, 1],
+        )
+
+    return predictions
+
+
+def score_batches(models: list, batch_dir: Path = PRODUCTION_BATCH_DIR):
+    """
+    Yield (batch_name, batch_df, predictions) for every production
+    batch, scored by all `models` (from monitored_models).
+    """
+    for batch_file in sorted(batch_dir.glob("production_batch_*.csv")):
+        df = read_batch(batch_file)
+        predictions = predict_all(feature_frame(df), models)
+        yield batch_file.stem, df, predictions
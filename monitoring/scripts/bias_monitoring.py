@@ -2,17 +2,32 @@
 Computes group-wise recall for sensitive attributes
 and stores results as a time-series CSV for alerting
 and auditing.
+
+Every monitored model (champion plus challengers) is evaluated
+over the same batch read (batch_scoring.py).
+
+Group recalls and the recall gap within each sensitive feature carry
+bootstrap confidence intervals (see bootstrap.py).
+
+Intersections of sensitive features (e.g. gender & SeniorCitizen) are
+stored like single features, with "&"-joined feature and group names
+and their `order`; gap rules and the recommender therefore report a
+gap per intersection.
 """
 
+import argparse
+from itertools import combinations
+
+import numpy as np
 import pandas as pd
 from pathlib import Path
-import joblib
 from datetime import datetime
-from sklearn.metrics import recall_score
+
+from batch_scoring import TARGET_COLUMN, batch_labels, monitored_models, score_batches
+from bootstrap import interval, poisson_weights, weighted_sums
+from metrics_store import append_rows
 
 # Paths
-MODEL_PATH = Path("models/baseline_model.joblib")
-PRODUCTION_BATCH_DIR = Path("data/production_batches")
 BIAS_METRICS_PATH = Path("monitoring/metrics_store/bias_metrics.csv")
 
 BIAS_METRICS_PATH.parent.mkdir(parents=True, exist_ok=True)
@@ -21,57 +36,198 @@ BIAS_METRICS_PATH.parent.mkdir(parents=True, exist_ok=True)
 POSITIVE_LABEL = "Yes"
 SENSITIVE_FEATURES = ["gender", "SeniorCitizen", "Partner"]
 MIN_GROUP_SIZE = 30
+# Largest number of sensitive features intersected (all of them)
+MAX_INTERSECTION_ORDER = len(SENSITIVE_FEATURES)
+
+
+def _cells(df: pd.DataFrame, features: list):
+    """
+    Finest intersection cell of every record: (cell ids, cell x feature
+    code table, per-feature vocabularies). Only cells present get an id.
+    A missing value gets the code len(vocabulary) of its feature.
+    """
+    codes, vocabularies = [], []
+    for feature in features:
+        feature_codes, vocabulary = pd.factorize(df[feature], sort=True)
+        codes.append(np.where(feature_codes < 0, len(vocabulary), feature_codes))
+        vocabularies.append(vocabulary)
+
+    shape = [len(v) + 1 for v in vocabularies]
+    flat = np.ravel_multi_index(codes, shape)
+    cell_ids, cell_keys = pd.factorize(flat)
+    cell_table = np.column_stack(np.unravel_index(cell_keys, shape))
+
+    return cell_ids, cell_table, vocabularies
+
+
+def _project(table: np.ndarray, columns) -> np.ndarray:
+    """
+    Group id per row of `table` restricted to `columns`, plus the keys.
+    """
+    keys, group_ids = np.unique(table[:, list(columns)], axis=0, return_inverse=True)
+    return group_ids.ravel(), keys
+
+
+def group_recalls(df: pd.DataFrame, y_pred, weights) -> list:
+    """
+    Recall of every sensitive group and intersection of groups (e.g.
+    gender & SeniorCitizen) in one batch, with bootstrap bounds for each
+    recall and for the recall gap within each feature combination.
+
+    Confusion counts are aggregated once per finest cell; every
+    combination is a rollup of those cells. Combinations are expanded
+    level by level from supported groups only (apriori): a group can
+    only reach MIN_GROUP_SIZE if all its parent groups do. Records
+    missing a feature are left out of that feature's groups (as
+    groupby does), not out of the batch.
+    """
+    actual = (df[TARGET_COLUMN] == POSITIVE_LABEL).to_numpy(dtype=float)
+    predicted = (y_pred == POSITIVE_LABEL).astype(float)
+
+    cell_ids, cell_table, vocabularies = _cells(df, SENSITIVE_FEATURES)
+    n_cells = len(cell_table)
+    missing_codes = np.array([len(vocabulary) for vocabulary in vocabularies])
+
+    size = np.bincount(cell_ids, minlength=n_cells)
+    positives = np.bincount(cell_ids, weights=actual, minlength=n_cells)
+    true_positives = np.bincount(cell_ids, weights=actual * predicted, minlength=n_cells)
+
+    # Bootstrap counts per cell (replicates x cells), one product each
+    membership = np.eye(n_cells)[cell_ids]
+    sample_positives = weighted_sums(weights, membership * actual[:, None])
+    sample_true_positives = weighted_sums(weights, membership * (actual * predicted)[:, None])
+
+    supported = {}
+    records = []
+
+    for order in range(1, MAX_INTERSECTION_ORDER + 1):
+        for combination in combinations(range(len(SENSITIVE_FEATURES)), order):
+            parents = list(combinations(combination, order - 1)) if order > 1 else []
+            if any(not len(supported.get(parent, [])) for parent in parents):
+                continue
 
-# Loading model
-model = joblib.load(MODEL_PATH)
+            # Only cells inside a supported group of every parent
+            cells = np.ones(n_cells, dtype=bool)
+            for parent in parents:
+                parent_keys = cell_table[:, list(parent)]
+                cells &= (parent_keys[:, None, :] == supported[parent][None, :, :]).all(axis=2).any(axis=1)
+            cells = np.flatnonzero(cells)
+            if not len(cells):
+                supported[combination] = np.empty((0, order), dtype=int)
+                continue
 
-records = []
+            group_ids, keys = _project(cell_table[cells], combination)
+            rollup = np.eye(len(keys))[group_ids]
 
-# Processing production batches
-for batch_file in sorted(PRODUCTION_BATCH_DIR.glob("production_batch_*.csv")):
-    df = pd.read_csv(batch_file)
+            group_size = size[cells] @ rollup
+            keep = (group_size >= MIN_GROUP_SIZE) & (keys != missing_codes[list(combination)]).all(axis=1)
+            supported[combination] = keys[keep]
+            if not keep.any():
+                continue
 
-    # Schema consistency (must be same training)
-    for col in df.select_dtypes(include=["object"]).columns:
-        df[col] = df[col].astype(str)
+            group_positives = positives[cells] @ rollup
+            group_true_positives = true_positives[cells] @ rollup
+            # Groups without positives score 0, as recall_score does
+            recall = np.divide(
+                group_true_positives, group_positives,
+                out=np.zeros(len(keys)), where=group_positives > 0
+            )
 
-    X_all = df.drop(columns=["Churn"])
-    y_all = df["Churn"]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                samples = (
+                    (sample_true_positives[:, cells] @ rollup)[:, keep]
+                    / (sample_positives[:, cells] @ rollup)[:, keep]
+                )
+            lower, upper = interval(samples)
+            gap_lower, gap_upper = np.nan, np.nan
+            if keep.sum() > 1:
+                gap_lower, gap_upper = interval(np.nanmax(samples, axis=1) - np.nanmin(samples, axis=1))
+
+            feature = "&".join(SENSITIVE_FEATURES[f] for f in combination)
+            for k, key in enumerate(keys[keep]):
+                records.append({
+                    "feature": feature,
+                    "group": "&".join(str(vocabularies[f][code]) for f, code in zip(combination, key)),
+                    "group_size": int(group_size[keep][k]),
+                    "recall": recall[keep][k],
+                    "recall_lower": lower[k],
+                    "recall_upper": upper[k],
+                    "recall_gap_lower": gap_lower,
+                    "recall_gap_upper": gap_upper,
+                    "order": order,
+                })
+
+    return records
+
+
+def bias_records(batch: str, df: pd.DataFrame, predictions: dict, stages: dict) -> list:
+    """
+    Group recall rows of every model for the labelled records of a batch
+    (`predictions` aligned with `df`).
+    """
+    # One set of resamples per batch, shared by all models
+    weights = poisson_weights(len(df))
+    records = []
+
+    for model_version, (y_pred, _) in predictions.items():
+        for record in group_recalls(df, y_pred, weights):
+            records.append({
+                "timestamp": datetime.utcnow(),
+                "batch": batch,
+                **record,
+                "model_version": model_version,
+                "stage": stages.get(model_version)
+            })
 
-    y_pred_all = model.predict(X_all)
+    return records
 
-    # Group-wise evaluation
-    for feature in SENSITIVE_FEATURES:
-        for group_value in df[feature].unique():
 
-            mask = df[feature] == group_value
-            group_size = mask.sum()
+def evaluate_batch(batch: str, df: pd.DataFrame, predictions: dict, stages: dict) -> list:
+    """
+    Group recall rows of a scored batch over its labelled records.
+    """
+    labelled = batch_labels(df).notna().to_numpy()
+    if not labelled.any():
+        return []
 
-            if group_size < MIN_GROUP_SIZE:
-                continue
+    labelled_predictions = {
+        model_version: (y_pred[labelled], y_pred_proba[labelled])
+        for model_version, (y_pred, y_pred_proba) in predictions.items()
+    }
+    return bias_records(batch, df[labelled], labelled_predictions, stages)
 
-            recall = recall_score(
-                y_all[mask],
-                y_pred_all[mask],
-                pos_label=POSITIVE_LABEL
-            )
 
-            records.append({
-                "timestamp": datetime.utcnow(),
-                "batch": batch_file.stem,
-                "feature": feature,
-                "group": str(group_value),
-                "group_size": group_size,
-                "recall": recall
-            })
+def monitor_bias(versions=None) -> pd.DataFrame:
+    """
+    Evaluate group-wise recall of every monitored model on the labelled
+    records of every production batch and append the results to the
+    store. Late labels are picked up by label_ingestion.py.
+    """
+    models = monitored_models(versions)
+    stages = {entry["version"]: entry["stage"] for entry, _ in models}
+
+    records = []
+
+    for batch, df, predictions in score_batches(models):
+        records += evaluate_batch(batch, df, predictions, stages)
+
+    # Persist metrics
+    bias_df = pd.DataFrame(records)
+
+    if not bias_df.empty:
+        append_rows(BIAS_METRICS_PATH, bias_df)
+
+    return bias_df
+
 
-# Persist metrics
-bias_df = pd.DataFrame(records)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--models", nargs="+", default=None,
+        help="model versions to evaluate (default: champion and challengers)"
+    )
+    args = parser.parse_args()
 
-if not bias_df.empty:
-    if BIAS_METRICS_PATH.exists():
-        bias_df.to_csv(BIAS_METRICS_PATH, mode="a", header=False, index=False)
-    else:
-        bias_df.to_csv(BIAS_METRICS_PATH, index=False)
+    monitor_bias(args.models)
 
-print("Bias & fairness monitoring completed successfully.")
\ No newline at end of file
+    print("Bias & fairness monitoring completed successfully.")
@@ -0,0 +1,410 @@
+"""
+Concept Drift Detection
+
+Streaming detectors over the per-record prediction-error stream, run
+inside performance monitoring so degradation is located within a batch
+instead of one batch late.
+
+- ADWIN, DDM and EDDM consume the error indicator (prediction != label);
+  Page-Hinkley consumes the score residual |label - score|
+- Every update is O(1) amortised with bounded memory (ADWIN keeps an
+  exponential histogram of O(log window) buckets and only checks for
+  a cut every `clock` records)
+- Detector state is checkpointed per model version between runs,
+  with the entity IDs streamed per batch: re-runs skip records already
+  seen, and labels arriving late (label_ingestion.py) feed only the
+  newly labelled records
+- One row per (batch, model, detector) goes to the metrics store with
+  the number and in-batch positions of change points, cumulative over
+  every record of the batch streamed so far (readers keep the latest)
+- Checkpoints are kept for the MAX_TRACKED_BATCHES most recently
+  streamed batches; labels for an older batch are streamed as new
+"""
+
+import json
+import math
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Paths
+STATE_PATH = Path("monitoring/concept_drift/detector_state.json")
+CONCEPT_DRIFT_PATH = Path("monitoring/metrics_store/concept_drift_metrics.csv")
+
+# Configuration
+POSITIVE_LABEL = "Yes"
+MAX_TRACKED_BATCHES = 200
+
+# Detector signals
+WARNING = "warning"
+DRIFT = "drift"
+
+
+class Adwin:
+    """
+    ADWIN (Bifet & Gavalda): keeps the longest recent window whose two
+    sub-windows have statistically equal means, dropping the oldest
+    data when they differ.
+    """
+    stream = "error"
+
+    def __init__(self, delta: float = 0.002, max_buckets: int = 5, min_window: int = 32, clock: int = 32):
+        self.delta = delta
+        self.max_buckets = max_buckets
+        self.min_window = min_window
+        self.clock = clock
+        # levels[i] holds [total, variance] buckets of 2**i records, oldest first
+        self.levels = [[]]
+        self.width = 0
+        self.total = 0.0
+        self.variance = 0.0
+        self.ticks = 0
+
+    @property
+    def estimate(self) -> float:
+        return self.total / self.width if self.width else np.nan
+
+    def update(self, x: float):
+        if self.width:
+            mean = self.total / self.width
+            self.variance += self.width * (x - mean) ** 2 / (self.width + 1)
+        self.width += 1
+        self.total += x
+        self.levels[0].append([x, 0.0])
+        self._compress()
+
+        self.ticks += 1
+        if self.ticks % self.clock == 0 and self.width > self.min_window and self._shrink():
+            return DRIFT
+        return None
+
+    def _compress(self):
+        for i, level in enumerate(self.levels):
+            if len(level) <= self.max_buckets:
+                break
+
+            # Merge the two oldest buckets of this level into the next one
+            (t1, v1), (t2, v2) = level[0], level[1]
+            n = 2 ** i
+            merged = [t1 + t2, v1 + v2 + n * n * (t1 / n - t2 / n) ** 2 / (2 * n)]
+            del level[:2]
+            if i + 1 == len(self.levels):
+                self.levels.append([])
+            self.levels[i + 1].append(merged)
+
+    def _buckets(self):
+        """
+        (level, bucket) pairs from the oldest record to the newest.
+        """
+        for i in range(len(self.levels) - 1, -1, -1):
+            for bucket in self.levels[i]:
+                yield i, bucket
+
+    def _cut_found(self) -> bool:
+        variance = self.variance / self.width
+        log_term = math.log(2 * math.log(self.width) / self.delta)
+        n0, t0 = 0, 0.0
+
+        for i, (total, _) in self._buckets():
+            n0 += 2 ** i
+            t0 += total
+            n1 = self.width - n0
+            if n1 < 5:
+                break
+            if n0 < 5:
+                continue
+
+            m = 1 / (1 / n0 + 1 / n1)
+            epsilon = math.sqrt(2 / m * variance * log_term) + 2 / (3 * m) * log_term
+            if abs(t0 / n0 - (self.total - t0) / n1) > epsilon:
+                return True
+
+        return False
+
+    def _drop_oldest(self):
+        i = len(self.levels) - 1
+        while not self.levels[i]:
+            i -= 1
+        total, variance = self.levels[i].pop(0)
+        n = 2 ** i
+
+        rest = self.width - n
+        rest_mean = (self.total - total) / rest
+        self.variance -= variance + n * rest / self.width * (total / n - rest_mean) ** 2
+        self.variance = max(self.variance, 0.0)
+        self.width = rest
+        self.total -= total
+
+        while len(self.levels) > 1 and not self.levels[-1]:
+            self.levels.pop()
+
+    def _shrink(self) -> bool:
+        changed = False
+        while self.width > self.min_window and self._cut_found():
+            self._drop_oldest()
+            changed = True
+        return changed
+
+
+class PageHinkley:
+    """
+    Page-Hinkley test for an increase in the mean of the stream.
+    """
+    stream = "residual"
+
+    def __init__(self, delta: float = 0.005, threshold: float = 25.0, alpha: float = 0.9999, min_instances: int = 30):
+        self.delta = delta
+        self.threshold = threshold
+        self.alpha = alpha
+        self.min_instances = min_instances
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.mean = 0.0
+        self.cumulative = 0.0
+        self.minimum = 0.0
+
+    @property
+    def estimate(self) -> float:
+        return self.mean if self.n else np.nan
+
+    def update(self, x: float):
+        self.n += 1
+        self.mean += (x - self.mean) / self.n
+        self.cumulative = self.alpha * self.cumulative + (x - self.mean - self.delta)
+        self.minimum = min(self.minimum, self.cumulative)
+
+        if self.n >= self.min_instances and self.cumulative - self.minimum > self.threshold:
+            self.reset()
+            return DRIFT
+        return None
+
+
+class DDM:
+    """
+    Drift Detection Method (Gama et al.): error rate p with standard
+    deviation s, compared against the best p + s seen so far.
+    """
+    stream = "error"
+
+    def __init__(self, warning_level: float = 2.0, drift_level: float = 3.0, min_instances: int = 30):
+        self.warning_level = warning_level
+        self.drift_level = drift_level
+        self.min_instances = min_instances
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.p = 0.0
+        self.p_min = math.inf
+        self.s_min = math.inf
+
+    @property
+    def estimate(self) -> float:
+        return self.p if self.n else np.nan
+
+    def update(self, x: float):
+        self.n += 1
+        self.p += (x - self.p) / self.n
+        s = math.sqrt(self.p * (1 - self.p) / self.n)
+
+        if self.n < self.min_instances:
+            return None
+
+        if self.p + s < self.p_min + self.s_min:
+            self.p_min, self.s_min = self.p, s
+
+        if self.p + s > self.p_min + self.drift_level * self.s_min:
+            self.reset()
+            return DRIFT
+        if self.p + s > self.p_min + self.warning_level * self.s_min:
+            return WARNING
+        return None
+
+
+class EDDM:
+    """
+    Early Drift Detection Method (Baena-Garcia et al.): tracks the
+    distance between consecutive errors, which shrinks under gradual
+    drift before the error rate itself moves much.
+    """
+    stream = "error"
+
+    def __init__(self, warning_ratio: float = 0.95, drift_ratio: float = 0.90, min_errors: int = 30):
+        self.warning_ratio = warning_ratio
+        self.drift_ratio = drift_ratio
+        self.min_errors = min_errors
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.last_error = None
+        self.errors = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.level_max = 0.0
+
+    @property
+    def estimate(self) -> float:
+        return self.mean if self.errors else np.nan
+
+    def update(self, x: float):
+        self.n += 1
+        if not x:
+            return None
+
+        if self.last_error is not None:
+            distance = self.n - self.last_error
+            self.errors += 1
+            delta = distance - self.mean
+            self.mean += delta / self.errors
+            self.m2 += delta * (distance - self.mean)
+        self.last_error = self.n
+
+        if self.errors < self.min_errors:
+            return None
+
+        level = self.mean + 2 * math.sqrt(self.m2 / self.errors)
+        if level > self.level_max:
+            self.level_max = level
+            return None
+
+        ratio = level / self.level_max
+        if ratio < self.drift_ratio:
+            self.reset()
+            return DRIFT
+        if ratio < self.warning_ratio:
+            return WARNING
+        return None
+
+
+DETECTORS = {
+    "adwin": Adwin,
+    "page_hinkley": PageHinkley,
+    "ddm": DDM,
+    "eddm": EDDM,
+}
+
+
+def detector_state(detector) -> dict:
+    return dict(vars(detector))
+
+
+def restore_detector(name: str, state: dict):
+    detector = DETECTORS[name].__new__(DETECTORS[name])
+    detector.__dict__.update(state)
+    return detector
+
+
+def load_state(path: Path = STATE_PATH) -> dict:
+    if not path.exists():
+        return {"models": {}}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state: dict, path: Path = STATE_PATH):
+    """
+    Write state atomically so an interrupted run never leaves a partial file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, default=str)
+
+    os.replace(tmp_path, path)
+
+
+def error_streams(y_true: pd.Series, y_pred, y_score) -> dict:
+    """
+    Per-record streams of labelled records, in batch order.
+    """
+    actual = (y_true == POSITIVE_LABEL).to_numpy(dtype=float)
+    return {
+        "error": (np.asarray(y_pred) != y_true.to_numpy()).astype(float),
+        "residual": np.abs(actual - np.asarray(y_score, dtype=float)),
+    }
+
+
+def streamed_batches(model_state: dict) -> dict:
+    """
+    {batch: checkpoint} of a model's detectors, least recently streamed
+    first. State saved before per-record checkpoints listed batch names
+    only; those batches count as fully streamed (checkpoint None).
+    """
+    if isinstance(model_state["batches"], list):
+        model_state["batches"] = {batch: None for batch in model_state["batches"]}
+    return model_state["batches"]
+
+
+def stream_batch(batch: str, entity_ids, positions, y_true: pd.Series, predictions: dict, stages: dict, state: dict) -> list:
+    """
+    Feed the labelled records of a batch (`entity_ids` at `positions`
+    within it, in batch order) to every model's detectors and summarise
+    them per detector. Records a model's detectors have already seen
+    are skipped; models with no new record get no row.
+    """
+    entity_ids = np.asarray(entity_ids, dtype=str)
+    positions = np.asarray(positions)
+    timestamp = datetime.utcnow()
+    records = []
+
+    for model_version, (y_pred, y_score) in predictions.items():
+        model_state = state["models"].setdefault(model_version, {"batches": {}, "detectors": {}})
+        batches = streamed_batches(model_state)
+        if batch in batches and batches[batch] is None:
+            continue
+
+        # Re-inserted last: the least recently streamed batches are dropped first
+        checkpoint = batches.pop(batch, None) or {"entities": [], "detectors": {}}
+        batches[batch] = checkpoint
+        while len(batches) > MAX_TRACKED_BATCHES:
+            del batches[next(iter(batches))]
+
+        new = ~np.isin(entity_ids, checkpoint["entities"])
+        if not new.any():
+            continue
+        streams = error_streams(y_true[new], np.asarray(y_pred)[new], np.asarray(y_score)[new])
+
+        for name, detector_class in DETECTORS.items():
+            saved = model_state["detectors"].get(name)
+            detector = restore_detector(name, saved) if saved else detector_class()
+
+            signals = [detector.update(x) for x in streams[detector_class.stream].tolist()]
+            summary = checkpoint["detectors"].setdefault(
+                name, {"records": 0, "change_positions": [], "warnings": 0}
+            )
+            summary["records"] += len(signals)
+            summary["change_positions"] = sorted(
+                summary["change_positions"] + positions[new][[signal == DRIFT for signal in signals]].tolist()
+            )
+            summary["warnings"] += signals.count(WARNING)
+            change_points = summary["change_positions"]
+
+            records.append({
+                "timestamp": timestamp,
+                "batch": batch,
+                "model_version": model_version,
+                "stage": stages.get(model_version),
+                "detector": name,
+                "stream": detector_class.stream,
+                "records": summary["records"],
+                "change_points": len(change_points),
+                "first_change_point": change_points[0] if change_points else np.nan,
+                "change_positions": ";".join(map(str, change_points)),
+                "warnings": summary["warnings"],
+                # Window error rate (ADWIN), mean residual (Page-Hinkley),
+                # error rate (DDM) or mean distance between errors (EDDM)
+                "estimate": detector.estimate,
+            })
+            model_state["detectors"][name] = detector_state(detector)
+
+        checkpoint["entities"] += entity_ids[new].tolist()
+
+    return records
@@ -3,24 +3,49 @@ This module computes feature-level drift signals by comparing
 reference data against production batches.
 
 - This file logs raw diagnostic signals (means, stds, missing rates, PSI).
+- The label (Churn) is tracked like a categorical feature (label drift)
+  over the labelled records of a batch, and skipped while a batch has
+  no labels.
 - Drift decisions and thresholds are applied downstream
   in drift_severity.py.
+- PSI carries a bootstrap confidence interval (psi_lower / psi_upper)
+  over resamples of the production batch; it is a basic (bias-corrected)
+  interval that always contains the PSI itself.
+- PSI carries a permutation-test p-value (psi_p_value), computed for
+  all batches and features in a process pool (drift_significance.py).
+- Reports are written as one columnar batches x features x statistics
+  array (drift_reports.py); the verbose per-batch JSON is optional
+  (--json).
+- Every batch read is also profiled (batch_profiles.py), so drift over
+  days or weeks of batches merges stored profiles instead of re-reading
+  them.
 """
 
+import argparse
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
+from batch_profiles import reference_profile, save_batch_profile
+from bootstrap import basic_interval, poisson_weights, weighted_counts
+from drift_reports import REPORT_DIR, REPORT_PATH, columnar_report, save_json_reports, save_report
+from drift_significance import drift_p_values, psi_bin_codes, psi_binning, psi_codes
+
 
 # Paths
 REFERENCE_PATH = Path("data/reference/reference_data.csv")
 PRODUCTION_DIR = Path("data/production_batches")
-OUTPUT_DIR = Path("monitoring/drift_reports")
+OUTPUT_DIR = REPORT_DIR
 
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-# Loading reference data
-reference_df = pd.read_csv(REFERENCE_PATH)
+# Configuration
+ENTITY_ID_COLUMN = "customerID"
+TARGET_COLUMN = "Churn"
+
+# Loading reference data (the entity ID is not a feature; the label is
+# kept for label drift, see compute_batch_drift)
+reference_df = pd.read_csv(REFERENCE_PATH).drop(columns=[ENTITY_ID_COLUMN], errors="ignore")
 
 categorical_features = reference_df.select_dtypes(include=["object"]).columns
 numerical_features = reference_df.select_dtypes(exclude=["object"]).columns
@@ -30,7 +55,8 @@ numerical_features = reference_df.select_dtypes(exclude=["object"]).columns
 def compute_psi(ref: pd.Series, prod: pd.Series, bins: int = 10) -> float:
     """
     Computing Population Stability Index (PSI)
-    for numerical features using equal-width bins.
+    for numerical features using equal-width bins
+    (drift_significance.psi_binning, shared with slice PSI).
     """
 
     ref = ref.dropna()
@@ -39,11 +65,7 @@ def compute_psi(ref: pd.Series, prod: pd.Series, bins: int = 10) -> float:
     if ref.empty or prod.empty:
         return 0.0
 
-    breakpoints = np.linspace(
-        min(ref.min(), prod.min()),
-        max(ref.max(), prod.max()),
-        bins + 1,
-    )
+    breakpoints = psi_binning(ref, prod, bins)["edges"]
 
     ref_counts, _ = np.histogram(ref, bins=breakpoints)
     prod_counts, _ = np.histogram(prod, bins=breakpoints)
@@ -59,6 +81,38 @@ def compute_psi(ref: pd.Series, prod: pd.Series, bins: int = 10) -> float:
     return float(psi)
 
 
+def compute_psi_interval(ref: pd.Series, prod: pd.Series, weights: np.ndarray, bins: int = 10) -> tuple:
+    """
+    Bootstrap interval of compute_psi (bootstrap.basic_interval),
+    resampling production rows. `weights` holds one column per
+    production row (missing ones included).
+    """
+    weights = weights[:, prod.notna().to_numpy()]
+    ref = ref.dropna()
+    prod = prod.dropna()
+
+    if ref.empty or prod.empty:
+        return 0.0, 0.0
+
+    binning = psi_binning(ref, prod, bins)
+
+    ref_counts, _ = np.histogram(ref, bins=binning["edges"])
+    ref_dist = ref_counts / max(ref_counts.sum(), 1)
+
+    codes = psi_bin_codes(prod, binning)
+    prod_counts = weighted_counts(weights, codes, bins)
+    prod_dist = prod_counts / np.maximum(prod_counts.sum(axis=1, keepdims=True), 1)
+
+    psi = np.sum(
+        (prod_dist - ref_dist)
+        * np.log((prod_dist + 1e-6) / (ref_dist + 1e-6)),
+        axis=1,
+    )
+
+    lower, upper = basic_interval(psi, compute_psi(ref, prod, bins), floor=0.0)
+    return float(lower), float(upper)
+
+
 def compute_categorical_psi(ref: pd.Series, prod: pd.Series) -> float:
     """
     Computing PSI for categorical features.
@@ -78,12 +132,38 @@ def compute_categorical_psi(ref: pd.Series, prod: pd.Series) -> float:
     return float(psi)
 
 
+def compute_categorical_psi_interval(ref: pd.Series, prod: pd.Series, weights: np.ndarray) -> tuple:
+    """
+    Bootstrap interval of compute_categorical_psi
+    (bootstrap.basic_interval), resampling production rows.
+    """
+    weights = weights[:, prod.notna().to_numpy()]
+    prod = prod.dropna()
+
+    ref_dist = ref.value_counts(normalize=True)
+    categories = sorted(set(ref_dist.index).union(set(prod.unique())), key=str)
+
+    ref_dist = ref_dist.reindex(categories).fillna(1e-6).to_numpy()
+    codes = pd.Categorical(prod, categories=categories).codes
+
+    prod_counts = weighted_counts(weights, codes, len(categories))
+    prod_dist = prod_counts / np.maximum(prod_counts.sum(axis=1, keepdims=True), 1)
+    prod_dist = np.where(prod_dist > 0, prod_dist, 1e-6)
+
+    psi = np.sum((prod_dist - ref_dist) * np.log(prod_dist / ref_dist), axis=1)
+
+    lower, upper = basic_interval(psi, compute_categorical_psi(ref, prod), floor=0.0)
+    return float(lower), float(upper)
+
+
 # Drift 
-def compute_numerical_drift(ref: pd.Series, prod: pd.Series) -> dict:
+def compute_numerical_drift(ref: pd.Series, prod: pd.Series, weights: np.ndarray) -> dict:
     """
     Diagnostic signals for numerical features.
     """
 
+    psi_lower, psi_upper = compute_psi_interval(ref, prod, weights)
+
     return {
         "reference_mean": ref.mean(),
         "production_mean": prod.mean(),
@@ -93,10 +173,12 @@ def compute_numerical_drift(ref: pd.Series, prod: pd.Series) -> dict:
         "reference_missing_rate": ref.isna().mean(),
         "production_missing_rate": prod.isna().mean(),
         "psi": compute_psi(ref, prod),
+        "psi_lower": psi_lower,
+        "psi_upper": psi_upper,
     }
 
 
-def compute_categorical_drift(ref: pd.Series, prod: pd.Series) -> dict:
+def compute_categorical_drift(ref: pd.Series, prod: pd.Series, weights: np.ndarray) -> dict:
     """
     Diagnostic signals for categorical features.
     """
@@ -111,37 +193,96 @@ def compute_categorical_drift(ref: pd.Series, prod: pd.Series) -> dict:
             "production_freq": prod_dist.get(category, 0.0),
         }
 
+    psi_lower, psi_upper = compute_categorical_psi_interval(ref, prod, weights)
+
     return {
         "psi": compute_categorical_psi(ref, prod),
+        "psi_lower": psi_lower,
+        "psi_upper": psi_upper,
         "distribution_shift": distribution_shift,
     }
 
 
 
+def compute_batch_drift(prod_df: pd.DataFrame) -> dict:
+    """
+    Diagnostic signals of every feature for one production batch.
+    """
+    batch_drift = {}
+
+    # One set of resamples per batch, shared by all features
+    weights = poisson_weights(len(prod_df))
+
+    # Numerical features
+    for feature in numerical_features:
+        batch_drift[feature] = compute_numerical_drift(
+            reference_df[feature], prod_df[feature], weights
+        )
+
+    # Categorical features (and label drift of the target)
+    for feature in categorical_features:
+        # Label drift covers the labelled records; batches without any
+        # label yet have none
+        if feature == TARGET_COLUMN and (
+            feature not in prod_df.columns or prod_df[feature].isna().all()
+        ):
+            continue
+        batch_drift[feature] = compute_categorical_drift(
+            reference_df[feature], prod_df[feature], weights
+        )
+
+    return batch_drift
+
+
+def significance_tests(batch: str, prod_df: pd.DataFrame, features) -> list:
+    """
+    Permutation test inputs (batch, feature, codes) for drift_p_values.
+    """
+    return [
+        (batch, feature, psi_codes(reference_df[feature], prod_df[feature]))
+        for feature in features
+    ]
+
+
 # Main 
-def main():
+def main(significance: bool = True, max_workers: int = None, write_json: bool = False):
+    reports = {}
+    tests = []
+    profile_edges, _ = reference_profile()
+
     for batch_file in sorted(PRODUCTION_DIR.glob("production_batch_*.csv")):
         prod_df = pd.read_csv(batch_file)
+        batch_drift = compute_batch_drift(prod_df)
+        save_batch_profile(batch_file, prod_df, profile_edges)
 
-        batch_drift = {}
+        if significance:
+            tests += significance_tests(batch_file.stem, prod_df, batch_drift)
 
-        # Numerical features
-        for feature in numerical_features:
-            batch_drift[feature] = compute_numerical_drift(
-                reference_df[feature], prod_df[feature]
-            )
+        reports[batch_file.stem] = batch_drift
 
-        # Categorical features
-        for feature in categorical_features:
-            batch_drift[feature] = compute_categorical_drift(
-                reference_df[feature], prod_df[feature]
-            )
+    # Permutation tests for every batch x feature at once
+    if significance:
+        for (batch, feature, _), (p_value, permutations) in zip(tests, drift_p_values(tests, max_workers)):
+            reports[batch][feature]["psi_p_value"] = p_value
+            reports[batch][feature]["permutations"] = permutations
 
-        output_path = OUTPUT_DIR / f"{batch_file.stem}_drift.json"
-        pd.Series(batch_drift).to_json(output_path, indent=2)
+    save_report(columnar_report(reports), REPORT_PATH)
+    print(f"Saved drift report ({len(reports)} batches): {REPORT_PATH}")
 
-        print(f"Saved drift report: {output_path}")
+    if write_json:
+        for output_path in save_json_reports(reports, OUTPUT_DIR):
+            print(f"Saved drift report: {output_path}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--no-significance", action="store_true", help="skip the permutation tests"
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--json", action="store_true", help="also write verbose per-batch JSON reports"
+    )
+    args = parser.parse_args()
+
+    main(significance=not args.no_significance, max_workers=args.workers, write_json=args.json)
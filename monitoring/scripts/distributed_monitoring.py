@@ -0,0 +1,233 @@
+"""
+Distributed Monitoring
+
+Sharded execution of the drift, performance and bias stages through the
+local job queue (job_queue.py): a coordinator enqueues one task per
+(stage, batch), worker processes lease and run them, and committed
+results are collected into the metric stores.
+
+- Workers reuse the per-batch computations of data_drift.py,
+  performance_monitoring.py (with slice_monitoring.py) and
+  bias_monitoring.py; models and reference data are loaded once per
+  worker
+- Results travel through the queue as CSV text per store, so collected
+  rows look exactly like rows written by the single-process scripts
+- Concept-drift detectors need batches in order and the columnar drift
+  report covers a whole run; both stay with the single-process scripts
+
+Usage (from the repository root):
+    python monitoring/scripts/distributed_monitoring.py run --workers 4
+    python monitoring/scripts/distributed_monitoring.py enqueue --stages drift
+    python monitoring/scripts/distributed_monitoring.py worker   # on any host
+    python monitoring/scripts/distributed_monitoring.py collect
+"""
+
+import argparse
+import io
+import os
+import socket
+import time
+import traceback
+from functools import lru_cache
+from multiprocessing import Process
+from pathlib import Path
+
+import pandas as pd
+
+import bias_monitoring
+import data_drift
+import job_queue
+import performance_monitoring
+import slice_monitoring
+from batch_profiles import reference_profile, save_batch_profile
+from batch_scoring import PRODUCTION_BATCH_DIR, feature_frame, monitored_models, predict_all, read_batch
+from drift_reports import columnar_report
+from drift_severity import severity_frame
+from drift_significance import drift_p_values
+from metrics_store import append_rows
+from store_drift_metrics import STORE_PATH as DRIFT_METRICS_PATH
+from threshold_analysis import THRESHOLD_CURVES_PATH, THRESHOLD_METRICS_PATH
+
+# Configuration
+STAGES = ["drift", "performance", "bias"]
+POLL_SECONDS = 1.0
+
+
+def drift_task(batch: str) -> dict:
+    batch_file = PRODUCTION_BATCH_DIR / f"{batch}.csv"
+    prod_df = pd.read_csv(batch_file)
+    batch_drift = data_drift.compute_batch_drift(prod_df)
+    save_batch_profile(batch_file, prod_df, reference_profile()[0])
+
+    # Workers are the parallelism; the permutation tests run in-process
+    tests = data_drift.significance_tests(batch, prod_df, batch_drift)
+    for (_, feature, _), (p_value, permutations) in zip(tests, drift_p_values(tests, max_workers=1)):
+        batch_drift[feature]["psi_p_value"] = p_value
+        batch_drift[feature]["permutations"] = permutations
+
+    return {DRIFT_METRICS_PATH: severity_frame(columnar_report({batch: batch_drift}))}
+
+
+def _scored_batch(batch: str, models: list) -> tuple:
+    df = read_batch(PRODUCTION_BATCH_DIR / f"{batch}.csv")
+    stages = {entry["version"]: entry["stage"] for entry, _ in models}
+    return df, predict_all(feature_frame(df), models), stages
+
+
+@lru_cache(maxsize=1)
+def slice_monitor() -> slice_monitoring.SliceMonitor:
+    return slice_monitoring.SliceMonitor()
+
+
+def performance_task(batch: str, models: list) -> dict:
+    df, predictions, stages = _scored_batch(batch, models)
+    slice_performance, slice_drift = slice_monitor().evaluate(
+        batch, df, slice_monitoring.champion_predictions(predictions, stages), stages
+    )
+    frames = {
+        slice_monitoring.SLICE_PERFORMANCE_PATH: slice_performance,
+        slice_monitoring.SLICE_DRIFT_PATH: slice_drift,
+    }
+
+    result = performance_monitoring.evaluate_batch(batch, df, predictions, stages)
+    if result is None:
+        return frames
+
+    return {
+        **frames,
+        performance_monitoring.METRICS_STORE_PATH: pd.DataFrame(result["records"]),
+        THRESHOLD_METRICS_PATH: pd.DataFrame(result["threshold_summaries"]),
+        THRESHOLD_CURVES_PATH: pd.concat(result["threshold_curves"], ignore_index=True),
+    }
+
+
+def bias_task(batch: str, models: list) -> dict:
+    df, predictions, stages = _scored_batch(batch, models)
+    return {bias_monitoring.BIAS_METRICS_PATH: pd.DataFrame(bias_monitoring.evaluate_batch(batch, df, predictions, stages))}
+
+
+def run_task(stage: str, batch: str, models: list) -> dict:
+    """
+    Result rows of one task as {store path: CSV text}.
+    """
+    if stage == "drift":
+        frames = drift_task(batch)
+    elif stage == "performance":
+        frames = performance_task(batch, models)
+    elif stage == "bias":
+        frames = bias_task(batch, models)
+    else:
+        raise ValueError(f"Unknown stage {stage!r}")
+
+    return {str(path): frame.to_csv(index=False) for path, frame in frames.items() if not frame.empty}
+
+
+def worker(worker_id: str = None, wait: bool = False, lease_seconds: float = job_queue.LEASE_SECONDS) -> int:
+    """
+    Lease and run tasks until the queue is drained (or forever with
+    `wait`), renewing each lease while its task runs. Returns the
+    number of tasks committed.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    models = None
+    committed = 0
+
+    while True:
+        task = job_queue.lease(worker_id, lease_seconds)
+        if task is None:
+            if not wait:
+                return committed
+            time.sleep(POLL_SECONDS)
+            continue
+
+        task_id, stage, batch, token = task
+        try:
+            if models is None and stage != "drift":
+                models = monitored_models()
+            with job_queue.heartbeat(task_id, token, lease_seconds):
+                payload = run_task(stage, batch, models)
+        except Exception:
+            job_queue.fail(task_id, token, traceback.format_exc(limit=5))
+            print(f"[{worker_id}] {task_id} failed")
+            continue
+
+        if job_queue.complete(task_id, token, payload):
+            committed += 1
+        else:
+            print(f"[{worker_id}] {task_id} lease lost; result dropped")
+
+
+def collect() -> int:
+    """
+    Append every newly committed result to its metric store, in task
+    order. Returns the number of results collected.
+    """
+    with job_queue.uncollected_results() as results:
+        frames = {}
+        for _, payload in results:
+            for path, text in payload.items():
+                frames.setdefault(path, []).append(pd.read_csv(io.StringIO(text)))
+
+        for path, parts in frames.items():
+            append_rows(Path(path), pd.concat(parts, ignore_index=True))
+
+        return len(results)
+
+
+def enqueue_batches(stages=STAGES, batches=None, force: bool = False) -> int:
+    # Drift tasks profile their batch against the reference profile;
+    # build it here once rather than in every worker
+    if "drift" in stages:
+        reference_profile()
+
+    batches = batches or [path.stem for path in sorted(PRODUCTION_BATCH_DIR.glob("production_batch_*.csv"))]
+    return job_queue.enqueue([(stage, batch) for stage in stages for batch in batches], force=force)
+
+
+def run_local(n_workers: int, stages=STAGES, batches=None, force: bool = False):
+    """
+    Coordinator for one host: enqueue, run worker processes until the
+    queue drains, then collect.
+    """
+    queued = enqueue_batches(stages, batches, force)
+    print(f"Queued {queued} task(s)")
+
+    processes = [Process(target=worker, args=(f"{socket.gethostname()}:local-{i}",)) for i in range(n_workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    print(f"Collected {collect()} result(s)")
+
+
+def print_status():
+    for (stage, status), count in sorted(job_queue.status_counts().items()):
+        print(f"{stage:12s} {status:8s} {count}")
+    for task_id, attempts, error in job_queue.failed_tasks():
+        last_line = (error or "").strip().splitlines()[-1:] or [""]
+        print(f"FAILED {task_id} after {attempts} attempt(s): {last_line[0]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["run", "enqueue", "worker", "collect", "status"])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--batches", nargs="+", default=None, help="batch names (default: all)")
+    parser.add_argument("--force", action="store_true", help="re-run tasks that already completed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="local worker processes (run)")
+    parser.add_argument("--wait", action="store_true", help="worker keeps polling an empty queue")
+    parser.add_argument("--lease-seconds", type=float, default=job_queue.LEASE_SECONDS)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run_local(args.workers, args.stages, args.batches, args.force)
+        print_status()
+    elif args.command == "enqueue":
+        print(f"Queued {enqueue_batches(args.stages, args.batches, args.force)} task(s)")
+    elif args.command == "worker":
+        print(f"Committed {worker(wait=args.wait, lease_seconds=args.lease_seconds)} task(s)")
+    elif args.command == "collect":
+        print(f"Collected {collect()} result(s)")
+    else:
+        print_status()
@@ -0,0 +1,106 @@
+"""
+Drift Report Format
+
+Drift reports written by data_drift.py and read by drift_severity.py.
+
+- Default: one columnar report per run (drift_report.npz) holding a
+  batches x features x statistics float array plus the three axis
+  labels; loading it is a single read with no per-feature parsing
+- Optional: the verbose per-batch JSON reports (including the
+  per-category distribution_shift), still readable when no columnar
+  report exists
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Paths
+REPORT_DIR = Path("monitoring/drift_reports")
+REPORT_PATH = REPORT_DIR / "drift_report.npz"
+
+# Scalar statistics kept in the columnar report (NaN where not computed)
+STATISTICS = [
+    "psi",
+    "psi_lower",
+    "psi_upper",
+    "psi_p_value",
+    "permutations",
+    "reference_mean",
+    "production_mean",
+    "mean_difference",
+    "reference_std",
+    "production_std",
+    "reference_missing_rate",
+    "production_missing_rate",
+]
+
+
+def columnar_report(reports: dict, statistics: list = STATISTICS) -> dict:
+    """
+    {batch: {feature: {statistic: value}}} -> columnar arrays.
+    Non-scalar entries (distribution_shift) are left out.
+    """
+    batches = list(reports)
+    features = list(dict.fromkeys(feature for report in reports.values() for feature in report))
+    values = np.full((len(batches), len(features), len(statistics)), np.nan)
+
+    feature_index = {feature: f for f, feature in enumerate(features)}
+    for b, batch in enumerate(batches):
+        for feature, metrics in reports[batch].items():
+            # JSON reports store missing values as null
+            row = [metrics.get(statistic) for statistic in statistics]
+            values[b, feature_index[feature]] = [np.nan if value is None else value for value in row]
+
+    return {
+        "batches": np.array(batches, dtype=str),
+        "features": np.array(features, dtype=str),
+        "statistics": np.array(statistics, dtype=str),
+        "values": values,
+    }
+
+
+def save_report(report: dict, path: Path = REPORT_PATH):
+    """
+    Write the columnar report atomically.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **report)
+
+    os.replace(tmp_path, path)
+
+
+def save_json_reports(reports: dict, report_dir: Path = REPORT_DIR) -> list:
+    """
+    Verbose per-batch JSON reports. Returns the written paths.
+    """
+    paths = []
+    for batch, batch_drift in reports.items():
+        output_path = report_dir / f"{batch}_drift.json"
+        pd.Series(batch_drift).to_json(output_path, indent=2)
+        paths.append(output_path)
+    return paths
+
+
+def load_report(report_dir: Path = REPORT_DIR) -> dict:
+    """
+    Columnar report of the latest run; built from the JSON reports when
+    no columnar report was written (reports from older runs).
+    """
+    path = report_dir / REPORT_PATH.name
+    if path.exists():
+        with np.load(path, allow_pickle=False) as report:
+            return {name: report[name] for name in report.files}
+
+    reports = {}
+    for report_file in sorted(report_dir.glob("production_batch_*_drift.json")):
+        with open(report_file) as f:
+            reports[report_file.stem.replace("_drift", "")] = json.load(f)
+
+    return columnar_report(reports)
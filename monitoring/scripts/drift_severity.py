@@ -6,59 +6,88 @@ and converts them into severity levels using PSI thresholds.
 
 - This file does NOT compute drift
 - It only interprets drift metrics
+- Severity is assigned to every batch x feature of the columnar
+  report at once and stored in a single write
 """
 
-import json
+from datetime import datetime
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
+from drift_reports import REPORT_DIR, load_report
 # Importing drift storage function
-from store_drift_metrics import store_drift_metric
+from store_drift_metrics import store_drift_metrics
 
 
 # Paths
-DRIFT_REPORT_DIR = Path("monitoring/drift_reports")
+DRIFT_REPORT_DIR = REPORT_DIR
 
 # PSI thresholds (industry-aligned)
 LOW_THRESHOLD = 0.1
 MEDIUM_THRESHOLD = 0.25
+DRIFT_LEVELS = np.array(["LOW", "MEDIUM", "HIGH"])
+
+
+def drift_levels(psi_scores) -> np.ndarray:
+    """
+    Severity label of every PSI score at once:
+    LOW below LOW_THRESHOLD, MEDIUM below MEDIUM_THRESHOLD, HIGH otherwise.
+    """
+    return DRIFT_LEVELS[np.digitize(psi_scores, [LOW_THRESHOLD, MEDIUM_THRESHOLD])]
 
 
 def classify_drift(psi_score: float) -> str:
     """
     Convert PSI score into severity label.
     """
-    if psi_score < LOW_THRESHOLD:
-        return "LOW"
-    elif psi_score < MEDIUM_THRESHOLD:
-        return "MEDIUM"
-    else:
-        return "HIGH"
+    return str(drift_levels([psi_score])[0])
 
 
-def main():
-    for report_file in sorted(DRIFT_REPORT_DIR.glob("production_batch_*_drift.json")):
-        batch_name = report_file.stem.replace("_drift", "")
-
-        with open(report_file) as f:
-            drift_report = json.load(f)
+def severity_frame(report: dict) -> pd.DataFrame:
+    """
+    One drift record per (batch, feature) of a columnar report, with
+    severity assigned to all of them in one pass. Features without a
+    PSI are skipped.
+    """
+    values = report["values"]
+    statistics = list(report["statistics"])
+    n_batches, n_features = values.shape[:2]
+
+    def column(statistic):
+        if statistic not in statistics:
+            return np.full(n_batches * n_features, np.nan)
+        return values[:, :, statistics.index(statistic)].ravel()
+
+    psi = column("psi")
+    frame = pd.DataFrame({
+        "timestamp": datetime.utcnow(),
+        # Categorical columns share one copy of every label
+        "batch": pd.Categorical.from_codes(
+            np.repeat(np.arange(n_batches), n_features), report["batches"]
+        ),
+        "feature": pd.Categorical.from_codes(
+            np.tile(np.arange(n_features), n_batches), report["features"]
+        ),
+        "drift_score": psi,
+        "drift_level": pd.Categorical(drift_levels(psi), categories=DRIFT_LEVELS),
+        "drift_score_lower": column("psi_lower"),
+        "drift_score_upper": column("psi_upper"),
+        "p_value": column("psi_p_value"),
+    })
+
+    return frame[~np.isnan(psi)].reset_index(drop=True)
 
-        for feature, metrics in drift_report.items():
-            # Skip malformed entries defensively
-            if "psi" not in metrics:
-                continue
 
-            psi_score = metrics["psi"]
-            drift_level = classify_drift(psi_score)
+def main():
+    report = load_report(DRIFT_REPORT_DIR)
+    drift_df = severity_frame(report)
 
-            store_drift_metric(
-                batch=batch_name,
-                feature=feature,
-                drift_score=psi_score,
-                drift_level=drift_level,
-            )
+    store_drift_metrics(drift_df)
 
-        print(f"Drift severity processed for {batch_name}")
+    print(f"Drift severity processed for {len(report['batches'])} batches ({len(drift_df)} records)")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,166 @@
+"""
+Drift Significance
+
+Permutation-test p-values for PSI drift scores, so drift on small
+batches can be told apart from sampling noise.
+
+- Reference and production values are binned once into integer codes
+  (psi_binning, the bins of data_drift.compute_psi); a permutation shuffles the
+  pooled codes, its production histogram is one bincount and the
+  reference histogram is the pooled total minus it
+- Permutations run in blocks and stop early once the p-value is
+  clearly below or above ALPHA
+- Features x batches are spread across a process pool
+"""
+
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Configuration
+ALPHA = 0.05
+PSI_BINS = 10
+PERMUTATION_BLOCK = 100
+MAX_PERMUTATIONS = 2000
+PERMUTATION_SEED = 42
+# Width (in standard errors) of the band around ALPHA that keeps sampling
+STOPPING_Z = 3.0
+EPSILON = 1e-6
+
+
+def psi_binning(ref: pd.Series, prod: pd.Series, bins: int = PSI_BINS) -> dict:
+    """
+    PSI bins of one reference / production pair, shared by batch PSI
+    (data_drift), its permutation test and slice PSI (slice_monitoring):
+    equal-width bins over the combined range for numbers, the union of
+    both samples' categories otherwise.
+    """
+    ref = ref.dropna()
+    prod = prod.dropna()
+
+    if ref.dtype == object or prod.dtype == object:
+        categories = sorted(set(ref.unique()).union(set(prod.unique())), key=str)
+        return {"kind": "categorical", "n_bins": len(categories), "categories": categories}
+
+    values = pd.concat([ref, prod])
+    low, high = (values.min(), values.max()) if len(values) else (0.0, 1.0)
+    return {"kind": "numerical", "n_bins": bins, "edges": np.linspace(low, high, bins + 1)}
+
+
+def psi_bin_codes(values: pd.Series, binning: dict) -> np.ndarray:
+    """
+    Bin index per value (-1 for missing values). Numbers use the same
+    bins as np.histogram (last bin closed on the right).
+    """
+    if binning["kind"] == "categorical":
+        return pd.Categorical(values, categories=binning["categories"]).codes.astype(np.int64)
+
+    numeric = values.to_numpy(dtype=float)
+    codes = np.clip(np.searchsorted(binning["edges"], numeric, side="right") - 1, 0, binning["n_bins"] - 1)
+    return np.where(np.isnan(numeric), -1, codes)
+
+
+def psi_codes(ref: pd.Series, prod: pd.Series, bins: int = PSI_BINS) -> dict:
+    """
+    Integer bin codes of both samples' values (psi_binning).
+    """
+    binning = psi_binning(ref, prod, bins)
+    return {
+        "kind": binning["kind"],
+        "n_bins": binning["n_bins"],
+        "ref": psi_bin_codes(ref.dropna(), binning),
+        "prod": psi_bin_codes(prod.dropna(), binning),
+    }
+
+
+def psi_from_counts(ref_counts: np.ndarray, prod_counts: np.ndarray, kind: str) -> np.ndarray:
+    """
+    PSI per row of histogram counts, matching data_drift's numerical
+    (epsilon-smoothed) and categorical (epsilon-floored) formulas.
+    """
+    ref_dist = ref_counts / np.maximum(ref_counts.sum(axis=-1, keepdims=True), 1)
+    prod_dist = prod_counts / np.maximum(prod_counts.sum(axis=-1, keepdims=True), 1)
+
+    if kind == "categorical":
+        ref_dist = np.where(ref_dist > 0, ref_dist, EPSILON)
+        prod_dist = np.where(prod_dist > 0, prod_dist, EPSILON)
+        return np.sum((prod_dist - ref_dist) * np.log(prod_dist / ref_dist), axis=-1)
+
+    return np.sum(
+        (prod_dist - ref_dist) * np.log((prod_dist + EPSILON) / (ref_dist + EPSILON)),
+        axis=-1,
+    )
+
+
+def permutation_p_value(
+    codes: dict,
+    alpha: float = ALPHA,
+    block: int = PERMUTATION_BLOCK,
+    max_permutations: int = MAX_PERMUTATIONS,
+    seed: int = PERMUTATION_SEED,
+) -> tuple:
+    """
+    p-value of the observed PSI under random reassignment of rows
+    between reference and production. Returns (p_value, permutations).
+    """
+    ref_codes, prod_codes, n_bins = codes["ref"], codes["prod"], codes["n_bins"]
+    if len(ref_codes) == 0 or len(prod_codes) == 0:
+        return 1.0, 0
+
+    pooled = np.concatenate([ref_codes, prod_codes])
+    total = np.bincount(pooled, minlength=n_bins)
+    observed_prod = np.bincount(prod_codes, minlength=n_bins)
+    observed = psi_from_counts(total - observed_prod, observed_prod, codes["kind"])
+
+    n_prod = len(prod_codes)
+    rng = np.random.default_rng(seed)
+
+    exceed = 0
+    done = 0
+    while done < max_permutations:
+        size = min(block, max_permutations - done)
+
+        # One bincount for the whole block: offset each permutation's codes
+        shuffled = rng.permuted(np.broadcast_to(pooled, (size, len(pooled))), axis=1)[:, :n_prod]
+        keys = (shuffled + n_bins * np.arange(size)[:, None]).ravel()
+        prod_counts = np.bincount(keys, minlength=size * n_bins).reshape(size, n_bins)
+
+        psi = psi_from_counts(total - prod_counts, prod_counts, codes["kind"])
+        exceed += int(np.sum(psi >= observed - 1e-12))
+        done += size
+
+        # Stop once the estimate is clearly on one side of alpha
+        p_value = (exceed + 1) / (done + 1)
+        margin = STOPPING_Z * np.sqrt(p_value * (1 - p_value) / done)
+        if p_value - margin > alpha or p_value + margin < alpha:
+            break
+
+    return (exceed + 1) / (done + 1), done
+
+
+def _test_task(task: tuple) -> tuple:
+    codes, seed = task
+    return permutation_p_value(codes, seed=seed)
+
+
+def task_seed(batch: str, feature: str) -> int:
+    """
+    Stable per-test seed, so results do not depend on scheduling.
+    """
+    return zlib.crc32(f"{batch}/{feature}".encode()) ^ PERMUTATION_SEED
+
+
+def drift_p_values(tests: list, max_workers: int = None) -> list:
+    """
+    Run permutation tests for (batch, feature, codes) tuples in a
+    process pool. Returns (p_value, permutations) per test, in order.
+    """
+    tasks = [(codes, task_seed(batch, feature)) for batch, feature, codes in tests]
+
+    if max_workers == 1 or len(tasks) <= 1:
+        return [_test_task(task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_test_task, tasks, chunksize=max(1, len(tasks) // 32)))
@@ -0,0 +1,290 @@
+"""
+Incremental Retraining
+
+Updates the champion model from newly labelled production batches
+instead of refitting from scratch on the full reference set.
+
+- The fitted preprocessing is reused as-is, so the one-hot vocabulary
+  (and feature layout) stays fixed across versions
+- The logistic regression is warm-started from the champion's coefficients
+  and fitted on the new batches plus a small replay sample of reference
+  data (guards against forgetting the deployment-time distribution)
+- Each update is compared with the champion on a holdout of the new
+  batches (stratified when every class has at least two records) and
+  registered as a challenger, with the champion as its parent and the
+  comparison in its metadata, unless its ROC-AUC falls more than
+  MAX_ROC_AUC_LOSS below the champion's; updates are reported against
+  the champion and, optionally, a full refit; unpromoted challengers
+  are never built upon
+
+Triggered by RETRAIN decisions from retraining_recommender.py.
+"""
+
+import copy
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from sklearn.metrics import precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+
+# Reuse the training pipeline
+sys.path.append(str(Path(__file__).resolve().parents[2] / "models"))
+from train_baseline_model import build_pipeline, prepare_features  # noqa: E402
+
+import model_registry  # noqa: E402
+
+# Paths
+REFERENCE_DATA_PATH = Path("data/reference/reference_data.csv")
+PRODUCTION_BATCH_DIR = Path("data/production_batches")
+DECISION_PATH = Path("monitoring/decisions/retraining_decisions.csv")
+VERSIONS_DIR = Path("models/versions")
+REPORT_PATH = VERSIONS_DIR / "retraining_report.csv"
+STATE_PATH = VERSIONS_DIR / "retraining_state.json"
+
+# Configuration
+TARGET_COLUMN = "Churn"
+POSITIVE_LABEL = "Yes"
+REPLAY_SAMPLE_SIZE = 1000
+HOLDOUT_SIZE = 0.2
+WARM_START_MAX_ITER = 200
+RANDOM_STATE = 42
+MAX_ROC_AUC_LOSS = 0.01
+
+
+def load_batches(batch_names) -> pd.DataFrame:
+    """
+    Load the labelled records of production batches with training
+    schema fixes.
+    """
+    frames = [
+        pd.read_csv(PRODUCTION_BATCH_DIR / f"{batch}.csv")
+        for batch in batch_names
+    ]
+    df = pd.concat(frames, ignore_index=True)
+    return prepare_features(df[df[TARGET_COLUMN].notna()].reset_index(drop=True))
+
+
+def current_model():
+    """
+    The champion (the baseline until another version is promoted).
+    Returns (version, model).
+    """
+    return model_registry.load()
+
+
+def new_version() -> str:
+    """
+    Minor version after the most recently registered one, so updates
+    of the same champion never collide with earlier challengers.
+    """
+    return model_registry.next_version()
+
+
+def evaluate(model, X: pd.DataFrame, y: pd.Series) -> dict:
+    """
+    Holdout metrics; ROC-AUC is NaN when the holdout has one class only.
+    """
+    y_pred = model.predict(X)
+    y_pred_proba = model.predict_proba(X)[:, 1]
+    actual = (y == POSITIVE_LABEL).astype(int)
+
+    return {
+        "precision": precision_score(y, y_pred, pos_label=POSITIVE_LABEL, zero_division=0),
+        "recall": recall_score(y, y_pred, pos_label=POSITIVE_LABEL, zero_division=0),
+        "roc_auc": roc_auc_score(actual, y_pred_proba) if actual.nunique() == 2 else float("nan"),
+    }
+
+
+def holdout_split(df: pd.DataFrame) -> tuple:
+    """
+    (train_df, holdout_df), stratified by label unless a class has fewer
+    than two records (small or partly labelled batches).
+    """
+    counts = df[TARGET_COLUMN].value_counts()
+    stratify = df[TARGET_COLUMN] if len(counts) > 1 and counts.min() >= 2 else None
+
+    return train_test_split(df, test_size=HOLDOUT_SIZE, random_state=RANDOM_STATE, stratify=stratify)
+
+
+def incremental_update(model, X_new: pd.DataFrame, y_new: pd.Series, replay: pd.DataFrame = None):
+    """
+    Warm-start the classifier on new data over the already fitted
+    preprocessing. The input model is left untouched.
+    """
+    updated = copy.deepcopy(model)
+    preprocessor = updated.named_steps["preprocessing"]
+    classifier = updated.named_steps["classifier"]
+
+    if replay is not None and not replay.empty:
+        X_new = pd.concat([X_new, replay.drop(columns=[TARGET_COLUMN])], ignore_index=True)
+        y_new = pd.concat([y_new, replay[TARGET_COLUMN]], ignore_index=True)
+
+    classifier.set_params(warm_start=True, max_iter=WARM_START_MAX_ITER)
+    classifier.fit(preprocessor.transform(X_new), y_new)
+
+    return updated
+
+
+def full_refit(model, X: pd.DataFrame, y: pd.Series):
+    """
+    Refit the whole pipeline from scratch, keeping the current
+    one-hot vocabulary so layouts stay comparable.
+    """
+    preprocessor = model.named_steps["preprocessing"]
+    categories = preprocessor.named_transformers_["cat"].named_steps["encoder"].categories_
+
+    refit = build_pipeline(
+        preprocessor.transformers_[0][2],
+        preprocessor.transformers_[1][2],
+        categories=categories,
+    )
+    refit.fit(X, y)
+    return refit
+
+
+def retrain(batch_names, compare_full_refit: bool = True) -> dict:
+    """
+    Update the champion from labelled production batches, register the
+    update unless it loses on the holdout, and report time and quality
+    against the current model and a full refit.
+    """
+    parent_version, model = current_model()
+
+    train_df, holdout_df = holdout_split(load_batches(batch_names))
+    X_train, y_train = train_df.drop(columns=[TARGET_COLUMN]), train_df[TARGET_COLUMN]
+    X_holdout, y_holdout = holdout_df.drop(columns=[TARGET_COLUMN]), holdout_df[TARGET_COLUMN]
+
+    reference_df = prepare_features(pd.read_csv(REFERENCE_DATA_PATH))
+    replay = reference_df.sample(
+        n=min(REPLAY_SAMPLE_SIZE, len(reference_df)), random_state=RANDOM_STATE
+    )
+
+    start = time.perf_counter()
+    updated = incremental_update(model, X_train, y_train, replay)
+    update_seconds = time.perf_counter() - start
+
+    current = evaluate(model, X_holdout, y_holdout)
+    incremental = evaluate(updated, X_holdout, y_holdout)
+    # Comparisons with a NaN ROC-AUC are False: a one-class holdout does not block
+    registered = not incremental["roc_auc"] < current["roc_auc"] - MAX_ROC_AUC_LOSS
+
+    version, artifact = None, None
+    if registered:
+        version = new_version()
+        entry = model_registry.register(
+            updated,
+            version,
+            parent_version=parent_version,
+            metadata={
+                "batches": batch_names,
+                "train_rows": len(X_train) + len(replay),
+                "holdout_rows": len(X_holdout),
+                "holdout_metrics": {"parent": current, "incremental": incremental},
+            },
+        )
+        artifact = entry["artifact"]
+
+    record = {
+        "timestamp": datetime.utcnow(),
+        "version": version,
+        "parent_version": parent_version,
+        "registered": registered,
+        "artifact": artifact,
+        "batches": ";".join(batch_names),
+        "train_rows": len(X_train) + len(replay),
+        "update_seconds": update_seconds,
+    }
+    record.update({f"current_{k}": v for k, v in current.items()})
+    record.update({f"incremental_{k}": v for k, v in incremental.items()})
+
+    if compare_full_refit:
+        full_df = pd.concat([reference_df, train_df], ignore_index=True)
+
+        start = time.perf_counter()
+        refit = full_refit(model, full_df.drop(columns=[TARGET_COLUMN]), full_df[TARGET_COLUMN])
+        record["refit_seconds"] = time.perf_counter() - start
+        record.update({f"refit_{k}": v for k, v in evaluate(refit, X_holdout, y_holdout).items()})
+
+    VERSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    report = pd.DataFrame([record])
+    if REPORT_PATH.exists():
+        report = pd.concat([pd.read_csv(REPORT_PATH), report], ignore_index=True)
+    report.to_csv(REPORT_PATH, index=False)
+
+    return record
+
+
+def retrain_on_decisions(compare_full_refit: bool = True):
+    """
+    Run one incremental update covering every batch with a RETRAIN
+    decision recorded since the previous run.
+    """
+    if not DECISION_PATH.exists():
+        return None
+
+    state = {}
+    if STATE_PATH.exists():
+        with open(STATE_PATH) as f:
+            state = json.load(f)
+
+    decisions = pd.read_csv(DECISION_PATH)
+    decisions = decisions[decisions["action"] == "RETRAIN"]
+    if "last_decision" in state:
+        decisions = decisions[
+            pd.to_datetime(decisions["timestamp"]) > pd.Timestamp(state["last_decision"])
+        ]
+    if decisions.empty:
+        return None
+
+    # Batches already folded into a registered version are not trained on twice
+    trained = set()
+    if REPORT_PATH.exists():
+        report = pd.read_csv(REPORT_PATH)
+        if "registered" in report.columns:
+            report = report[report["registered"].fillna(True).astype(bool)]
+        trained = set(";".join(report["batches"].astype(str)).split(";"))
+
+    batch_names = [batch for batch in dict.fromkeys(decisions["batch"]) if batch not in trained]
+    record = retrain(batch_names, compare_full_refit) if batch_names else None
+
+    VERSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(STATE_PATH, "w") as f:
+        json.dump({"last_decision": str(pd.to_datetime(decisions["timestamp"]).max())}, f, indent=2)
+
+    return record
+
+
+def print_report(record: dict):
+    print("\nINCREMENTAL RETRAINING")
+    print("----------------------")
+    if record["registered"]:
+        print(f"Version: {record['version']} (from {record['parent_version']})")
+    else:
+        print(
+            f"Not registered: ROC-AUC more than {MAX_ROC_AUC_LOSS} below "
+            f"the champion {record['parent_version']} on the holdout"
+        )
+    print(f"Batches: {record['batches']}")
+    print(f"Incremental update: {record['update_seconds']:.2f}s")
+    if "refit_seconds" in record:
+        print(f"Full refit:         {record['refit_seconds']:.2f}s")
+
+    for metric in ["precision", "recall", "roc_auc"]:
+        line = f"{metric}: current {record[f'current_{metric}']:.3f}"
+        line += f" | incremental {record[f'incremental_{metric}']:.3f}"
+        if f"refit_{metric}" in record:
+            line += f" | refit {record[f'refit_{metric}']:.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    record = retrain_on_decisions()
+
+    if record is None:
+        print("No new batches to retrain on.")
+    else:
+        print_report(record)
@@ -0,0 +1,315 @@
+"""
+Job Queue
+
+Durable SQLite task queue for sharded monitoring runs
+(distributed_monitoring.py). Any number of worker processes, on one
+host or several sharing the filesystem, lease tasks from it.
+
+- A task is one (stage, batch); enqueueing is idempotent
+- Leases expire: a task whose worker died is handed out again, up to
+  MAX_ATTEMPTS times, after which it is marked failed; a worker renews
+  its lease while the task runs (heartbeat), so slow tasks keep it
+- A result is committed together with the task's completion in one
+  transaction, and only by the current lease holder, so every task has
+  exactly one committed result however often it ran
+- Committed results are collected into the metric stores once;
+  collectors are serialised by a lock file next to the queue and only
+  read and mark results in short transactions, so workers keep leasing
+  and committing while results are appended
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from metrics_store import store_lock
+
+# Paths
+QUEUE_PATH = Path("monitoring/job_queue/queue.db")
+
+# Configuration
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+BUSY_TIMEOUT_SECONDS = 30
+BUSY_RETRIES = 5
+
+# Task states
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id       TEXT PRIMARY KEY,
+    stage         TEXT NOT NULL,
+    batch         TEXT NOT NULL,
+    status        TEXT NOT NULL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    lease_token   TEXT,
+    lease_expires REAL,
+    worker        TEXT,
+    error         TEXT,
+    enqueued_at   TEXT NOT NULL,
+    finished_at   TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+CREATE TABLE IF NOT EXISTS results (
+    task_id      TEXT PRIMARY KEY REFERENCES tasks (task_id),
+    payload      TEXT NOT NULL,
+    committed_at TEXT NOT NULL,
+    collected    INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def task_id(stage: str, batch: str) -> str:
+    return f"{stage}/{batch}"
+
+
+def connect(path: Path = QUEUE_PATH) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Autocommit mode; transactions are opened explicitly
+    connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+@contextmanager
+def transaction(path: Path = QUEUE_PATH):
+    """
+    Write transaction (BEGIN IMMEDIATE: one writer at a time), committed
+    on success and rolled back on error.
+    """
+    connection = connect(path)
+    try:
+        # Nothing has run yet when the write lock cannot be taken, so
+        # retrying is safe
+        for attempt in range(BUSY_RETRIES):
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+                break
+            except sqlite3.OperationalError:
+                if attempt == BUSY_RETRIES - 1:
+                    raise
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+
+
+def enqueue(tasks, force: bool = False, path: Path = QUEUE_PATH) -> int:
+    """
+    Add (stage, batch) tasks. Existing tasks are left alone unless
+    `force`, which resets them to pending. Returns the number queued.
+    """
+    now = str(datetime.utcnow())
+    rows = [(task_id(stage, batch), stage, batch, PENDING, now) for stage, batch in tasks]
+
+    with transaction(path) as connection:
+        before = connection.total_changes
+        if force:
+            connection.executemany(
+                """
+                INSERT INTO tasks (task_id, stage, batch, status, enqueued_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (task_id) DO UPDATE SET
+                    status = excluded.status, attempts = 0, lease_token = NULL,
+                    lease_expires = NULL, error = NULL, finished_at = NULL,
+                    enqueued_at = excluded.enqueued_at
+                """,
+                rows,
+            )
+            queued = connection.total_changes - before
+            connection.executemany("DELETE FROM results WHERE task_id = ?", [row[:1] for row in rows])
+        else:
+            connection.executemany(
+                "INSERT OR IGNORE INTO tasks (task_id, stage, batch, status, enqueued_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            queued = connection.total_changes - before
+    return queued
+
+
+def lease(worker: str, lease_seconds: float = LEASE_SECONDS, path: Path = QUEUE_PATH):
+    """
+    Lease the oldest available task (pending, or leased with an expired
+    lease). Returns (task_id, stage, batch, token) or None when none is
+    available.
+    """
+    now = time.time()
+
+    with transaction(path) as connection:
+        # Expired leases that used up their attempts are given up on
+        connection.execute(
+            """
+            UPDATE tasks SET status = ?, error = COALESCE(error, 'lease expired'), finished_at = ?
+            WHERE status = ? AND lease_expires < ? AND attempts >= ?
+            """,
+            (FAILED, str(datetime.utcnow()), LEASED, now, MAX_ATTEMPTS),
+        )
+
+        row = connection.execute(
+            """
+            SELECT task_id, stage, batch FROM tasks
+            WHERE status = ? OR (status = ? AND lease_expires < ?)
+            ORDER BY rowid LIMIT 1
+            """,
+            (PENDING, LEASED, now),
+        ).fetchone()
+        if row is None:
+            return None
+
+        token = uuid.uuid4().hex
+        connection.execute(
+            """
+            UPDATE tasks SET status = ?, attempts = attempts + 1, lease_token = ?,
+                lease_expires = ?, worker = ?
+            WHERE task_id = ?
+            """,
+            (LEASED, token, now + lease_seconds, worker, row[0]),
+        )
+
+    return (*row, token)
+
+
+def renew(task: str, token: str, lease_seconds: float = LEASE_SECONDS, path: Path = QUEUE_PATH) -> bool:
+    """
+    Extend a lease by `lease_seconds` from now. Returns False when the
+    lease is no longer held (it expired and was taken over).
+    """
+    with transaction(path) as connection:
+        renewed = connection.execute(
+            "UPDATE tasks SET lease_expires = ? WHERE task_id = ? AND status = ? AND lease_token = ?",
+            (time.time() + lease_seconds, task, LEASED, token),
+        ).rowcount
+    return renewed > 0
+
+
+@contextmanager
+def heartbeat(task: str, token: str, lease_seconds: float = LEASE_SECONDS, path: Path = QUEUE_PATH):
+    """
+    Renew a lease in a background thread every third of its duration
+    while the block runs. A failed renewal is retried on the next beat;
+    a lost lease stops the heartbeat.
+    """
+    stopped = threading.Event()
+
+    def beat():
+        while not stopped.wait(lease_seconds / 3):
+            try:
+                if not renew(task, token, lease_seconds, path):
+                    return
+            except sqlite3.OperationalError:
+                continue
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def complete(task: str, token: str, payload: dict, path: Path = QUEUE_PATH) -> bool:
+    """
+    Commit a task's result. Only the current lease holder commits; a
+    worker whose lease was taken over gets False and its result is
+    dropped.
+    """
+    with transaction(path) as connection:
+        holder = connection.execute(
+            "SELECT 1 FROM tasks WHERE task_id = ? AND status = ? AND lease_token = ?",
+            (task, LEASED, token),
+        ).fetchone()
+        if holder is None:
+            return False
+
+        connection.execute(
+            "INSERT OR REPLACE INTO results (task_id, payload, committed_at) VALUES (?, ?, ?)",
+            (task, json.dumps(payload), str(datetime.utcnow())),
+        )
+        connection.execute(
+            "UPDATE tasks SET status = ?, finished_at = ?, error = NULL WHERE task_id = ?",
+            (DONE, str(datetime.utcnow()), task),
+        )
+    return True
+
+
+def fail(task: str, token: str, error: str, path: Path = QUEUE_PATH):
+    """
+    Release a failed lease: retried while attempts remain, failed after.
+    """
+    with transaction(path) as connection:
+        connection.execute(
+            """
+            UPDATE tasks SET
+                status = CASE WHEN attempts < ? THEN ? ELSE ? END,
+                lease_token = NULL, lease_expires = NULL, error = ?,
+                finished_at = CASE WHEN attempts < ? THEN NULL ELSE ? END
+            WHERE task_id = ? AND lease_token = ?
+            """,
+            (MAX_ATTEMPTS, PENDING, FAILED, error, MAX_ATTEMPTS, str(datetime.utcnow()), task, token),
+        )
+
+
+@contextmanager
+def uncollected_results(path: Path = QUEUE_PATH):
+    """
+    Committed results not collected yet, in task order, as
+    (task_id, payload). They are marked collected when the block exits
+    without error. Collectors hold the queue's lock file (not a write
+    transaction) for the block; a collector that dies after appending
+    appends those results again next time, which readers of the metric
+    stores dedupe (latest row per key).
+    """
+    with store_lock(path):
+        connection = connect(path)
+        try:
+            rows = connection.execute(
+                """
+                SELECT r.task_id, r.payload FROM results r JOIN tasks t USING (task_id)
+                WHERE r.collected = 0 ORDER BY t.rowid
+                """
+            ).fetchall()
+        finally:
+            connection.close()
+
+        yield [(task, json.loads(payload)) for task, payload in rows]
+
+        with transaction(path) as connection:
+            connection.executemany(
+                "UPDATE results SET collected = 1 WHERE task_id = ?", [(task,) for task, _ in rows]
+            )
+
+
+def status_counts(path: Path = QUEUE_PATH) -> dict:
+    """
+    {(stage, status): count} over all tasks.
+    """
+    connection = connect(path)
+    try:
+        rows = connection.execute("SELECT stage, status, COUNT(*) FROM tasks GROUP BY stage, status").fetchall()
+    finally:
+        connection.close()
+    return {(stage, status): count for stage, status, count in rows}
+
+
+def failed_tasks(path: Path = QUEUE_PATH) -> list:
+    connection = connect(path)
+    try:
+        return connection.execute(
+            "SELECT task_id, attempts, error FROM tasks WHERE status = ? ORDER BY rowid", (FAILED,)
+        ).fetchall()
+    finally:
+        connection.close()
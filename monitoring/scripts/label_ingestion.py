@@ -0,0 +1,152 @@
+"""
+Label Ingestion
+
+Joins late-arriving ground truth onto the prediction log, recomputes
+performance and bias metrics for the batches it touches and streams
+the newly labelled records through the concept-drift detectors.
+
+- Labels are matched to logged predictions by entity ID
+  (prediction_log.py), so they can arrive in any order and in pieces
+- Performance, bias and threshold metrics are recomputed from the
+  logged scores and predictions; no model is loaded or re-run
+- Rows keep the stage each model had when it scored the batch, so a
+  later promotion does not relabel old metrics
+- Detectors only see records they have not seen yet (checkpointed per
+  batch by entity ID, concept_drift.py), in batch order
+- Recomputed rows are appended to the stores; readers keep the latest
+  record per batch and model (rule_engine.prepare_source)
+"""
+
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+import concept_drift
+import model_registry
+from batch_scoring import ENTITY_ID_COLUMN, PRODUCTION_BATCH_DIR, TARGET_COLUMN, entity_ids, read_batch
+from bias_monitoring import BIAS_METRICS_PATH, bias_records
+from metrics_store import append_rows
+from performance_monitoring import METRICS_STORE_PATH, performance_records
+from prediction_log import ingest_labels, labelled_predictions
+from threshold_analysis import load_curve_history, store_threshold_records, threshold_records
+
+
+def recompute_batches(batches, batch_dir: Path = PRODUCTION_BATCH_DIR) -> tuple:
+    """
+    Performance and bias rows of every logged model for the labelled
+    records of the given batches, and concept-drift rows for the records
+    labelled since they were last streamed. Returns (performance_df, bias_df).
+    """
+    logged = labelled_predictions(batches)
+    # Predictions logged before stages were recorded use the current stage
+    current_stages = {
+        version: entry["stage"]
+        for version, entry in model_registry.load_index()["versions"].items()
+    }
+
+    performance = []
+    bias = []
+    threshold_summaries, threshold_curves = [], []
+    threshold_history = load_curve_history()
+    change_points = []
+    detector_state = concept_drift.load_state()
+
+    for batch, batch_log in logged.groupby("batch", sort=True):
+        batch_file = batch_dir / f"{batch}.csv"
+        if not batch_file.exists():
+            print(f"Skipping {batch}: batch file not found")
+            continue
+
+        df = read_batch(batch_file)
+        df.index = entity_ids(df, batch).to_numpy()
+
+        for model_version, model_log in batch_log.groupby("model_version", sort=True):
+            # Same record order for every model, so bootstrap resamples match
+            model_log = model_log.sort_values("entity_id")
+            labelled = df.loc[model_log["entity_id"]].assign(
+                **{TARGET_COLUMN: model_log["label"].to_numpy()}
+            )
+            predictions = {
+                model_version: (
+                    model_log["prediction"].to_numpy(),
+                    model_log["score"].to_numpy(dtype=float),
+                )
+            }
+            scored_stage = model_log["stage"].dropna()
+            stages = {
+                model_version: scored_stage.iloc[0] if len(scored_stage) else current_stages.get(model_version)
+            }
+
+            performance += performance_records(
+                batch, len(df), labelled[TARGET_COLUMN], predictions, stages
+            )
+            bias += bias_records(batch, labelled.reset_index(drop=True), predictions, stages)
+            summaries, curves = threshold_records(
+                batch, labelled[TARGET_COLUMN], predictions, stages, threshold_history
+            )
+            threshold_summaries += summaries
+            threshold_curves += curves
+            threshold_history = pd.concat([threshold_history, *curves], ignore_index=True)
+
+            in_batch_order = model_log.assign(
+                position=df.index.get_indexer(model_log["entity_id"])
+            ).sort_values("position")
+            change_points += concept_drift.stream_batch(
+                batch,
+                in_batch_order["entity_id"],
+                in_batch_order["position"],
+                in_batch_order["label"].reset_index(drop=True),
+                {
+                    model_version: (
+                        in_batch_order["prediction"].to_numpy(),
+                        in_batch_order["score"].to_numpy(dtype=float),
+                    )
+                },
+                stages,
+                detector_state,
+            )
+
+    performance_df = pd.DataFrame(performance)
+    bias_df = pd.DataFrame(bias)
+
+    if not performance_df.empty:
+        append_rows(METRICS_STORE_PATH, performance_df)
+    if not bias_df.empty:
+        append_rows(BIAS_METRICS_PATH, bias_df)
+    store_threshold_records(threshold_summaries, threshold_curves)
+
+    # Detector state is only saved once its rows are in the store
+    if change_points:
+        append_rows(concept_drift.CONCEPT_DRIFT_PATH, pd.DataFrame(change_points))
+    concept_drift.save_state(detector_state)
+
+    return performance_df, bias_df
+
+
+def ingest(labels_path: Path, id_column: str = ENTITY_ID_COLUMN, label_column: str = TARGET_COLUMN) -> list:
+    """
+    Join a file of late labels onto the prediction log and recompute
+    the affected batches. Returns the affected batch names.
+    """
+    labels = pd.read_csv(labels_path, dtype={id_column: str})
+    labels = labels.rename(columns={id_column: "entity_id", label_column: "label"})
+    labels = labels.loc[labels["label"].notna(), ["entity_id", "label"]]
+
+    affected = ingest_labels(labels)
+    if affected:
+        recompute_batches(affected)
+
+    return affected
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("labels", type=Path, help="CSV of late labels")
+    parser.add_argument("--id-column", default=ENTITY_ID_COLUMN)
+    parser.add_argument("--label-column", default=TARGET_COLUMN)
+    args = parser.parse_args()
+
+    affected = ingest(args.labels, args.id_column, args.label_column)
+
+    print(f"Labels joined; recomputed {len(affected)} batch(es): {', '.join(affected) or '-'}")
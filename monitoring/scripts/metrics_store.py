@@ -0,0 +1,225 @@
+"""
+Metrics Store — shared access helpers
+
+The metric stores under monitoring/metrics_store are append-only CSVs.
+These helpers let consumers read only the rows appended since their
+last visit instead of re-reading the full history, and let writers
+append rows whose schema gained columns.
+
+- Appends are aligned to the existing header
+- A new column rewrites the file once and bumps its generation, so
+  incremental readers know their byte offsets are no longer valid
+- Writers hold an exclusive lock on `<csv>.lock` (fcntl / msvcrt) and
+  commit each append with one write, so parallel processes never
+  interleave lines or write a second header; readers need no lock
+- compact() merges re-run duplicates and sorts by time under the same
+  lock (store_compaction.py runs it for every store)
+- Rows scored by challenger models are kept apart from the champion's
+- Record counts (COUNT_COLUMNS) are written as integers, including on
+  rewrites where older rows leave them empty
+"""
+
+import io
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# Record counts, written as integers (empty for rows stored before the column existed)
+COUNT_COLUMNS = ["batch_size", "labelled_size"]
+
+
+def _meta_path(path: Path) -> Path:
+    return path.with_name(path.name + ".meta.json")
+
+
+def store_generation(path: Path) -> int:
+    """
+    Generation counter of a store, bumped whenever the file is rewritten.
+    """
+    meta_path = _meta_path(Path(path))
+    if not meta_path.exists():
+        return 0
+
+    with open(meta_path) as f:
+        return json.load(f)["generation"]
+
+
+def _bump_generation(path: Path):
+    meta_path = _meta_path(path)
+    tmp_path = meta_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"generation": store_generation(path) + 1}, f)
+    os.replace(tmp_path, meta_path)
+
+
+def read_header(path: Path) -> list:
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+@contextmanager
+def store_lock(path: Path):
+    """
+    Exclusive inter-process lock of a store, held by every writer.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path.with_name(path.name + ".lock"), "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _with_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Count columns as nullable integers, so missing values do not turn
+    them into floats.
+    """
+    counts = {column: "Int64" for column in COUNT_COLUMNS if column in df.columns}
+    return df.astype(counts) if counts else df
+
+
+def _rewrite(path: Path, df: pd.DataFrame):
+    """
+    Replace a store atomically and bump its generation.
+    """
+    tmp_path = path.with_suffix(".tmp")
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    _bump_generation(path)
+
+
+def _commit(path: Path, data: bytes):
+    """
+    Append complete lines in one write. A torn tail left by a writer
+    that died mid-append is cut first, so it never joins a new row.
+    """
+    with open(path, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size:
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                f.seek(0)
+                content = f.read()
+                f.truncate(content.rfind(b"\n") + 1)
+        f.seek(0, os.SEEK_END)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def append_rows(path: Path, df: pd.DataFrame):
+    """
+    Append rows to a metric CSV, writing the header for a new file.
+    Columns missing from the rows are left empty; columns missing from
+    the file trigger a one-off rewrite with the extended header.
+    Safe to call from parallel processes.
+    """
+    path = Path(path)
+    df = _with_counts(df)
+
+    with store_lock(path):
+        if not path.exists() or path.stat().st_size == 0:
+            tmp_path = path.with_suffix(".tmp")
+            df.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            return
+
+        header = read_header(path)
+        new_columns = [column for column in df.columns if column not in header]
+
+        if new_columns:
+            existing = _with_counts(pd.read_csv(path))
+            _rewrite(path, pd.concat([existing, df], ignore_index=True)[header + new_columns])
+            return
+
+        _commit(path, df.reindex(columns=header).to_csv(index=False, header=False).encode())
+
+
+def compact(path: Path, keys: list, sort_by: str = "timestamp", fill: dict = None) -> tuple:
+    """
+    Merge re-runs of a store: keep the latest row per `keys` (those
+    present in the file), ordered by `sort_by`. Missing key values are
+    first filled from `fill` ({column: value}), so rows written before a
+    key column existed merge with their successors. The file is only
+    rewritten when something changes. Returns (rows_before, rows_after).
+    """
+    path = Path(path)
+
+    with store_lock(path):
+        df = _with_counts(pd.read_csv(path))
+        before = len(df)
+
+        keys = [key for key in keys if key in df.columns]
+        compacted = df
+        fill = {column: value for column, value in (fill or {}).items() if column in df.columns}
+        filled = bool(fill) and df[list(fill)].isna().any().any()
+        if filled:
+            compacted = compacted.fillna(fill)
+        if sort_by in df.columns:
+            compacted = compacted.assign(
+                _order=pd.to_datetime(compacted[sort_by], errors="coerce")
+            ).sort_values("_order", kind="stable").drop(columns="_order")
+        if keys:
+            compacted = compacted.drop_duplicates(keys, keep="last")
+
+        if len(compacted) != before or not compacted.index.equals(df.index) or filled:
+            _rewrite(path, compacted)
+
+    return before, len(compacted)
+
+
+def champion_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rows produced by the champion model. Rows written before models were
+    staged have no stage and count as champion rows.
+    """
+    if "stage" not in df.columns:
+        return df
+
+    return df[df["stage"].isna() | (df["stage"] == "champion")]
+
+
+def read_since(path: Path, offset: int = 0, **read_kwargs):
+    """
+    Read rows appended to a metric CSV after byte `offset`.
+
+    Returns (new_rows, new_offset). Only complete lines are consumed,
+    so a row still being written is picked up by the next call.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = max(offset, len(header))
+        f.seek(start)
+        data = f.read()
+
+    data = data[:data.rfind(b"\n") + 1]
+    rows = pd.read_csv(io.BytesIO(header + data), **read_kwargs)
+
+    return rows, start + len(data)
@@ -0,0 +1,261 @@
+"""
+Model Registry
+
+Single place where model artifacts are stored, versioned and loaded.
+
+- Each version is an uncompressed joblib dump with its sha256 and
+  metadata (parent version, training batches, preprocessing hash)
+  recorded in models/registry/registry.json
+- Loading memory-maps the artifact's arrays (mmap_mode="r"), so
+  processes loading the same version share the pages through the OS
+  page cache instead of holding private copies
+- Loaded models are kept in a small in-process LRU keyed by content
+  hash; the hash is verified once per cache miss
+- The baseline model is registered as v1.0 (champion) on first use;
+  retraining it (train_baseline_model.py) registers and promotes the
+  next major version
+- Index updates (register, promote, baseline registration) hold an
+  exclusive lock on registry.json.lock (metrics_store.store_lock), so
+  parallel workers neither register a version twice nor lose entries;
+  the index and artifacts are written to unique temporary files and
+  renamed into place
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+import joblib
+
+from metrics_store import store_lock
+
+# Paths
+REGISTRY_DIR = Path("models/registry")
+INDEX_PATH = REGISTRY_DIR / "registry.json"
+BASELINE_MODEL_PATH = Path("models/baseline_model.joblib")
+BASELINE_METADATA_PATH = Path("models/metadata.json")
+BASELINE_VERSION = "v1.0"
+
+# Configuration
+MODEL_CACHE_SIZE = 4
+STAGES = ["champion", "challenger", "archived"]
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def preprocessing_hash(model) -> str:
+    """
+    Content hash of the fitted preprocessing step. Versions sharing it
+    produce identical feature matrices for the same input.
+    """
+    return joblib.hash(model.named_steps["preprocessing"])
+
+
+def load_index() -> dict:
+    if not INDEX_PATH.exists():
+        return {"versions": {}}
+
+    with open(INDEX_PATH) as f:
+        return json.load(f)
+
+
+def _replace(path: Path, write):
+    """
+    Write a file through a unique temporary file in its directory and
+    rename it into place, so readers never see a partial file.
+    """
+    with tempfile.NamedTemporaryFile("wb", dir=path.parent, suffix=".tmp", delete=False) as f:
+        tmp_path = Path(f.name)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def save_index(index: dict):
+    """
+    Write the index atomically. Callers updating it hold index_lock().
+    """
+    REGISTRY_DIR.mkdir(parents=True, exist_ok=True)
+    _replace(INDEX_PATH, lambda path: path.write_text(json.dumps(index, indent=2, default=str)))
+
+
+def index_lock():
+    """
+    Exclusive inter-process lock for read-modify-write of the index.
+    Not reentrant: take it once per update.
+    """
+    return store_lock(INDEX_PATH)
+
+
+def register(model, version: str, parent_version: str = None, stage: str = "challenger", metadata: dict = None) -> dict:
+    """
+    Store a fitted model as a new version and return its registry entry.
+    """
+    if stage not in STAGES:
+        raise ValueError(f"Unknown stage '{stage}' (expected one of {STAGES})")
+
+    with index_lock():
+        return _register(load_index(), model, version, parent_version, stage, metadata)
+
+
+def _register(index: dict, model, version: str, parent_version: str, stage: str, metadata: dict) -> dict:
+    if version in index["versions"]:
+        raise ValueError(f"Model version {version} is already registered")
+
+    version_dir = REGISTRY_DIR / version
+    version_dir.mkdir(parents=True, exist_ok=True)
+    artifact = version_dir / "model.joblib"
+
+    # Uncompressed so numpy arrays can be memory-mapped on load
+    _replace(artifact, lambda path: joblib.dump(model, path, compress=0))
+
+    entry = {
+        "version": version,
+        "artifact": str(artifact),
+        "sha256": file_sha256(artifact),
+        "preprocessing_hash": preprocessing_hash(model),
+        "parent_version": parent_version,
+        "stage": stage,
+        "registered_at": datetime.utcnow(),
+        "metadata": metadata or {},
+    }
+
+    with open(version_dir / "metadata.json", "w") as f:
+        json.dump(entry, f, indent=2, default=str)
+
+    if stage == "champion":
+        for other in index["versions"].values():
+            if other["stage"] == "champion":
+                other["stage"] = "archived"
+
+    index["versions"][version] = entry
+    save_index(index)
+    return entry
+
+
+def baseline_version() -> str:
+    """
+    Version the baseline model is registered under. Metric rows written
+    before rows carried a model_version were produced by it.
+    """
+    if not BASELINE_METADATA_PATH.exists():
+        return BASELINE_VERSION
+
+    with open(BASELINE_METADATA_PATH) as f:
+        return json.load(f).get("model_version", BASELINE_VERSION)
+
+
+def ensure_baseline() -> dict:
+    """
+    Register the baseline model as the first champion if the registry
+    is empty.
+    """
+    index = load_index()
+    if index["versions"]:
+        return index
+
+    with index_lock():
+        # Another process may have registered it while we waited
+        index = load_index()
+        if index["versions"]:
+            return index
+
+        if not BASELINE_MODEL_PATH.exists():
+            raise RuntimeError("No registered models and no baseline model found")
+
+        metadata = {}
+        if BASELINE_METADATA_PATH.exists():
+            with open(BASELINE_METADATA_PATH) as f:
+                metadata = json.load(f)
+
+        _register(
+            index,
+            joblib.load(BASELINE_MODEL_PATH),
+            metadata.get("model_version", BASELINE_VERSION),
+            parent_version=None,
+            stage="champion",
+            metadata=metadata,
+        )
+    return load_index()
+
+
+def resolve(version: str = None) -> dict:
+    """
+    Registry entry for a version, or for the current champion.
+    """
+    index = ensure_baseline()
+
+    if version is None:
+        champions = [v for v in index["versions"].values() if v["stage"] == "champion"]
+        if not champions:
+            raise RuntimeError("No champion model registered")
+        return champions[-1]
+
+    if version not in index["versions"]:
+        raise ValueError(f"Unknown model version {version}")
+    return index["versions"][version]
+
+
+def next_version(major: bool = False) -> str:
+    """
+    Version number after the most recently registered one: the next
+    minor version, or with `major` the next major one (a model trained
+    from scratch rather than updated from its parent).
+    """
+    versions = [v.lstrip("v").split(".") for v in ensure_baseline()["versions"]]
+    if major:
+        return f"v{max(int(v[0]) for v in versions) + 1}.0"
+
+    latest_major, latest_minor = versions[-1]
+    return f"v{latest_major}.{int(latest_minor) + 1}"
+
+
+def promote(version: str) -> dict:
+    """
+    Make a version the champion; the previous champion is archived.
+    """
+    ensure_baseline()
+
+    with index_lock():
+        index = load_index()
+        if version not in index["versions"]:
+            raise ValueError(f"Unknown model version {version}")
+
+        for entry in index["versions"].values():
+            if entry["stage"] == "champion":
+                entry["stage"] = "archived"
+        index["versions"][version]["stage"] = "champion"
+
+        save_index(index)
+    return index["versions"][version]
+
+
+@lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _load_artifact(artifact: str, sha256: str):
+    if file_sha256(Path(artifact)) != sha256:
+        raise RuntimeError(f"Model artifact {artifact} does not match its registered hash")
+
+    return joblib.load(artifact, mmap_mode="r")
+
+
+def load(version: str = None):
+    """
+    Load a registered model (the champion by default).
+    Returns (version, model); the model is shared and must not be mutated.
+    """
+    entry = resolve(version)
+    return entry["version"], _load_artifact(entry["artifact"], entry["sha256"])
@@ -1,21 +1,47 @@
+"""
+Computes precision, recall and ROC-AUC per production batch for every
+monitored model (champion plus challengers) and stores them as a
+time-series CSV.
+
+- Each batch is read once and scored by all models (batch_scoring.py)
+- Rows carry the model version and its stage at scoring time
+- Every metric has a bootstrap confidence interval
+  (<metric>_lower / <metric>_upper, see bootstrap.py)
+- A threshold sweep records precision, recall, F1 and alert volume
+  at every threshold from one sort of the scores (threshold_analysis.py)
+- Online concept-drift detectors run over the per-record error stream
+  and locate change points within a batch (concept_drift.py)
+- Slice performance (champion) and slice feature drift come from the
+  same scored batch (slice_monitoring.py)
+- Predictions are logged by entity ID (prediction_log.py); metrics
+  cover the records labelled at scoring time and are recomputed when
+  late labels arrive (label_ingestion.py)
+"""
+
+import argparse
+import numpy as np
 import pandas as pd
 from pathlib import Path
-import joblib
 from sklearn.metrics import precision_score, recall_score, roc_auc_score
 from datetime import datetime
 
+from batch_scoring import batch_labels, entity_ids, monitored_models, score_batches
+import concept_drift
+from bootstrap import interval, poisson_weights, precision_recall_samples, roc_auc_samples
+from metrics_store import append_rows
+from prediction_log import log_predictions
+from slice_monitoring import SliceMonitor, champion_predictions, store_slice_frames
+from threshold_analysis import load_curve_history, store_threshold_records, threshold_records
+
 # Configuration
 POSITIVE_LABEL = "Yes"
 
-MODEL_PATH = Path("models/baseline_model.joblib")
-PRODUCTION_BATCH_DIR = Path("data/production_batches")
-
 # Snapshot report (overwritten each run)
 SNAPSHOT_OUTPUT_PATH = Path(
     "monitoring/performance_reports/model_performance.csv"
 )
 
-# Time-series metrics store (append-only, fixed schema)
+# Time-series metrics store (append-only, columns only ever added)
 METRICS_STORE_PATH = Path(
     "monitoring/metrics_store/performance_metrics.csv"
 )
@@ -23,77 +49,168 @@ METRICS_STORE_PATH = Path(
 SNAPSHOT_OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
 METRICS_STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-# Loading trained model
-model = joblib.load(MODEL_PATH)
-
-snapshot_records = []
 
-# Processing each production batch
-for batch_file in sorted(PRODUCTION_BATCH_DIR.glob("production_batch_*.csv")):
-    batch_df = pd.read_csv(batch_file)
-
-    # Enforcing schema consistency (matches training)
-    for col in batch_df.select_dtypes(include=["object"]).columns:
-        batch_df[col] = batch_df[col].astype(str)
-
-    batch_size = len(batch_df)
+def evaluate_performance(y_true: pd.Series, y_pred, y_pred_proba) -> dict:
+    return {
+        "precision": precision_score(
+            y_true, y_pred, pos_label=POSITIVE_LABEL
+        ),
+        "recall": recall_score(
+            y_true, y_pred, pos_label=POSITIVE_LABEL
+        ),
+        "roc_auc": roc_auc_score(
+            (y_true == POSITIVE_LABEL).astype(int),
+            y_pred_proba
+        ),
+    }
+
+
+def performance_intervals(weights, y_true: pd.Series, y_pred, y_pred_proba) -> dict:
+    """
+    Bootstrap confidence bounds for precision, recall and ROC-AUC.
+    """
+    actual = (y_true == POSITIVE_LABEL).to_numpy(dtype=float)
+    predicted = (y_pred == POSITIVE_LABEL).astype(float)
+
+    precision, recall = precision_recall_samples(weights, actual, predicted)
+    samples = {
+        "precision": precision,
+        "recall": recall,
+        "roc_auc": roc_auc_samples(weights, actual, y_pred_proba),
+    }
+
+    bounds = {}
+    for metric, values in samples.items():
+        bounds[f"{metric}_lower"], bounds[f"{metric}_upper"] = interval(values)
+    return bounds
+
+
+def performance_records(batch: str, batch_size: int, y_true: pd.Series, predictions: dict, stages: dict) -> list:
+    """
+    One metric row per model for a batch, over its labelled records
+    (`predictions` aligned with `y_true`).
+    """
+    # One set of resamples per batch, shared by all models
+    weights = poisson_weights(len(y_true))
+    records = []
+
+    for model_version, (y_pred, y_pred_proba) in predictions.items():
+        records.append({
+            "timestamp": datetime.utcnow(),
+            "batch": batch,
+            "batch_size": batch_size,
+            **evaluate_performance(y_true, y_pred, y_pred_proba),
+            **performance_intervals(weights, y_true, y_pred, y_pred_proba),
+            "model_version": model_version,
+            "stage": stages.get(model_version),
+            "labelled_size": len(y_true),
+        })
+
+    return records
+
+
+def evaluate_batch(batch: str, batch_df: pd.DataFrame, predictions: dict, stages: dict, threshold_history=None):
+    """
+    Log a scored batch's predictions and compute its metric and
+    threshold rows over the labelled records (thresholds recommended
+    from `threshold_history`, the stored grid curves by default).
+    Returns None when no record is labelled yet.
+    """
+    labels = batch_labels(batch_df)
+    ids = entity_ids(batch_df, batch)
+
+    for model_version, (y_pred, y_pred_proba) in predictions.items():
+        log_predictions(batch, ids, model_version, y_pred_proba, y_pred, labels, stages.get(model_version))
+
+    # Unlabelled records are scored later by label_ingestion.py
+    labelled = labels.notna().to_numpy()
+    if not labelled.any():
+        return None
+
+    labelled_predictions = {
+        model_version: (y_pred[labelled], y_pred_proba[labelled])
+        for model_version, (y_pred, y_pred_proba) in predictions.items()
+    }
+    summaries, curves = threshold_records(batch, labels[labelled], labelled_predictions, stages, threshold_history)
+
+    return {
+        "positions": np.flatnonzero(labelled),
+        "entity_ids": ids[labelled],
+        "labels": labels[labelled],
+        "predictions": labelled_predictions,
+        "records": performance_records(
+            batch, len(batch_df), labels[labelled], labelled_predictions, stages
+        ),
+        "threshold_summaries": summaries,
+        "threshold_curves": curves,
+    }
+
+
+def monitor_performance(versions=None) -> pd.DataFrame:
+    """
+    Score every production batch with the monitored models, log the
+    predictions, append metrics over the records labelled so far to
+    the store and overwrite the snapshot report.
+    """
+    models = monitored_models(versions)
+    stages = {entry["version"]: entry["stage"] for entry, _ in models}
+
+    records = []
+    change_points = []
+    threshold_summaries, threshold_curves = [], []
+    threshold_history = load_curve_history()
+    detector_state = concept_drift.load_state()
+    slices = SliceMonitor()
+    slice_performance, slice_drift = [], []
+
+    for batch, batch_df, predictions in score_batches(models):
+        performance, drift = slices.evaluate(batch, batch_df, champion_predictions(predictions, stages), stages)
+        slice_performance.append(performance)
+        slice_drift.append(drift)
+
+        result = evaluate_batch(batch, batch_df, predictions, stages, threshold_history)
+        if result is None:
+            continue
+
+        records += result["records"]
+        threshold_summaries += result["threshold_summaries"]
+        threshold_curves += result["threshold_curves"]
+        # Later batches fit their recommended thresholds on this one too
+        threshold_history = pd.concat([threshold_history, *result["threshold_curves"]], ignore_index=True)
+        change_points += concept_drift.stream_batch(
+            batch, result["entity_ids"], result["positions"], result["labels"], result["predictions"],
+            stages, detector_state,
+        )
 
-    X = batch_df.drop(columns=["Churn"])
-    y_true = batch_df["Churn"]
+    metrics_df = pd.DataFrame(records)
 
-    # Predictions
-    y_pred = model.predict(X)
-    y_pred_proba = model.predict_proba(X)[:, 1]
+    # Detector state is only saved once its rows are in the store
+    if change_points:
+        append_rows(concept_drift.CONCEPT_DRIFT_PATH, pd.DataFrame(change_points))
+    concept_drift.save_state(detector_state)
 
-    precision = precision_score(
-        y_true, y_pred, pos_label=POSITIVE_LABEL
-    )
-    recall = recall_score(
-        y_true, y_pred, pos_label=POSITIVE_LABEL
-    )
-    roc_auc = roc_auc_score(
-        (y_true == POSITIVE_LABEL).astype(int),
-        y_pred_proba
-    )
+    # Time-series metrics store
+    # Existing columns keep their meaning; new ones are appended
+    if not metrics_df.empty:
+        append_rows(METRICS_STORE_PATH, metrics_df)
+    store_threshold_records(threshold_summaries, threshold_curves)
+    store_slice_frames(slice_performance, slice_drift)
 
-    
     # Snapshot report (overwritten each run)
-    snapshot_records.append({
-        "batch": batch_file.stem,
-        "batch_size": batch_size,
-        "precision": precision,
-        "recall": recall,
-        "roc_auc": roc_auc
-    })
+    snapshot_df = metrics_df.drop(columns=["timestamp"], errors="ignore")
+    snapshot_df.to_csv(SNAPSHOT_OUTPUT_PATH, index=False)
 
-    
-    # Time-series metrics store
-    # FIXED SCHEMA (DO NOT CHANGE)
-    metrics_row = pd.DataFrame([{
-        "timestamp": datetime.utcnow(),
-        "batch": batch_file.stem,
-        "batch_size": batch_size,
-        "precision": precision,
-        "recall": recall,
-        "roc_auc": roc_auc
-    }])
-
-    if METRICS_STORE_PATH.exists():
-        metrics_row.to_csv(
-            METRICS_STORE_PATH,
-            mode="a",
-            header=False,
-            index=False
-        )
-    else:
-        metrics_row.to_csv(
-            METRICS_STORE_PATH,
-            index=False
-        )
+    return metrics_df
 
 
-# Saving snapshot report
-snapshot_df = pd.DataFrame(snapshot_records)
-snapshot_df.to_csv(SNAPSHOT_OUTPUT_PATH, index=False)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--models", nargs="+", default=None,
+        help="model versions to score (default: champion and challengers)"
+    )
+    args = parser.parse_args()
+
+    monitor_performance(args.models)
 
-print("Performance monitoring metrics generated successfully.")
\ No newline at end of file
+    print("Performance monitoring metrics generated successfully.")
@@ -0,0 +1,164 @@
+"""
+Prediction Log
+
+Every scored record (entity, batch, model version and its stage at
+scoring time, score, prediction) is logged to SQLite so ground truth arriving weeks later can be joined
+back to the predictions it belongs to.
+
+- The primary key starts with the entity ID, so a label join is an
+  index lookup per arriving label, independent of the log's size
+- A second index on batch serves recomputation of affected batches
+- Labels are joined in bulk through a temporary table in one statement
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# Paths
+LOG_PATH = Path("monitoring/prediction_log/predictions.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    entity_id     TEXT NOT NULL,
+    batch         TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    stage         TEXT,
+    scored_at     TEXT NOT NULL,
+    score         REAL NOT NULL,
+    prediction    TEXT NOT NULL,
+    label         TEXT,
+    labelled_at   TEXT,
+    PRIMARY KEY (entity_id, batch, model_version)
+);
+CREATE INDEX IF NOT EXISTS predictions_batch ON predictions (batch);
+"""
+
+# Columns added after the first release, with their SQL type
+ADDED_COLUMNS = {"stage": "TEXT"}
+
+
+def connect(path: Path = LOG_PATH) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+
+    # Logs created before a column existed get it (NULL for old rows)
+    existing = {row[1] for row in connection.execute("PRAGMA table_info(predictions)")}
+    for column, sql_type in ADDED_COLUMNS.items():
+        if column not in existing:
+            connection.execute(f"ALTER TABLE predictions ADD COLUMN {column} {sql_type}")
+
+    return connection
+
+
+@contextmanager
+def session(path: Path = LOG_PATH):
+    """
+    Connection committed on success and always closed.
+    """
+    connection = connect(path)
+    try:
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def log_predictions(
+    batch: str, entity_ids, model_version: str, scores, predictions, labels=None, stage: str = None,
+    path: Path = LOG_PATH,
+):
+    """
+    Record one model's predictions for a batch, with the model's stage
+    when it scored them. Re-scoring a batch replaces its rows but keeps
+    labels that already arrived.
+    """
+    scored_at = str(datetime.utcnow())
+    if labels is None:
+        labels = [None] * len(entity_ids)
+
+    rows = [
+        (str(entity_id), batch, model_version, stage, scored_at, float(score), str(prediction),
+         None if pd.isna(label) else str(label))
+        for entity_id, score, prediction, label in zip(entity_ids, scores, predictions, labels)
+    ]
+
+    with session(path) as connection:
+        connection.executemany(
+            """
+            INSERT INTO predictions (entity_id, batch, model_version, stage, scored_at, score, prediction, label)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (entity_id, batch, model_version) DO UPDATE SET
+                stage = excluded.stage,
+                scored_at = excluded.scored_at,
+                score = excluded.score,
+                prediction = excluded.prediction,
+                label = COALESCE(excluded.label, predictions.label)
+            """,
+            rows,
+        )
+
+
+def ingest_labels(labels: pd.DataFrame, path: Path = LOG_PATH) -> list:
+    """
+    Join late labels (columns entity_id, label) onto every logged
+    prediction of their entity. Returns the batches whose labels changed.
+    """
+    labelled_at = str(datetime.utcnow())
+
+    with session(path) as connection:
+        connection.execute("CREATE TEMP TABLE incoming (entity_id TEXT PRIMARY KEY, label TEXT NOT NULL)")
+        connection.executemany(
+            "INSERT OR REPLACE INTO incoming VALUES (?, ?)",
+            zip(labels["entity_id"].astype(str), labels["label"].astype(str)),
+        )
+
+        # Both statements are driven by the incoming labels, each probing
+        # the entity_id index (CROSS JOIN / IN pin that loop order)
+        affected = [
+            batch for (batch,) in connection.execute(
+                """
+                SELECT DISTINCT p.batch
+                FROM incoming i CROSS JOIN predictions p ON p.entity_id = i.entity_id
+                WHERE p.label IS NOT i.label
+                """
+            )
+        ]
+
+        connection.execute(
+            """
+            UPDATE predictions
+            SET label = (SELECT label FROM incoming WHERE incoming.entity_id = predictions.entity_id),
+                labelled_at = ?
+            WHERE entity_id IN (SELECT entity_id FROM incoming)
+              AND label IS NOT (SELECT label FROM incoming WHERE incoming.entity_id = predictions.entity_id)
+            """,
+            (labelled_at,),
+        )
+        connection.execute("DROP TABLE incoming")
+
+    return sorted(affected)
+
+
+def labelled_predictions(batches, path: Path = LOG_PATH) -> pd.DataFrame:
+    """
+    Logged predictions with labels for the given batches (batch index).
+    """
+    batches = list(batches)
+    placeholders = ", ".join("?" * len(batches))
+
+    with session(path) as connection:
+        return pd.read_sql_query(
+            f"""
+            SELECT entity_id, batch, model_version, stage, score, prediction, label
+            FROM predictions
+            WHERE batch IN ({placeholders}) AND label IS NOT NULL
+            """,
+            connection,
+            params=batches,
+        )
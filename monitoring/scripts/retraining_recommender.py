@@ -1,35 +1,210 @@
 """
 Translating monitoring signals (performance, drift, bias)
-into a concrete human decision: retrain or not. 
+into a concrete human decision: retrain or not.
+
+- Each metric store is loaded once; signals for every batch come
+  from groupby aggregations (bulk mode backfills all decisions)
+- RETRAIN decisions trigger an incremental model update
+  (incremental_retraining.py)
+- Low precision that a different decision threshold would fix (and no
+  drift breach) yields RETHRESHOLD with the suggested threshold
+  (threshold_analysis.py) instead of a retrain, when the threshold was
+  fit on earlier batches rather than on the batch it is judged on
+- Challenger models scored next to the champion are compared on
+  the batches both were evaluated on (--compare)
 """
 
+import argparse
 from pathlib import Path
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+import model_registry
+from metrics_store import append_rows
+from rule_engine import prepare_source
+
 # Paths to stored metrics
 PERFORMANCE_PATH = Path("monitoring/metrics_store/performance_metrics.csv")
 DRIFT_PATH = Path("monitoring/metrics_store/drift_metrics.csv")
 BIAS_PATH = Path("monitoring/metrics_store/bias_metrics.csv")
+THRESHOLD_PATH = Path("monitoring/metrics_store/threshold_metrics.csv")
 
 # Paths where decisions will be saved
 DECISION_PATH = Path("monitoring/decisions/retraining_decisions.csv")
-DECISION_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 # Thresholds (business policy)
 MIN_PRECISION = 0.60
 MAX_ALLOWED_HIGH_DRIFT = 2
+MAX_DRIFT_P_VALUE = 0.05  # HIGH drift the permutation test rejects is not counted
 MAX_BIAS_GAP = 0.15
+MIN_PROMOTION_GAIN = 0.01  # mean ROC-AUC gain over the champion
+MIN_RETHRESHOLD_RECALL = 0.50  # recall a suggested threshold must keep
+
+# Run an incremental model update after RETRAIN decisions
+AUTO_RETRAIN = True
+
+
+def load_metrics() -> tuple:
+    """
+    Read each metric store once, keeping the latest record per key
+    (re-runs append duplicate rows).
+    """
+    # Ensuring metric files exist
+    if not PERFORMANCE_PATH.exists():
+        raise RuntimeError("Performance metrics not found")
+
+    if not DRIFT_PATH.exists():
+        raise RuntimeError("Drift metrics not found")
+
+    if not BIAS_PATH.exists():
+        raise RuntimeError("Bias metrics not found")
+
+    perf_df = prepare_source(pd.read_csv(PERFORMANCE_PATH, dtype={"batch": str}), ["batch"])
+    drift_df = prepare_source(
+        pd.read_csv(DRIFT_PATH, dtype={"batch": str, "feature": str}),
+        ["batch", "feature"],
+    )
+    bias_df = prepare_source(
+        pd.read_csv(BIAS_PATH, dtype={"batch": str, "feature": str, "group": str}),
+        ["batch", "feature", "group"],
+    )
+    threshold_df = pd.DataFrame(columns=["batch"])
+    if THRESHOLD_PATH.exists():
+        threshold_df = prepare_source(pd.read_csv(THRESHOLD_PATH, dtype={"batch": str}), ["batch"])
+    return perf_df, drift_df, bias_df, threshold_df
+
+
+def _join_reasons(*parts: pd.Series) -> pd.Series:
+    """
+    Join per-batch reason columns with "; ", skipping empty ones.
+    """
+    joined = parts[0].str.cat(list(parts[1:]), sep="; ")
+    return (
+        joined.str.replace(r"(; )+", "; ", regex=True)
+              .str.replace(r"^; |; $", "", regex=True)
+    )
+
+
+def score_batches(
+    perf_df: pd.DataFrame,
+    drift_df: pd.DataFrame,
+    bias_df: pd.DataFrame,
+    threshold_df: pd.DataFrame = None,
+) -> pd.DataFrame:
+    """
+    Evaluating all monitoring signals for every batch at once
+    and return one action + reasons per batch.
+    """
+    perf = perf_df.drop_duplicates("batch", keep="last").set_index("batch")
+    batches = perf.index
+
+    # Precision breaches
+    precision = perf["precision"]
+    low_precision = precision < MIN_PRECISION
+    precision_reason = pd.Series(
+        "Precision below threshold ("
+        + precision.map("{:.3f}".format)
+        + f" < {MIN_PRECISION})",
+        index=batches,
+    ).where(low_precision, "")
+
+    # HIGH drift counts (as alert rule high_drift_features: records
+    # without a p-value count, records the test does not reject do not)
+    high = drift_df["drift_level"] == "HIGH"
+    if "p_value" in drift_df:
+        high &= ~(drift_df["p_value"] >= MAX_DRIFT_P_VALUE)
+    high_drift = (
+        drift_df[high]
+        .groupby("batch")
+        .size()
+        .reindex(batches, fill_value=0)
+    )
+    drift_breach = high_drift >= MAX_ALLOWED_HIGH_DRIFT
+    drift_reason = (
+        "High drift detected in " + high_drift.astype(str) + " features"
+    ).where(drift_breach, "")
+
+    # Recall disparity within same sensitive feature
+    gaps = bias_df.groupby(["batch", "feature"], sort=False)["recall"].agg(["max", "min"])
+    gaps = (gaps["max"] - gaps["min"]).reset_index(name="gap")
+    gaps = gaps[gaps["gap"] > MAX_BIAS_GAP]
+    bias_reason = (
+        ("Bias detected in " + gaps["feature"] + " (recall gap " + gaps["gap"].map("{:.2f}".format) + ")")
+        .groupby(gaps["batch"], sort=False)
+        .agg("; ".join)
+        .reindex(batches, fill_value="")
+    )
+
+    # Low precision without drift that another threshold fixes: only
+    # thresholds fit on earlier batches, whose metrics are out-of-sample
+    thresholds = (
+        threshold_df.drop_duplicates("batch", keep="last").set_index("batch").reindex(batches)
+        if threshold_df is not None and not threshold_df.empty
+        else pd.DataFrame(
+            np.nan, index=batches,
+            columns=["recommended_threshold", "recommended_precision", "recommended_recall"],
+        )
+    )
+    out_of_sample = (
+        thresholds["recommended_fit"] == "earlier_batches"
+        if "recommended_fit" in thresholds
+        else pd.Series(False, index=batches)
+    )
+    rethreshold = (
+        low_precision & ~drift_breach & out_of_sample
+        & (thresholds["recommended_precision"] >= MIN_PRECISION)
+        & (thresholds["recommended_recall"] >= MIN_RETHRESHOLD_RECALL)
+    )
+    threshold_reason = (
+        "Threshold " + thresholds["recommended_threshold"].map("{:.3f}".format)
+        + " (fit on earlier batches) restores precision (" + thresholds["recommended_precision"].map("{:.3f}".format)
+        + ", recall " + thresholds["recommended_recall"].map("{:.3f}".format) + ")"
+    ).where(rethreshold, "")
+
+    # Action precedence: RETRAIN > RETHRESHOLD > ESCALATE_FAIRNESS > NO_ACTION
+    action = np.select(
+        [
+            (drift_breach | (low_precision & ~rethreshold)).to_numpy(),
+            rethreshold.to_numpy(),
+            (bias_reason != "").to_numpy(),
+        ],
+        ["RETRAIN", "RETHRESHOLD", "ESCALATE_FAIRNESS"],
+        default="NO_ACTION",
+    )
+
+    reasons = _join_reasons(precision_reason, threshold_reason, drift_reason, bias_reason)
+
+    return pd.DataFrame({
+        "batch": batches,
+        "action": action,
+        "reasons": reasons.where(reasons != "", "All metrics stable").to_numpy(),
+    })
 
-# Ensuring metric files exist
-if not PERFORMANCE_PATH.exists():
-    raise RuntimeError("Performance metrics not found")
 
-if not DRIFT_PATH.exists():
-    raise RuntimeError("Drift metrics not found")
+def save_decisions(decisions: pd.DataFrame):
+    """
+    Append decision records in a single write.
+    """
+    decisions = decisions.copy()
+    decisions.insert(0, "timestamp", datetime.utcnow())
 
-if not BIAS_PATH.exists():
-    raise RuntimeError("Bias metrics not found")
+    DECISION_PATH.parent.mkdir(parents=True, exist_ok=True)
+    append_rows(DECISION_PATH, decisions)
+
+    return decisions
+
+
+def recommend_all(write: bool = True) -> pd.DataFrame:
+    """
+    Bulk mode: recommend an action for every batch in the metric stores.
+    """
+    decisions = score_batches(*load_metrics())
+
+    if write:
+        decisions = save_decisions(decisions)
+
+    return decisions
 
 
 def recommend_action(batch_name: str):
@@ -37,78 +212,100 @@ def recommend_action(batch_name: str):
     Evaluating all monitoring signals for a batch
     and return an action + reasons.
     """
+    decisions = score_batches(*load_metrics())
+    decision = decisions[decisions["batch"] == batch_name]
 
-    reasons = []
-    action = "NO_ACTION"
+    if decision.empty:
+        raise ValueError(f"No performance metrics for batch {batch_name}")
 
-    # Load latest performance metrics
-    perf_df = pd.read_csv(PERFORMANCE_PATH)
-    batch_perf = perf_df[perf_df["batch"] == batch_name].iloc[-1]
+    return save_decisions(decision).iloc[0].to_dict()
 
-    if batch_perf["precision"] < MIN_PRECISION:
-        reasons.append(
-            f"Precision below threshold ({batch_perf['precision']:.3f} < {MIN_PRECISION})"
-        )
-        action = "RETRAIN"
-
-    # Load drift metrics
-    drift_df = pd.read_csv(DRIFT_PATH)
-    batch_drift = drift_df[
-        (drift_df["batch"] == batch_name) &
-        (drift_df["drift_level"] == "HIGH")
-    ]
-
-    if len(batch_drift) >= MAX_ALLOWED_HIGH_DRIFT:
-        reasons.append(
-            f"High drift detected in {len(batch_drift)} features"
-        )
-        action = "RETRAIN"
-
-    # Load bias metrics (recall gaps)
-    bias_df = pd.read_csv(BIAS_PATH)
-    batch_bias = bias_df[bias_df["batch"] == batch_name]
-
-    # Check recall disparity within same sensitive feature
-    for feature in batch_bias["feature"].unique():
-        feature_df = batch_bias[batch_bias["feature"] == feature]
-        gap = feature_df["recall"].max() - feature_df["recall"].min()
-
-        if gap > MAX_BIAS_GAP:
-            reasons.append(
-                f"Bias detected in {feature} (recall gap {gap:.2f})"
-            )
-            if action != "RETRAIN":
-                action = "ESCALATE_FAIRNESS"
-
-    # Save decision record
-    decision_record = {
-        "timestamp": datetime.utcnow(),
-        "batch": batch_name,
-        "action": action,
-        "reasons": "; ".join(reasons) if reasons else "All metrics stable"
-    }
 
-    decision_df = pd.DataFrame([decision_record])
+def compare_models() -> pd.DataFrame:
+    """
+    Compare each scored model version with the champion over the
+    batches both were evaluated on: mean metrics, mean difference to
+    the champion and a recommendation per version.
+    """
+    perf_df = pd.read_csv(PERFORMANCE_PATH, dtype={"batch": str, "model_version": str})
+    if "model_version" not in perf_df.columns:
+        return pd.DataFrame()
+
+    perf_df = prepare_source(
+        perf_df.dropna(subset=["model_version"]), ["batch", "model_version"], champion_only=False
+    )
+    champion = model_registry.resolve()["version"]
+    if champion not in set(perf_df["model_version"]):
+        return pd.DataFrame()
 
-    if DECISION_PATH.exists():
-        decision_df.to_csv(DECISION_PATH, mode="a", header=False, index=False)
-    else:
-        decision_df.to_csv(DECISION_PATH, index=False)
+    metrics = ["precision", "recall", "roc_auc"]
+    scores = perf_df.pivot(index="batch", columns="model_version", values=metrics)
+    scores = scores[scores[("roc_auc", champion)].notna()]
+
+    comparison = pd.DataFrame({"batches": scores["roc_auc"].notna().sum()})
+    for metric in metrics:
+        comparison[metric] = scores[metric].mean()
+        comparison[f"{metric}_delta"] = scores[metric].sub(scores[metric][champion], axis=0).mean()
 
-    return decision_record
+    comparison["recommendation"] = np.select(
+        [
+            comparison.index == champion,
+            (comparison["roc_auc_delta"] >= MIN_PROMOTION_GAIN)
+            & (comparison["precision"] >= MIN_PRECISION),
+        ],
+        ["CHAMPION", "PROMOTE"],
+        default="KEEP_CHAMPION",
+    )
 
-# Action precedence: 
-# RETRAIN > ESCALATE_FAIRNESS > NO_ACTION 
-# Run for latest batch only
+    return comparison.rename_axis("model_version").reset_index()
+
+
+# Action precedence:
+# RETRAIN > RETHRESHOLD > ESCALATE_FAIRNESS > NO_ACTION
+# Run for latest batch only (or every batch with --all)
 if __name__ == "__main__":
-    perf_df = pd.read_csv(PERFORMANCE_PATH)
-    latest_batch = perf_df["batch"].iloc[-1]
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--all", action="store_true", help="recommend for every batch in one pass"
+    )
+    parser.add_argument(
+        "--no-retrain", action="store_true", help="skip the automatic incremental update"
+    )
+    parser.add_argument(
+        "--compare", action="store_true", help="compare challenger models with the champion"
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        comparison = compare_models()
+        if comparison.empty:
+            print("No challenger metrics to compare.")
+        else:
+            print(comparison.to_string(index=False, float_format="{:.3f}".format))
+        actions = pd.Series(dtype=str)
+    elif args.all:
+        decisions = recommend_all()
+        actions = decisions["action"]
+        print(actions.value_counts().to_string())
+        print(f"Saved {len(decisions)} decisions to {DECISION_PATH}")
+    else:
+        perf_df = pd.read_csv(PERFORMANCE_PATH)
+        latest_batch = perf_df["batch"].iloc[-1]
+
+        decision = recommend_action(latest_batch)
+
+        print("\nRETRAINING DECISION")
+        print("------------------")
+        print(f"Batch: {decision['batch']}")
+        print(f"Action: {decision['action']}")
+        print("Reasons:")
+        print(f"- {decision['reasons']}")
+        actions = pd.Series([decision["action"]])
 
-    decision = recommend_action(latest_batch)
+    # RETRAIN decisions trigger an incremental model update
+    if AUTO_RETRAIN and not args.no_retrain and (actions == "RETRAIN").any():
+        from incremental_retraining import print_report, retrain_on_decisions
 
-    print("\nRETRAINING DECISION")
-    print("------------------")
-    print(f"Batch: {decision['batch']}")
-    print(f"Action: {decision['action']}")
-    print("Reasons:")
-    print(f"- {decision['reasons']}")
\ No newline at end of file
+        record = retrain_on_decisions()
+        if record is not None:
+            print_report(record)
@@ -0,0 +1,399 @@
+"""
+Alert Rule Engine
+
+Loads declarative alert rules from YAML and compiles each rule into a
+vectorized pandas expression evaluated over every batch of a metric
+source in one pass.
+
+- Rules describe conditions only; reporting stays in alert_engine.py
+- The same evaluation serves the latest batch and historical backfills
+"""
+
+import numpy as np
+import pandas as pd
+import yaml
+from pathlib import Path
+
+from metrics_store import champion_rows
+
+# Paths
+RULES_PATH = Path("monitoring/config/alert_rules.yaml")
+
+# Metric sources rules can read, with the columns identifying one record
+SOURCES = {
+    "performance": {
+        "path": Path("monitoring/metrics_store/performance_metrics.csv"),
+        "keys": ["batch"],
+    },
+    "drift": {
+        "path": Path("monitoring/metrics_store/drift_metrics.csv"),
+        "keys": ["batch", "feature"],
+    },
+    "bias": {
+        "path": Path("monitoring/metrics_store/bias_metrics.csv"),
+        "keys": ["batch", "feature", "group"],
+    },
+    "slice_performance": {
+        "path": Path("monitoring/metrics_store/slice_performance_metrics.csv"),
+        "keys": ["batch", "slice"],
+    },
+    "slice_drift": {
+        "path": Path("monitoring/metrics_store/slice_drift_metrics.csv"),
+        "keys": ["batch", "slice", "feature"],
+    },
+    "concept_drift": {
+        "path": Path("monitoring/metrics_store/concept_drift_metrics.csv"),
+        "keys": ["batch", "detector"],
+    },
+}
+
+OPERATORS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+# What a `where` comparison does with rows that have no value
+MISSING_POLICIES = ["fail", "pass"]
+
+# Confidence bounds a rule can compare instead of the point estimate
+BOUNDS = ["lower", "upper"]
+BOUNDED_TYPES = ["threshold", "gap"]
+
+REQUIRED_FIELDS = {
+    "threshold": ["metric"],
+    "count": ["where"],
+    "gap": ["metric", "group_by"],
+    "rate_of_change": ["metric"],
+}
+
+# Structured output of every evaluated rule
+EVALUATION_COLUMNS = [
+    "rule",
+    "category",
+    "severity",
+    "batch",
+    "batch_timestamp",
+    "key",
+    "value",
+    "threshold",
+    "fired",
+    "message",
+    "detail",
+]
+
+
+def load_rules(path: Path = RULES_PATH) -> list:
+    """
+    Load and validate alert rules from YAML.
+    """
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+
+    defaults = config.get("defaults", {})
+    rules = [{**defaults, **rule} for rule in config.get("rules", [])]
+
+    for rule in rules:
+        name = rule.get("name", "<unnamed>")
+        missing = {"name", "source", "type", "op", "value"} - set(rule)
+
+        if rule.get("type") in REQUIRED_FIELDS:
+            missing |= set(REQUIRED_FIELDS[rule["type"]]) - set(rule)
+        else:
+            raise ValueError(f"Rule {name}: unknown type {rule.get('type')!r}")
+
+        if missing:
+            raise ValueError(f"Rule {name}: missing fields {sorted(missing)}")
+
+        if rule["source"] not in SOURCES:
+            raise ValueError(f"Rule {name}: unknown source {rule['source']!r}")
+
+        if rule["op"] not in OPERATORS:
+            raise ValueError(f"Rule {name}: unknown operator {rule['op']!r}")
+
+        if "bound" in rule:
+            if rule["bound"] not in BOUNDS:
+                raise ValueError(f"Rule {name}: unknown bound {rule['bound']!r}")
+            if rule["type"] not in BOUNDED_TYPES:
+                raise ValueError(f"Rule {name}: bound is not supported for {rule['type']} rules")
+
+        for column, condition in (rule.get("where") or {}).items():
+            if not isinstance(condition, dict):
+                continue
+            if condition.get("missing", "fail") not in MISSING_POLICIES:
+                raise ValueError(f"Rule {name}: unknown missing policy for {column!r}")
+            unknown = set(condition) - set(OPERATORS) - {"missing"}
+            if unknown:
+                raise ValueError(f"Rule {name}: unknown operator {sorted(unknown)} for {column!r}")
+
+        rule.setdefault("category", rule["source"])
+        rule.setdefault("severity", "medium")
+        rule.setdefault("message", name)
+
+    return rules
+
+
+def prepare_source(df: pd.DataFrame, keys: list, champion_only: bool = True) -> pd.DataFrame:
+    """
+    Keep the latest record per key (re-runs append duplicates) and
+    order records by the time their batch was last written.
+    Challenger model rows are dropped unless `champion_only` is False.
+    """
+    if champion_only:
+        df = champion_rows(df)
+    df = df.copy()
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+
+    df = (
+        df.sort_values("timestamp", kind="stable")
+          .drop_duplicates(keys, keep="last")
+    )
+    df["batch_timestamp"] = df.groupby("batch")["timestamp"].transform("max")
+
+    return df.sort_values(["batch_timestamp", "timestamp"], kind="stable").reset_index(drop=True)
+
+
+def key_dtypes(source: str) -> dict:
+    """
+    Read key columns as strings so keys compare equally across reads
+    (e.g. SeniorCitizen groups "0" / "1").
+    """
+    return {key: str for key in SOURCES[source]["keys"]}
+
+
+def load_sources(names=None) -> dict:
+    """
+    Read each metric source once and prepare it for rule evaluation.
+    Missing or empty sources are left out.
+    """
+    frames = {}
+
+    for name, source in SOURCES.items():
+        if names is not None and name not in names:
+            continue
+        if not source["path"].exists():
+            continue
+
+        df = pd.read_csv(source["path"], dtype=key_dtypes(name))
+        if df.empty:
+            continue
+
+        frames[name] = prepare_source(df, source["keys"])
+
+    return frames
+
+
+def _record_key(df: pd.DataFrame, keys: list) -> pd.Series:
+    """
+    Join the non-batch key columns into one string key (e.g. "gender/Male").
+    """
+    extra = [k for k in keys if k != "batch"]
+    if not extra:
+        return pd.Series("", index=df.index)
+
+    key = df[extra[0]].astype(str)
+    for column in extra[1:]:
+        key = key.str.cat(df[column].astype(str), sep="/")
+
+    return key
+
+
+def _where_mask(df: pd.DataFrame, where: dict) -> np.ndarray:
+    """
+    Boolean mask for a `where` clause: {column: value} for equality or
+    {column: {op: value}} for comparisons. A comparison with
+    `missing: pass` also matches rows without a value, including every
+    row when the column is absent (records stored before it existed).
+    """
+    mask = np.ones(len(df), dtype=bool)
+
+    for column, condition in (where or {}).items():
+        pass_missing = isinstance(condition, dict) and condition.get("missing") == "pass"
+        if column not in df:
+            if pass_missing:
+                continue
+            raise ValueError(f"where: column {column!r} is not in the source")
+
+        values = df[column].to_numpy()
+        if isinstance(condition, dict):
+            matched = np.ones(len(df), dtype=bool)
+            for op, value in condition.items():
+                if op != "missing":
+                    matched &= OPERATORS[op](values, value)
+            if pass_missing:
+                matched |= df[column].isna().to_numpy()
+            mask &= matched
+        elif isinstance(condition, list):
+            mask &= df[column].isin(condition).to_numpy()
+        else:
+            mask &= values == condition
+
+    return mask
+
+
+def _batches(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame.drop_duplicates("batch")[["batch", "batch_timestamp"]]
+
+
+def _bounded(values: pd.Series, bounds: pd.Series = None) -> pd.Series:
+    """
+    Confidence bound where one was stored, the point value otherwise
+    (records written before intervals were computed).
+    """
+    if bounds is None:
+        return values
+    return bounds.astype(float).fillna(values)
+
+
+def _compile_threshold(rule: dict, keys: list):
+    metric = rule["metric"]
+    bound_column = f"{metric}_{rule['bound']}" if "bound" in rule else None
+
+    def evaluate(frame):
+        frame = frame[_where_mask(frame, rule.get("where"))]
+        values = frame[metric].astype(float)
+        if bound_column in frame:
+            values = _bounded(values, frame[bound_column])
+
+        return pd.DataFrame({
+            "batch": frame["batch"],
+            "batch_timestamp": frame["batch_timestamp"],
+            "key": _record_key(frame, keys),
+            "value": values,
+        })
+
+    return evaluate
+
+
+def _compile_count(rule: dict, keys: list):
+    detail = rule.get("detail")
+
+    def evaluate(frame):
+        matched = frame[_where_mask(frame, rule["where"])]
+        counts = matched.groupby("batch").size()
+
+        result = _batches(frame).assign(key="")
+        result["value"] = result["batch"].map(counts).fillna(0).astype(float)
+
+        if detail:
+            names = matched[detail].astype(str).groupby(matched["batch"]).agg(", ".join)
+            result["detail"] = result["batch"].map(names)
+
+        return result
+
+    return evaluate
+
+
+def _compile_gap(rule: dict, keys: list):
+    metric = rule["metric"]
+    group_by = rule["group_by"]
+    min_groups = rule.get("min_groups", 2)
+    # Bounds of the gap itself are stored on every record of the group
+    bound_column = f"{metric}_gap_{rule['bound']}" if "bound" in rule else None
+
+    def evaluate(frame):
+        frame = frame[_where_mask(frame, rule.get("where"))]
+        grouped = frame.groupby(["batch", group_by], sort=False)
+        stats = grouped[metric].agg(["max", "min", "count"])
+        stats["gap"] = stats["max"] - stats["min"]
+        if bound_column in frame:
+            stats["gap"] = _bounded(stats["gap"], grouped[bound_column].first())
+        stats = stats.reset_index()
+
+        # Skip if fewer groups than required are present
+        stats = stats[stats["count"] >= min_groups]
+
+        batch_times = _batches(frame).set_index("batch")["batch_timestamp"]
+        return pd.DataFrame({
+            "batch": stats["batch"],
+            "batch_timestamp": stats["batch"].map(batch_times),
+            "key": stats[group_by].astype(str),
+            "value": stats["gap"].astype(float),
+        })
+
+    return evaluate
+
+
+def _compile_rate_of_change(rule: dict, keys: list):
+    metric = rule["metric"]
+    periods = rule.get("periods", 1)
+    relative = rule.get("relative", False)
+
+    def evaluate(frame):
+        frame = frame[_where_mask(frame, rule.get("where"))]
+        key = _record_key(frame, keys)
+
+        # Frames are ordered by batch time, so diffs run along history
+        grouped = frame[metric].astype(float).groupby(key)
+        change = grouped.pct_change(periods) if relative else grouped.diff(periods)
+
+        return pd.DataFrame({
+            "batch": frame["batch"],
+            "batch_timestamp": frame["batch_timestamp"],
+            "key": key,
+            "value": change,
+        }).dropna(subset=["value"])
+
+    return evaluate
+
+
+RULE_TYPES = {
+    "threshold": _compile_threshold,
+    "count": _compile_count,
+    "gap": _compile_gap,
+    "rate_of_change": _compile_rate_of_change,
+}
+
+
+def compile_rule(rule: dict):
+    """
+    Compile a rule into a function: prepared source frame -> evaluation
+    frame with one row per evaluated (batch, key).
+    """
+    keys = SOURCES[rule["source"]]["keys"]
+    compute = RULE_TYPES[rule["type"]](rule, keys)
+    compare = OPERATORS[rule["op"]]
+
+    def evaluate(frame: pd.DataFrame) -> pd.DataFrame:
+        try:
+            result = compute(frame).reset_index(drop=True)
+        except ValueError as exc:
+            raise ValueError(f"Rule {rule['name']}: {exc}") from exc
+
+        values = result["value"].to_numpy(dtype=float)
+        result["fired"] = compare(values, rule["value"]) & ~np.isnan(values)
+        result["rule"] = rule["name"]
+        result["category"] = rule["category"]
+        result["severity"] = rule["severity"]
+        result["threshold"] = rule["value"]
+        result["message"] = rule["message"]
+        if "detail" not in result:
+            result["detail"] = ""
+
+        return result[EVALUATION_COLUMNS]
+
+    return evaluate
+
+
+def evaluate_rules(rules: list, frames: dict, fired_only: bool = True) -> pd.DataFrame:
+    """
+    Evaluate every rule over all batches of its source.
+    Rules whose source is not available are skipped.
+    """
+    results = [
+        compile_rule(rule)(frames[rule["source"]])
+        for rule in rules
+        if rule["source"] in frames
+    ]
+
+    if not results:
+        return pd.DataFrame(columns=EVALUATION_COLUMNS)
+
+    evaluations = pd.concat(results, ignore_index=True)
+    if fired_only:
+        evaluations = evaluations[evaluations["fired"]].reset_index(drop=True)
+
+    return evaluations.sort_values(["batch_timestamp", "rule"], kind="stable").reset_index(drop=True)
@@ -0,0 +1,329 @@
+"""
+Slice Monitoring
+
+Performance and drift per data segment (slice), e.g. per Contract type
+or tenure bucket, configured in monitoring/config/slices.yaml.
+
+- Slice membership is coded as integers once per batch; each row maps
+  to one slice per slicing feature, so all slices are evaluated together
+- Precision, recall and ROC-AUC for every slice come from bincount
+  sums over the slice codes (ROC-AUC via within-slice ranks)
+- Precision and recall carry bootstrap confidence bounds (bootstrap.py)
+- Feature PSI per slice uses the bins and formulas of batch PSI
+  (drift_significance.psi_binning / psi_from_counts), so slice and
+  batch PSI share the drift severity thresholds
+- Runs inside performance monitoring (and its distributed tasks) on
+  the champion's predictions; this script re-runs it on its own
+- Results go to slice_performance_metrics.csv and
+  slice_drift_metrics.csv with a `slice` column (e.g. "Contract=One year")
+"""
+
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+import model_registry
+from batch_scoring import ENTITY_ID_COLUMN, TARGET_COLUMN, batch_labels, monitored_models, read_batch, score_batches
+from bootstrap import group_recall_samples, interval, poisson_weights
+from drift_severity import drift_levels
+from drift_significance import psi_bin_codes, psi_binning, psi_from_counts
+from metrics_store import append_rows
+
+# Paths
+SLICES_PATH = Path("monitoring/config/slices.yaml")
+REFERENCE_PATH = Path("data/reference/reference_data.csv")
+SLICE_PERFORMANCE_PATH = Path("monitoring/metrics_store/slice_performance_metrics.csv")
+SLICE_DRIFT_PATH = Path("monitoring/metrics_store/slice_drift_metrics.csv")
+
+# Configuration
+POSITIVE_LABEL = "Yes"
+
+
+def load_slice_config(path: Path = SLICES_PATH) -> dict:
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+
+    config.setdefault("min_support", 50)
+    config.setdefault("max_slices", 40)
+
+    for definition in config.get("slices", []):
+        if "feature" not in definition:
+            raise ValueError(f"Slice definition {definition} is missing 'feature'")
+
+        bins = definition.get("bins")
+        if bins is not None:
+            labels = definition.setdefault(
+                "labels", [f"{low}-{high}" for low, high in zip(bins[:-1], bins[1:])]
+            )
+            if len(labels) != len(bins) - 1:
+                raise ValueError(f"Slice on {definition['feature']}: need one label per bin")
+
+    return config
+
+
+def _slice_labels(df: pd.DataFrame, definition: dict) -> pd.Series:
+    values = df[definition["feature"]]
+
+    if "bins" in definition:
+        values = pd.cut(
+            pd.to_numeric(values, errors="coerce"),
+            definition["bins"],
+            labels=definition["labels"],
+            include_lowest=True,
+        )
+
+    return values.astype(str).where(values.notna())
+
+
+class SliceIndex:
+    """
+    Integer coding of slice membership, fixed from the reference data.
+    """
+    def __init__(self, definitions: list, reference: pd.DataFrame, min_support: int, max_slices: int):
+        self.definitions = definitions
+
+        candidates = []
+        vocabularies = []
+        for d, definition in enumerate(definitions):
+            counts = _slice_labels(reference, definition).value_counts()
+            vocabularies.append(list(counts.index))
+            candidates += [(support, d, label) for label, support in counts.items() if support >= min_support]
+
+        # Largest slices first when capping, then in configuration order
+        kept = sorted(candidates, key=lambda c: -c[0])[:max_slices]
+        kept = sorted(kept, key=lambda c: (c[1], vocabularies[c[1]].index(c[2])))
+
+        self.names = [f"{definitions[d]['feature']}={label}" for _, d, label in kept]
+        self.features = [definitions[d]["feature"] for _, d, _ in kept]
+        self.size = len(kept)
+
+        # Per definition: local category code -> global slice id (-1 = not monitored)
+        self.vocabularies = vocabularies
+        self.remaps = [np.full(len(vocabulary) + 1, -1) for vocabulary in vocabularies]
+        for slice_id, (_, d, label) in enumerate(kept):
+            self.remaps[d][vocabularies[d].index(label)] = slice_id
+
+    def codes(self, df: pd.DataFrame):
+        """
+        Long-form slice membership of a frame: (row positions, slice ids),
+        one entry per row and slicing feature the row is monitored under.
+        """
+        columns = []
+        for d, definition in enumerate(self.definitions):
+            local = pd.Categorical(
+                _slice_labels(df, definition), categories=self.vocabularies[d]
+            ).codes
+            # Unseen or missing labels (-1) hit the trailing -1 entry
+            columns.append(self.remaps[d][local])
+
+        ids = np.column_stack(columns).ravel()
+        rows = np.repeat(np.arange(len(df)), len(columns))
+
+        valid = ids >= 0
+        return rows[valid], ids[valid]
+
+
+def slice_histograms(ids: np.ndarray, codes: np.ndarray, n_slices: int, n_bins: int) -> np.ndarray:
+    """
+    Counts per slice x bin in one bincount.
+    """
+    valid = codes >= 0
+    keys = ids[valid] * n_bins + codes[valid]
+    return np.bincount(keys, minlength=n_slices * n_bins).reshape(n_slices, n_bins)
+
+
+def slice_performance(ids: np.ndarray, y_true: np.ndarray, y_pred: np.ndarray, y_score: np.ndarray, n_slices: int) -> pd.DataFrame:
+    """
+    Precision, recall and ROC-AUC of every slice from bincount sums.
+    `y_true` / `y_pred` are 0/1 arrays aligned with `ids`.
+    """
+    support = np.bincount(ids, minlength=n_slices)
+    positives = np.bincount(ids, weights=y_true, minlength=n_slices)
+    predicted = np.bincount(ids, weights=y_pred, minlength=n_slices)
+    true_positives = np.bincount(ids, weights=y_true * y_pred, minlength=n_slices)
+
+    # Mann-Whitney U from score ranks within each slice (ties averaged)
+    ranks = pd.Series(y_score).groupby(ids).rank().to_numpy()
+    positive_rank_sum = np.bincount(ids, weights=ranks * y_true, minlength=n_slices)
+    negatives = support - positives
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, true_positives / predicted, 0.0)
+        recall = np.where(positives > 0, true_positives / positives, np.nan)
+        roc_auc = np.where(
+            (positives > 0) & (negatives > 0),
+            (positive_rank_sum - positives * (positives + 1) / 2) / (positives * negatives),
+            np.nan,
+        )
+
+    return pd.DataFrame({
+        "support": support,
+        "positives": positives.astype(int),
+        "precision": precision,
+        "recall": recall,
+        "roc_auc": roc_auc,
+    })
+
+
+def slice_intervals(weights: np.ndarray, ids: np.ndarray, y_true: np.ndarray, y_pred: np.ndarray, n_slices: int) -> dict:
+    """
+    Bootstrap bounds of slice precision and recall. `weights` holds one
+    column per long-form entry, so a row keeps its weight in every slice.
+    """
+    membership = np.eye(n_slices)[ids]
+
+    samples = {
+        "recall": group_recall_samples(weights, y_true, y_pred, membership),
+        # Precision is recall with the roles of labels and predictions swapped
+        "precision": group_recall_samples(weights, y_pred, y_true, membership),
+    }
+
+    bounds = {}
+    for metric, values in samples.items():
+        bounds[f"{metric}_lower"], bounds[f"{metric}_upper"] = interval(values)
+    return bounds
+
+
+class SliceMonitor:
+    """
+    Slice definitions and reference data, loaded once and shared by
+    every batch of a run.
+    """
+    def __init__(self, config_path: Path = SLICES_PATH):
+        config = load_slice_config(config_path)
+        self.min_support = config["min_support"]
+
+        self.reference = read_batch(REFERENCE_PATH)
+        self.features = [
+            column for column in self.reference.columns if column not in (TARGET_COLUMN, ENTITY_ID_COLUMN)
+        ]
+        self.index = SliceIndex(config.get("slices", []), self.reference, self.min_support, config["max_slices"])
+        self.names = np.array(self.index.names)
+        self.slice_features = np.array(self.index.features)
+        self.ref_rows, self.ref_ids = self.index.codes(self.reference)
+
+    def evaluate(self, batch: str, df: pd.DataFrame, predictions: dict, stages: dict) -> tuple:
+        """
+        Slice performance of every model in `predictions` over the
+        labelled records and slice feature drift of one batch.
+        Returns (performance_df, drift_df).
+        """
+        index = self.index
+        timestamp = datetime.utcnow()
+        rows, ids = index.codes(df)
+        supported = np.bincount(ids, minlength=index.size) >= self.min_support
+
+        # Performance covers the records labelled so far
+        labels = batch_labels(df)
+        labelled = labels.notna().to_numpy()[rows]
+        scored_rows, scored_ids = rows[labelled], ids[labelled]
+        scored = np.bincount(scored_ids, minlength=index.size) >= self.min_support
+        y_true = (labels.to_numpy() == POSITIVE_LABEL).astype(float)[scored_rows]
+        weights = poisson_weights(len(df))[:, scored_rows]
+
+        performance_frames = []
+        for model_version, (y_pred, y_score) in predictions.items():
+            predicted = (y_pred == POSITIVE_LABEL).astype(float)[scored_rows]
+            performance = slice_performance(scored_ids, y_true, predicted, y_score[scored_rows], index.size)
+            performance = performance.assign(
+                **slice_intervals(weights, scored_ids, y_true, predicted, index.size)
+            )
+            performance.insert(0, "slice", self.names)
+            performance.insert(0, "batch", batch)
+            performance.insert(0, "timestamp", timestamp)
+            performance["model_version"] = model_version
+            performance["stage"] = stages.get(model_version)
+            performance_frames.append(performance[scored])
+
+        drift_frames = []
+        for feature in self.features:
+            binning = psi_binning(self.reference[feature], df[feature])
+            reference_counts = slice_histograms(
+                self.ref_ids, psi_bin_codes(self.reference[feature], binning)[self.ref_rows],
+                index.size, binning["n_bins"],
+            )
+            production_counts = slice_histograms(
+                ids, psi_bin_codes(df[feature], binning)[rows], index.size, binning["n_bins"]
+            )
+            psi = psi_from_counts(reference_counts, production_counts, binning["kind"])
+
+            # A slice's own feature is constant within it
+            keep = supported & (self.slice_features != feature)
+            drift_frames.append(pd.DataFrame({
+                "timestamp": timestamp,
+                "batch": batch,
+                "slice": self.names[keep],
+                "feature": feature,
+                "drift_score": psi[keep],
+            }))
+
+        performance_df = pd.concat(performance_frames, ignore_index=True) if performance_frames else pd.DataFrame()
+        drift_df = pd.concat(drift_frames, ignore_index=True) if drift_frames else pd.DataFrame()
+        if not drift_df.empty:
+            drift_df["drift_level"] = drift_levels(drift_df["drift_score"].to_numpy())
+
+        return performance_df, drift_df
+
+
+def champion_predictions(predictions: dict, stages: dict) -> dict:
+    """
+    The champion's entry of a batch's predictions (empty when the
+    champion was not scored).
+    """
+    return {version: scored for version, scored in predictions.items() if stages.get(version) == "champion"}
+
+
+def store_slice_frames(performance_frames: list, drift_frames: list) -> tuple:
+    """
+    Append slice rows to their stores. Returns (performance_df, drift_df).
+    """
+    performance_frames = [frame for frame in performance_frames if not frame.empty]
+    drift_frames = [frame for frame in drift_frames if not frame.empty]
+    performance_df = pd.concat(performance_frames, ignore_index=True) if performance_frames else pd.DataFrame()
+    drift_df = pd.concat(drift_frames, ignore_index=True) if drift_frames else pd.DataFrame()
+
+    if not drift_df.empty:
+        append_rows(SLICE_DRIFT_PATH, drift_df)
+    if not performance_df.empty:
+        append_rows(SLICE_PERFORMANCE_PATH, performance_df)
+
+    return performance_df, drift_df
+
+
+def monitor_slices(config_path: Path = SLICES_PATH, versions=None) -> tuple:
+    """
+    Compute slice-level performance (champion by default) and feature
+    drift for every production batch and append them to the stores.
+    Returns (performance_df, drift_df).
+    """
+    monitor = SliceMonitor(config_path)
+    models = monitored_models(versions or [model_registry.resolve()["version"]])
+    stages = {entry["version"]: entry["stage"] for entry, _ in models}
+
+    performance_frames = []
+    drift_frames = []
+    for batch, df, predictions in score_batches(models):
+        performance, drift = monitor.evaluate(batch, df, predictions, stages)
+        performance_frames.append(performance)
+        drift_frames.append(drift)
+
+    return store_slice_frames(performance_frames, drift_frames)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", type=Path, default=SLICES_PATH)
+    parser.add_argument(
+        "--models", nargs="+", default=None,
+        help="model versions to evaluate (default: champion)"
+    )
+    args = parser.parse_args()
+
+    performance_df, drift_df = monitor_slices(args.config, args.models)
+
+    print(f"Slice monitoring: {performance_df['slice'].nunique() if not performance_df.empty else 0} slices, "
+          f"{len(performance_df)} performance and {len(drift_df)} drift records stored.")
@@ -2,10 +2,12 @@ from pathlib import Path
 import pandas as pd
 from datetime import datetime
 
+from metrics_store import append_rows
+
 STORE_PATH = Path("monitoring/metrics_store/bias_metrics.csv")
 STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-def store_bias_metrics(batch, feature, group, group_size, recall):
+def store_bias_metrics(batch, feature, group, group_size, recall, model_version=None):
     record = {
         "timestamp": datetime.utcnow(),
         "batch": batch,
@@ -13,11 +15,9 @@ def store_bias_metrics(batch, feature, group, group_size, recall):
         "group": group,
         "group_size": group_size,
         "recall": recall,
+        "model_version": model_version,
     }
 
     df = pd.DataFrame([record])
 
-    if STORE_PATH.exists():
-        df.to_csv(STORE_PATH, mode="a", header=False, index=False)
-    else:
-        df.to_csv(STORE_PATH, index=False)
\ No newline at end of file
+    append_rows(STORE_PATH, df)
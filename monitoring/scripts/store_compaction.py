@@ -0,0 +1,81 @@
+"""
+Metrics Store Compaction
+
+Merges re-runs in every metric store: rows are sorted by timestamp and
+only the latest row per record key is kept (the row readers already
+pick, see rule_engine.prepare_source), so reads stay fast as re-runs
+and late-label recomputations accumulate.
+
+- Keys are the rule sources' record keys plus model_version, so
+  challenger rows are kept next to the champion's; rows written before
+  model_version was recorded are the baseline model's and are filled
+  with its version first
+- Compaction holds the store's writer lock and bumps its generation,
+  so incremental readers (alert_state.py, rollups.py) re-read it
+- Runs once, or in the background every --interval seconds
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from metrics_store import compact
+from model_registry import baseline_version
+from rule_engine import SOURCES
+from threshold_analysis import THRESHOLD_CURVES_PATH, THRESHOLD_METRICS_PATH
+
+# Stores without a rule source, with the columns identifying one record
+EXTRA_STORES = {
+    "threshold": {"path": THRESHOLD_METRICS_PATH, "keys": ["batch"]},
+    "threshold_curves": {"path": THRESHOLD_CURVES_PATH, "keys": ["batch", "threshold"]},
+}
+
+
+def compaction_targets() -> dict:
+    """
+    {store name: (path, dedup keys)} of every metric store.
+    """
+    return {
+        name: (Path(store["path"]), store["keys"] + ["model_version"])
+        for name, store in {**SOURCES, **EXTRA_STORES}.items()
+    }
+
+
+def compact_all() -> dict:
+    """
+    Compact every existing store. Returns {name: (rows_before, rows_after)}.
+    """
+    results = {}
+    fill = {"model_version": baseline_version()}
+
+    for name, (path, keys) in compaction_targets().items():
+        if path.exists():
+            results[name] = compact(path, keys, fill=fill)
+
+    return results
+
+
+def _report(results: dict):
+    for name, (before, after) in results.items():
+        if before != after:
+            print(f"Compacted {name}: {before} -> {after} rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--interval", type=float, default=None,
+        help="keep compacting every INTERVAL seconds (default: run once)"
+    )
+    args = parser.parse_args()
+
+    _report(compact_all())
+
+    while args.interval:
+        time.sleep(args.interval)
+        try:
+            _report(compact_all())
+        except Exception as exc:  # keep compacting on the next tick
+            print(f"Compaction failed: {exc}")
+
+    print("Metrics store compaction completed.")
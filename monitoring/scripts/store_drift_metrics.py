@@ -2,6 +2,8 @@ from pathlib import Path
 import pandas as pd
 from datetime import datetime
 
+from metrics_store import append_rows
+
 # Path where drift metrics will be stored
 STORE_PATH = Path("monitoring/metrics_store/drift_metrics.csv")
 
@@ -9,7 +11,7 @@ STORE_PATH = Path("monitoring/metrics_store/drift_metrics.csv")
 STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 
-def store_drift_metric(batch, feature, drift_score, drift_level):
+def store_drift_metric(batch, feature, drift_score, drift_level, drift_score_lower=None, drift_score_upper=None, p_value=None):
     """
     Store one drift metric record (PSI-based).
 
@@ -22,6 +24,10 @@ def store_drift_metric(batch, feature, drift_score, drift_level):
         PSI value for the feature
     drift_level : str
         Severity label: LOW / MEDIUM / HIGH
+    drift_score_lower, drift_score_upper : float, optional
+        Bootstrap confidence bounds of the PSI
+    p_value : float, optional
+        Permutation-test p-value of the PSI
     """
 
     record = {
@@ -30,12 +36,21 @@ def store_drift_metric(batch, feature, drift_score, drift_level):
         "feature": feature,
         "drift_score": drift_score,
         "drift_level": drift_level,
+        "drift_score_lower": drift_score_lower,
+        "drift_score_upper": drift_score_upper,
+        "p_value": p_value,
     }
 
     df = pd.DataFrame([record])
 
     # Append if file exists, otherwise create new file
-    if STORE_PATH.exists():
-        df.to_csv(STORE_PATH, mode="a", header=False, index=False)
-    else:
-        df.to_csv(STORE_PATH, index=False)
\ No newline at end of file
+    append_rows(STORE_PATH, df)
+
+
+def store_drift_metrics(df: pd.DataFrame):
+    """
+    Store many drift records (same columns as store_drift_metric)
+    in a single write.
+    """
+    if not df.empty:
+        append_rows(STORE_PATH, df)
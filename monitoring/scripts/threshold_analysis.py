@@ -0,0 +1,219 @@
+"""
+Threshold Analysis
+
+Precision, recall, F1 and alert volume at every decision threshold of a
+batch, so drift of the best operating point is visible next to the
+metrics at the model's fixed 0.5 threshold.
+
+- Scores are sorted once per batch and model; true and false positives
+  at every distinct score are cumulative sums over the sorted labels
+- Stored per batch and model: a summary (current operating point,
+  best-F1 threshold, recommended threshold, average precision) and
+  the curve sampled on a fixed threshold grid
+- The recommended threshold has the highest recall at TARGET_PRECISION
+  or above (the best-F1 threshold when none reaches it). It is fit on
+  the grid curves of up to HISTORY_BATCHES earlier batches and its
+  precision / recall are measured on the batch itself, so they are
+  out-of-sample; without earlier batches it is fit on the batch itself
+  (`recommended_fit` says which). The recommender suggests out-of-sample
+  thresholds before a retrain (RETHRESHOLD)
+"""
+
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from metrics_store import append_rows
+from retraining_recommender import MIN_PRECISION
+
+# Paths
+THRESHOLD_METRICS_PATH = Path("monitoring/metrics_store/threshold_metrics.csv")
+THRESHOLD_CURVES_PATH = Path("monitoring/metrics_store/threshold_curves.csv")
+
+# Configuration
+POSITIVE_LABEL = "Yes"
+DEFAULT_THRESHOLD = 0.5  # implicit threshold of model.predict
+TARGET_PRECISION = MIN_PRECISION
+CURVE_GRID = np.round(np.arange(0.05, 1.0, 0.05), 2)
+HISTORY_BATCHES = 5  # earlier batches the recommended threshold is fit on
+
+
+def threshold_curve(y_true: np.ndarray, y_score: np.ndarray) -> pd.DataFrame:
+    """
+    Metrics for every distinct score used as threshold (a record is an
+    alert when its score >= threshold), highest threshold first.
+    `y_true` is a 0/1 array.
+    """
+    order = np.argsort(-y_score, kind="stable")
+    scores = y_score[order]
+
+    # Last sorted position of every distinct score
+    ends = np.r_[np.flatnonzero(scores[1:] != scores[:-1]), len(scores) - 1]
+    true_positives = np.cumsum(y_true[order])[ends]
+    alerts = ends + 1
+    positives = y_true.sum()
+
+    recall = true_positives / positives if positives else np.full(len(ends), np.nan)
+
+    return pd.DataFrame({
+        "threshold": scores[ends],
+        "true_positives": true_positives,
+        "false_positives": alerts - true_positives,
+        "alerts": alerts,
+        "precision": true_positives / alerts,
+        "recall": recall,
+        "f1": 2 * true_positives / (alerts + positives),
+        "alert_rate": alerts / len(scores),
+    })
+
+
+def curve_at(curve: pd.DataFrame, thresholds) -> pd.DataFrame:
+    """
+    Curve metrics at arbitrary thresholds (no alerts above the top score).
+    """
+    thresholds = np.atleast_1d(np.asarray(thresholds, dtype=float))
+    # Number of curve thresholds >= t, found on the ascending reversal
+    ascending = curve["threshold"].to_numpy()[::-1]
+    above = len(ascending) - np.searchsorted(ascending, thresholds, side="left")
+
+    rows = curve.iloc[np.maximum(above - 1, 0)].reset_index(drop=True)
+    empty = above == 0
+    rows.loc[empty, ["true_positives", "false_positives", "alerts", "recall", "f1", "alert_rate"]] = 0
+    rows.loc[empty, "precision"] = np.nan
+    rows["threshold"] = thresholds
+    return rows
+
+
+def _recommend(curve: pd.DataFrame) -> pd.Series:
+    """
+    Row of the highest recall at TARGET_PRECISION or above (the highest
+    such threshold on ties), the best-F1 row when none reaches it.
+    """
+    eligible = curve[curve["precision"] >= TARGET_PRECISION]
+    if eligible.empty:
+        return curve.iloc[int(np.nanargmax(curve["f1"].to_numpy()))]
+    return eligible.iloc[int(np.argmax(eligible["recall"].to_numpy()))]
+
+
+def fit_threshold(history: pd.DataFrame) -> float:
+    """
+    Recommended grid threshold of earlier batches' grid curves, on their
+    mean precision, recall and F1. None without history.
+    """
+    if history.empty:
+        return None
+
+    pooled = (
+        history.groupby("threshold")[["precision", "recall", "f1"]].mean()
+               .sort_index(ascending=False)
+               .reset_index()
+    )
+    if pooled["f1"].isna().all():
+        return None
+    return float(_recommend(pooled)["threshold"])
+
+
+def curve_summary(curve: pd.DataFrame, fitted_threshold: float = None) -> dict:
+    """
+    Compact description of one curve. A `fitted_threshold` from earlier
+    batches is evaluated on this curve as the recommendation.
+    """
+    current = curve_at(curve, DEFAULT_THRESHOLD).iloc[0]
+    best = curve.iloc[int(np.nanargmax(curve["f1"].to_numpy()))]
+
+    if fitted_threshold is None:
+        recommended = _recommend(curve)
+    else:
+        recommended = curve_at(curve, fitted_threshold).iloc[0]
+
+    recall_steps = np.diff(np.r_[0.0, curve["recall"].to_numpy()])
+
+    return {
+        "precision_at_default": current["precision"],
+        "recall_at_default": current["recall"],
+        "f1_at_default": current["f1"],
+        "alert_rate_at_default": current["alert_rate"],
+        "best_f1": best["f1"],
+        "best_f1_threshold": best["threshold"],
+        "recommended_threshold": recommended["threshold"],
+        "recommended_precision": recommended["precision"],
+        "recommended_recall": recommended["recall"],
+        "recommended_alert_rate": recommended["alert_rate"],
+        "recommended_fit": "in_sample" if fitted_threshold is None else "earlier_batches",
+        "average_precision": float(np.sum(recall_steps * curve["precision"].to_numpy())),
+    }
+
+
+def _batch_order(batches: pd.Series) -> pd.Series:
+    # Numeric batch suffix (production_batch_2 before _10)
+    return pd.to_numeric(batches.astype(str).str.extract(r"(\d+)$")[0], errors="coerce")
+
+
+def load_curve_history() -> pd.DataFrame:
+    """
+    Latest stored grid curve row per (batch, model, threshold).
+    """
+    if not THRESHOLD_CURVES_PATH.exists():
+        return pd.DataFrame(columns=["batch", "model_version", "threshold", "precision", "recall", "f1"])
+
+    return pd.read_csv(THRESHOLD_CURVES_PATH, dtype={"batch": str, "model_version": str})
+
+
+def earlier_curves(history: pd.DataFrame, batch: str, model_version: str) -> pd.DataFrame:
+    """
+    Grid curves of a model on the HISTORY_BATCHES batches before `batch`
+    (latest rows per batch and threshold).
+    """
+    curves = history[history["model_version"] == model_version]
+    curves = curves.drop_duplicates(["batch", "threshold"], keep="last")
+
+    order = _batch_order(curves["batch"])
+    current = _batch_order(pd.Series([batch])).iloc[0]
+    curves = curves[order < current]
+
+    recent = curves.assign(_order=order).sort_values("_order")["batch"].unique()[-HISTORY_BATCHES:]
+    return curves[curves["batch"].isin(recent)]
+
+
+def threshold_records(batch: str, y_true: pd.Series, predictions: dict, stages: dict, history: pd.DataFrame = None) -> tuple:
+    """
+    Summary rows and grid curve rows of every model for a batch's
+    labelled records, recommending thresholds fit on the earlier
+    batches' grid curves in `history`. Returns (summaries, curves).
+    """
+    if history is None:
+        history = load_curve_history()
+    actual = (y_true == POSITIVE_LABEL).to_numpy(dtype=float)
+    timestamp = datetime.utcnow()
+    summaries = []
+    curves = []
+
+    for model_version, (_, y_score) in predictions.items():
+        curve = threshold_curve(actual, np.asarray(y_score, dtype=float))
+        identity = {
+            "timestamp": timestamp,
+            "batch": batch,
+            "model_version": model_version,
+            "stage": stages.get(model_version),
+        }
+
+        fitted = fit_threshold(earlier_curves(history, batch, model_version))
+        summaries.append({**identity, "labelled_size": len(actual), **curve_summary(curve, fitted)})
+
+        grid = curve_at(curve, CURVE_GRID)
+        curves.append(pd.DataFrame({
+            **identity,
+            "threshold": CURVE_GRID,
+            **{column: grid[column] for column in ["precision", "recall", "f1", "alert_rate"]},
+        }))
+
+    return summaries, curves
+
+
+def store_threshold_records(summaries: list, curves: list):
+    if summaries:
+        append_rows(THRESHOLD_METRICS_PATH, pd.DataFrame(summaries))
+    if curves:
+        append_rows(THRESHOLD_CURVES_PATH, pd.concat(curves, ignore_index=True))
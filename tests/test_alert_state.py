@@ -0,0 +1,66 @@
+"""
+Incremental alert evaluation of alert_state.py: first-run seeding,
+backfill and paging of newly appended rows. Run from the repository
+root: python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "monitoring" / "scripts"))
+
+from alert_state import FIRING, RESOLVED, evaluate_new_alerts, load_state  # noqa: E402
+from metrics_store import append_rows  # noqa: E402
+from rule_engine import SOURCES  # noqa: E402
+
+RULES = [{
+    "name": "low_recall", "source": "performance", "type": "threshold", "metric": "recall",
+    "op": "<", "value": 0.6, "category": "performance", "severity": "high",
+    "message": "Recall below 0.6", "cooldown_minutes": 0,
+}]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    path = tmp_path / "performance_metrics.csv"
+    monkeypatch.setitem(SOURCES, "performance", {"path": path, "keys": ["batch"]})
+    return path
+
+
+def _append(path: Path, batch: str, recall: float, timestamp: str):
+    append_rows(path, pd.DataFrame([{"timestamp": timestamp, "batch": batch, "recall": recall}]))
+
+
+def _run(tmp_path: Path, **kwargs) -> list:
+    return evaluate_new_alerts(
+        RULES, state_path=tmp_path / "state.json", event_log_path=tmp_path / "events.jsonl", **kwargs
+    )
+
+
+def test_first_run_seeds_watermarks_without_paging_history(tmp_path, store):
+    _append(store, "b0", 0.4, "2024-01-01 00:00:00")
+    _append(store, "b1", 0.5, "2024-01-02 00:00:00")
+
+    assert _run(tmp_path) == []
+    assert load_state(tmp_path / "state.json")["watermarks"]["performance"]["offset"] == store.stat().st_size
+    assert not (tmp_path / "events.jsonl").exists()
+
+    # Rows appended after seeding are paged
+    _append(store, "b2", 0.3, "2024-01-03 00:00:00")
+    events = _run(tmp_path)
+    assert [(event["event"], event["batch"]) for event in events] == [(FIRING, "b2")]
+
+    _append(store, "b3", 0.9, "2024-01-04 00:00:00")
+    assert [event["event"] for event in _run(tmp_path)] == [RESOLVED]
+
+
+def test_backfill_pages_the_history_once(tmp_path, store):
+    _append(store, "b0", 0.4, "2024-01-01 00:00:00")
+    _append(store, "b1", 0.5, "2024-01-02 00:00:00")
+
+    events = _run(tmp_path, backfill=True)
+    assert [(event["event"], event["batch"]) for event in events] == [(FIRING, "b0")]
+    assert _run(tmp_path, backfill=True) == []
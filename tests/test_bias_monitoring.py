@@ -0,0 +1,63 @@
+"""
+Group recalls of bias_monitoring.py on batches with missing sensitive
+attributes. Run from the repository root: python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "monitoring" / "scripts"))
+
+from bias_monitoring import MIN_GROUP_SIZE, POSITIVE_LABEL, group_recalls  # noqa: E402
+from bootstrap import poisson_weights  # noqa: E402
+
+
+def _batch(n: int = 600, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "gender": rng.choice(["Female", "Male"], n),
+        "SeniorCitizen": rng.choice([0.0, 1.0], n, p=[0.7, 0.3]),
+        "Partner": rng.choice(["No", "Yes"], n),
+        "Churn": rng.choice(["No", "Yes"], n, p=[0.6, 0.4]),
+    })
+    df.loc[rng.choice(n, 40, replace=False), "SeniorCitizen"] = np.nan
+    y_pred = rng.choice(["No", "Yes"], n)
+    return df, y_pred
+
+
+def _expected(df: pd.DataFrame, y_pred: np.ndarray, features: list) -> dict:
+    """
+    Recall per supported group, by groupby (which drops missing keys).
+    """
+    frame = df.assign(
+        actual=(df["Churn"] == POSITIVE_LABEL).astype(float),
+        hit=((df["Churn"] == POSITIVE_LABEL) & (y_pred == POSITIVE_LABEL)).astype(float),
+    )
+    grouped = frame.groupby(features).agg(size=("hit", "size"), positives=("actual", "sum"), hits=("hit", "sum"))
+    grouped = grouped[grouped["size"] >= MIN_GROUP_SIZE]
+
+    expected = {}
+    for key, row in grouped.iterrows():
+        key = key if isinstance(key, tuple) else (key,)
+        expected["&".join(str(value) for value in key)] = row["hits"] / row["positives"]
+    return expected
+
+
+def test_missing_sensitive_value_is_left_out_of_its_groups():
+    df, y_pred = _batch()
+    records = pd.DataFrame(group_recalls(df, y_pred, poisson_weights(len(df))))
+
+    for features in [["SeniorCitizen"], ["gender"], ["gender", "SeniorCitizen"], ["SeniorCitizen", "Partner"]]:
+        rows = records[records["feature"] == "&".join(features)]
+        recalls = dict(zip(rows["group"], rows["recall"]))
+
+        assert recalls.keys() == _expected(df, y_pred, features).keys()
+        for group, recall in _expected(df, y_pred, features).items():
+            assert np.isclose(recalls[group], recall)
+
+    # Records missing SeniorCitizen still count for the other features
+    assert records.loc[records["feature"] == "gender", "group_size"].sum() == len(df)
+    assert not records["group"].str.contains("nan").any()
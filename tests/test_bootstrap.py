@@ -0,0 +1,52 @@
+"""
+Bootstrap helpers of bootstrap.py. Run from the repository root:
+python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "monitoring" / "scripts"))
+
+import bootstrap  # noqa: E402
+from bootstrap import basic_interval, interval, poisson_weights  # noqa: E402
+
+
+def test_basic_interval_reflects_the_percentiles_around_the_estimate():
+    samples = np.random.default_rng(0).normal(1.25, 0.1, size=(1000, 1))
+    lower, upper = interval(samples)
+
+    basic_lower, basic_upper = basic_interval(samples, np.array([1.2]))
+
+    assert np.allclose(basic_lower, 2.4 - upper)
+    assert np.allclose(basic_upper, 2.4 - lower)
+
+
+def test_basic_interval_always_contains_the_estimate():
+    # Replicates of an upward-biased statistic all above the point value
+    samples = np.random.default_rng(0).uniform(0.0007, 0.003, size=(1000, 3))
+    estimate = np.array([0.00019, 0.001, 0.0025])
+
+    lower, upper = basic_interval(samples, estimate, floor=0.0)
+
+    assert np.all(lower <= estimate) and np.all(estimate <= upper)
+    assert np.all(lower >= 0.0)
+
+
+def test_basic_interval_keeps_undefined_statistics_missing():
+    samples = np.full((100, 1), np.nan)
+    lower, upper = basic_interval(samples, np.array([np.nan]), floor=0.0)
+
+    assert np.isnan(lower).all() and np.isnan(upper).all()
+
+
+def test_blockwise_poisson_weights_match_one_full_draw(monkeypatch):
+    expected = np.random.default_rng(7).poisson(1.0, size=(50, 300))
+
+    monkeypatch.setattr(bootstrap, "BOOTSTRAP_BLOCK_CELLS", 1000)
+    weights = poisson_weights(300, replicates=50, seed=7)
+
+    assert weights.dtype == np.uint8
+    assert np.array_equal(weights, expected)
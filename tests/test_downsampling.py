@@ -0,0 +1,57 @@
+"""
+LTTB downsampling and min/max envelopes of dashboard/scripts/downsampling.py.
+Run from the repository root: python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "dashboard" / "scripts"))
+
+from downsampling import downsample_frame, lttb_indices, minmax_envelope  # noqa: E402
+
+
+def test_lttb_keeps_the_endpoints_and_an_isolated_spike():
+    y = np.zeros(1000)
+    y[417] = 5.0
+
+    indices = lttb_indices(y, 50)
+
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert 417 in indices
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_returns_every_index_without_reduction():
+    assert np.array_equal(lttb_indices(np.arange(10.0), 20), np.arange(10))
+
+
+def test_downsampled_frame_never_exceeds_the_requested_points():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({column: rng.normal(size=3000) for column in "abcdef"})
+    df.loc[rng.choice(3000, 200, replace=False), "c"] = np.nan
+
+    for points in [3, 10, 50, 200]:
+        sampled = downsample_frame(df, list(df.columns), points)
+        assert len(sampled) <= points
+        assert sampled["position"].is_monotonic_increasing
+
+
+def test_short_frames_are_kept_whole():
+    df = pd.DataFrame({"a": np.arange(5.0)})
+    assert downsample_frame(df, ["a"], 10)["position"].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_envelope_keeps_the_range_of_every_bucket():
+    y = np.sin(np.linspace(0, 20, 1000))
+    y[123] = -3.0
+
+    positions, low, high = minmax_envelope(y, 40)
+
+    assert len(positions) == len(low) == len(high) == 40
+    assert low.min() == -3.0
+    assert high.max() == y.max()
@@ -0,0 +1,68 @@
+"""
+PSI binning and permutation-test p-values of drift_significance.py.
+Run from the repository root: python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "monitoring" / "scripts"))
+
+from drift_significance import (  # noqa: E402
+    ALPHA,
+    MAX_PERMUTATIONS,
+    drift_p_values,
+    permutation_p_value,
+    psi_bin_codes,
+    psi_binning,
+    psi_codes,
+)
+
+
+def _samples(shift: float, n: int = 400, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    return pd.Series(rng.normal(0, 1, n)), pd.Series(rng.normal(shift, 1, n))
+
+
+def test_bin_codes_match_np_histogram():
+    ref, prod = _samples(0.3)
+    binning = psi_binning(ref, prod)
+
+    codes = psi_bin_codes(pd.concat([ref, prod]), binning)
+    expected, _ = np.histogram(pd.concat([ref, prod]), bins=binning["edges"])
+
+    assert np.array_equal(np.bincount(codes, minlength=binning["n_bins"]), expected)
+
+
+def test_categorical_codes_cover_both_samples_and_mark_missing_values():
+    ref = pd.Series(["a", "b", None], dtype=object)
+    prod = pd.Series(["b", "c"], dtype=object)
+    binning = psi_binning(ref, prod)
+
+    assert binning["categories"] == ["a", "b", "c"]
+    assert psi_bin_codes(ref, binning).tolist() == [0, 1, -1]
+
+
+def test_shifted_sample_is_significant_and_stops_early():
+    p_value, permutations = permutation_p_value(psi_codes(*_samples(0.5)))
+
+    assert p_value < ALPHA
+    assert permutations < MAX_PERMUTATIONS
+
+
+def test_identical_distributions_are_not_significant():
+    p_value, _ = permutation_p_value(psi_codes(*_samples(0.0)))
+    assert p_value > ALPHA
+
+
+def test_empty_sample_has_no_evidence_of_drift():
+    ref, _ = _samples(0.0)
+    assert permutation_p_value(psi_codes(ref, pd.Series([], dtype=float))) == (1.0, 0)
+
+
+def test_p_values_do_not_depend_on_scheduling():
+    tests = [(f"batch_{i}", "tenure", psi_codes(*_samples(0.1 * i, seed=i))) for i in range(4)]
+    assert drift_p_values(tests, max_workers=1) == drift_p_values(tests, max_workers=2)
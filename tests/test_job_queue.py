@@ -0,0 +1,173 @@
+"""
+Lease, retry and collection behaviour of job_queue.py, including
+several worker processes sharing one queue. Run from the repository
+root: python -m pytest tests
+"""
+
+import sys
+import time
+from multiprocessing import get_context
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "monitoring" / "scripts"))
+
+import job_queue  # noqa: E402
+from job_queue import DONE, FAILED, LEASED, MAX_ATTEMPTS, PENDING  # noqa: E402
+
+
+def _status(path: Path, task: str) -> tuple:
+    connection = job_queue.connect(path)
+    try:
+        return connection.execute("SELECT status, attempts FROM tasks WHERE task_id = ?", (task,)).fetchone()
+    finally:
+        connection.close()
+
+
+def _collect(path: Path) -> list:
+    with job_queue.uncollected_results(path) as results:
+        return [task for task, _ in results]
+
+
+def test_enqueue_is_idempotent_unless_forced(tmp_path):
+    path = tmp_path / "queue.db"
+    assert job_queue.enqueue([("drift", "b0"), ("drift", "b1")], path=path) == 2
+    assert job_queue.enqueue([("drift", "b0")], path=path) == 0
+
+    task, _, _, token = job_queue.lease("w", path=path)
+    job_queue.complete(task, token, {}, path=path)
+    assert job_queue.enqueue([("drift", "b0")], force=True, path=path) == 1
+    assert _status(path, "drift/b0") == (PENDING, 0)
+
+
+def test_expired_lease_is_taken_over_and_the_old_result_dropped(tmp_path):
+    path = tmp_path / "queue.db"
+    job_queue.enqueue([("drift", "b0")], path=path)
+
+    _, _, _, first = job_queue.lease("slow", lease_seconds=0.01, path=path)
+    time.sleep(0.05)
+    task, _, _, second = job_queue.lease("other", path=path)
+
+    assert task == "drift/b0"
+    assert _status(path, task) == (LEASED, 2)
+    assert not job_queue.complete(task, first, {"from": "slow"}, path=path)
+    assert job_queue.complete(task, second, {"from": "other"}, path=path)
+
+    with job_queue.uncollected_results(path) as results:
+        assert results == [(task, {"from": "other"})]
+
+
+def test_renewed_lease_is_not_handed_out_again(tmp_path):
+    path = tmp_path / "queue.db"
+    job_queue.enqueue([("drift", "b0")], path=path)
+
+    task, _, _, token = job_queue.lease("slow", lease_seconds=0.3, path=path)
+    with job_queue.heartbeat(task, token, lease_seconds=0.3, path=path):
+        time.sleep(1.0)
+        assert job_queue.lease("other", path=path) is None
+
+    assert job_queue.complete(task, token, {}, path=path)
+    assert _status(path, task) == (DONE, 1)
+
+
+def test_renew_fails_once_the_lease_was_taken_over(tmp_path):
+    path = tmp_path / "queue.db"
+    job_queue.enqueue([("drift", "b0")], path=path)
+
+    task, _, _, token = job_queue.lease("slow", lease_seconds=0.01, path=path)
+    time.sleep(0.05)
+    job_queue.lease("other", path=path)
+
+    assert not job_queue.renew(task, token, path=path)
+
+
+def test_failed_task_is_retried_until_attempts_run_out(tmp_path):
+    path = tmp_path / "queue.db"
+    job_queue.enqueue([("drift", "b0")], path=path)
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        task, _, _, token = job_queue.lease("w", path=path)
+        job_queue.fail(task, token, "boom", path=path)
+        assert _status(path, task) == (PENDING if attempt < MAX_ATTEMPTS else FAILED, attempt)
+
+    assert job_queue.lease("w", path=path) is None
+    assert job_queue.failed_tasks(path) == [("drift/b0", MAX_ATTEMPTS, "boom")]
+
+
+def test_expired_last_attempt_is_marked_failed(tmp_path):
+    path = tmp_path / "queue.db"
+    job_queue.enqueue([("drift", "b0")], path=path)
+
+    for _ in range(MAX_ATTEMPTS):
+        job_queue.lease("dies", lease_seconds=0.01, path=path)
+        time.sleep(0.05)
+
+    assert job_queue.lease("w", path=path) is None
+    assert _status(path, "drift/b0") == (FAILED, MAX_ATTEMPTS)
+
+
+def test_results_are_collected_once(tmp_path):
+    path = tmp_path / "queue.db"
+    job_queue.enqueue([("drift", "b0"), ("drift", "b1")], path=path)
+    for _ in range(2):
+        task, _, _, token = job_queue.lease("w", path=path)
+        job_queue.complete(task, token, {"task": task}, path=path)
+
+    assert _collect(path) == ["drift/b0", "drift/b1"]
+    assert _collect(path) == []
+
+
+def test_failed_collection_leaves_results_uncollected(tmp_path):
+    path = tmp_path / "queue.db"
+    job_queue.enqueue([("drift", "b0")], path=path)
+    task, _, _, token = job_queue.lease("w", path=path)
+    job_queue.complete(task, token, {}, path=path)
+
+    try:
+        with job_queue.uncollected_results(path):
+            raise RuntimeError("append failed")
+    except RuntimeError:
+        pass
+
+    assert _collect(path) == [task]
+
+
+def test_workers_lease_and_commit_while_results_are_collected(tmp_path):
+    path = tmp_path / "queue.db"
+    job_queue.enqueue([("drift", "b0"), ("drift", "b1")], path=path)
+    task, _, _, token = job_queue.lease("w", path=path)
+    job_queue.complete(task, token, {}, path=path)
+
+    with job_queue.uncollected_results(path) as results:
+        started = time.monotonic()
+        other, _, _, other_token = job_queue.lease("w", path=path)
+        assert job_queue.complete(other, other_token, {}, path=path)
+        assert time.monotonic() - started < 1
+        assert [task for task, _ in results] == ["drift/b0"]
+
+    assert _collect(path) == ["drift/b1"]
+
+
+def _work(path: Path, worker_id: str):
+    while True:
+        task = job_queue.lease(worker_id, path=path)
+        if task is None:
+            return
+        task_id, _, _, token = task
+        job_queue.complete(task_id, token, {"worker": worker_id}, path=path)
+
+
+def test_worker_processes_run_every_task_once(tmp_path):
+    path = tmp_path / "queue.db"
+    tasks = [("drift", f"b{i}") for i in range(40)]
+    job_queue.enqueue(tasks, path=path)
+
+    context = get_context("spawn")
+    processes = [context.Process(target=_work, args=(path, f"w{i}")) for i in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert all(process.exitcode == 0 for process in processes)
+    assert job_queue.status_counts(path) == {("drift", DONE): len(tasks)}
+    assert sorted(_collect(path)) == sorted(job_queue.task_id(*task) for task in tasks)
@@ -0,0 +1,147 @@
+"""
+Locking, torn-tail recovery and compaction of the append-only metric
+stores (metrics_store.py, store_compaction.py). Run from the repository
+root: python -m pytest tests
+"""
+
+import sys
+import time
+from multiprocessing import get_context
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "monitoring" / "scripts"))
+
+import store_compaction  # noqa: E402
+from metrics_store import append_rows, compact, read_since, store_generation, store_lock  # noqa: E402
+
+
+def _rows(batch: str, value: float, timestamp: str, **extra) -> pd.DataFrame:
+    return pd.DataFrame([{"timestamp": timestamp, "batch": batch, "value": value, **extra}])
+
+
+def _append_many(path: Path, worker: int, rows: int):
+    for i in range(rows):
+        append_rows(path, _rows(f"w{worker}_{i}", float(i), "2024-01-01 00:00:00"))
+
+
+def _hold_lock(path: Path, seconds: float):
+    with store_lock(path):
+        time.sleep(seconds)
+
+
+def test_parallel_appends_never_interleave(tmp_path):
+    path = tmp_path / "metrics.csv"
+
+    context = get_context("spawn")
+    processes = [context.Process(target=_append_many, args=(path, worker, 25)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    df = pd.read_csv(path)
+    assert all(process.exitcode == 0 for process in processes)
+    assert len(df) == 100
+    assert list(df.columns) == ["timestamp", "batch", "value"]
+    assert df["batch"].is_unique
+
+
+def test_writers_wait_for_the_store_lock(tmp_path):
+    path = tmp_path / "metrics.csv"
+    append_rows(path, _rows("b0", 1.0, "2024-01-01 00:00:00"))
+
+    holder = get_context("spawn").Process(target=_hold_lock, args=(path, 1.0))
+    holder.start()
+    time.sleep(0.5)
+
+    started = time.monotonic()
+    append_rows(path, _rows("b1", 2.0, "2024-01-01 00:00:01"))
+    holder.join()
+
+    assert time.monotonic() - started > 0.2
+    assert pd.read_csv(path)["batch"].tolist() == ["b0", "b1"]
+
+
+def test_torn_tail_is_cut_before_the_next_append(tmp_path):
+    path = tmp_path / "metrics.csv"
+    append_rows(path, _rows("b0", 1.0, "2024-01-01 00:00:00"))
+    with open(path, "ab") as f:
+        f.write(b"2024-01-01 00:00:01,b1,0.")
+
+    # Readers never consume the incomplete line
+    rows, offset = read_since(path)
+    assert rows["batch"].tolist() == ["b0"]
+
+    append_rows(path, _rows("b2", 2.0, "2024-01-01 00:00:02"))
+
+    rows, _ = read_since(path, offset)
+    assert rows["batch"].tolist() == ["b2"]
+    assert pd.read_csv(path)["batch"].tolist() == ["b0", "b2"]
+
+
+def test_new_column_rewrites_the_store_and_bumps_its_generation(tmp_path):
+    path = tmp_path / "metrics.csv"
+    append_rows(path, _rows("b0", 1.0, "2024-01-01 00:00:00"))
+    assert store_generation(path) == 0
+
+    append_rows(path, _rows("b1", 2.0, "2024-01-01 00:00:01", model_version="v1.0"))
+
+    df = pd.read_csv(path)
+    assert store_generation(path) == 1
+    assert list(df.columns) == ["timestamp", "batch", "value", "model_version"]
+    assert df["model_version"].isna().tolist() == [True, False]
+
+
+def test_counts_stay_integers_when_older_rows_lack_them(tmp_path):
+    path = tmp_path / "metrics.csv"
+    append_rows(path, _rows("b0", 1.0, "2024-01-01 00:00:00", batch_size=500))
+    append_rows(path, _rows("b1", 2.0, "2024-01-01 00:00:01", batch_size=500, labelled_size=250))
+    append_rows(path, _rows("b2", 3.0, "2024-01-01 00:00:02", batch_size=500, labelled_size=400))
+
+    lines = path.read_text().splitlines()
+    assert lines[0].endswith("batch_size,labelled_size")
+    assert [line.rsplit(",", 2)[1:] for line in lines[1:]] == [["500", ""], ["500", "250"], ["500", "400"]]
+
+    compact(path, ["batch"])
+    assert path.read_text().splitlines()[1:] == lines[1:]
+
+
+def test_compaction_keeps_the_latest_row_per_key(tmp_path):
+    path = tmp_path / "metrics.csv"
+    append_rows(path, pd.concat([
+        _rows("b0", 1.0, "2024-01-01 00:00:02", model_version="v1.0"),
+        _rows("b0", 0.5, "2024-01-01 00:00:01", model_version="v1.0"),
+        _rows("b0", 0.7, "2024-01-01 00:00:00", model_version="v1.1"),
+        _rows("b1", 2.0, "2024-01-01 00:00:03", model_version="v1.0"),
+    ]))
+
+    assert compact(path, ["batch", "model_version"]) == (4, 3)
+    df = pd.read_csv(path)
+    assert df[["batch", "model_version", "value"]].values.tolist() == [
+        ["b0", "v1.1", 0.7], ["b0", "v1.0", 1.0], ["b1", "v1.0", 2.0],
+    ]
+    assert store_generation(path) == 1
+
+    # Nothing left to merge: the file is not rewritten
+    assert compact(path, ["batch", "model_version"]) == (3, 3)
+    assert store_generation(path) == 1
+
+
+def test_compaction_merges_legacy_rows_into_the_baseline_version(tmp_path, monkeypatch):
+    path = tmp_path / "metrics.csv"
+    append_rows(path, _rows("b0", 1.0, "2024-01-01 00:00:00"))
+    append_rows(path, _rows("b0", 2.0, "2024-01-01 00:00:01", model_version="v1.0"))
+    append_rows(path, _rows("b0", 3.0, "2024-01-01 00:00:02", model_version="v2.0"))
+
+    monkeypatch.setattr(store_compaction, "compaction_targets", lambda: {"metrics": (path, ["batch", "model_version"])})
+    monkeypatch.setattr(store_compaction, "baseline_version", lambda: "v1.0")
+
+    assert store_compaction.compact_all() == {"metrics": (3, 2)}
+    df = pd.read_csv(path)
+    assert df[["model_version", "value"]].values.tolist() == [["v1.0", 2.0], ["v2.0", 3.0]]
+
+
+def test_every_store_is_compacted_per_model_version():
+    assert all(keys[-1] == "model_version" for _, keys in store_compaction.compaction_targets().values())
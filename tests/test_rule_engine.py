@@ -0,0 +1,122 @@
+"""
+Rule validation and vectorized evaluation of rule_engine.py. Run from
+the repository root: python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "monitoring" / "scripts"))
+
+from rule_engine import evaluate_rules, load_rules, prepare_source  # noqa: E402
+
+
+def _write_rules(tmp_path: Path, text: str) -> Path:
+    path = tmp_path / "rules.yaml"
+    path.write_text(text)
+    return path
+
+
+def _performance() -> pd.DataFrame:
+    # batch_1 was re-run: its later row replaces the first one
+    return prepare_source(pd.DataFrame({
+        "timestamp": ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"],
+        "batch": ["batch_0", "batch_1", "batch_1", "batch_2"],
+        "recall": [0.8, 0.4, 0.7, 0.5],
+        "recall_upper": [0.9, 0.5, 0.8, np.nan],
+    }), ["batch"])
+
+
+def test_rules_inherit_defaults_and_are_validated(tmp_path):
+    rules = load_rules(_write_rules(tmp_path, """
+defaults:
+  cooldown_minutes: 60
+rules:
+  - {name: low_recall, source: performance, type: threshold, metric: recall, op: "<", value: 0.6}
+"""))
+    assert rules[0]["cooldown_minutes"] == 60
+    assert rules[0]["category"] == "performance"
+
+    with pytest.raises(ValueError, match="unknown source"):
+        load_rules(_write_rules(tmp_path, """
+rules:
+  - {name: r, source: nowhere, type: threshold, metric: recall, op: "<", value: 0.6}
+"""))
+    with pytest.raises(ValueError, match="bound is not supported"):
+        load_rules(_write_rules(tmp_path, """
+rules:
+  - {name: r, source: drift, type: count, where: {drift_level: HIGH}, op: ">", value: 0, bound: upper}
+"""))
+
+
+def test_prepare_source_keeps_the_latest_record_per_key():
+    frame = _performance()
+    assert frame["batch"].tolist() == ["batch_0", "batch_1", "batch_2"]
+    assert frame["recall"].tolist() == [0.8, 0.7, 0.5]
+
+
+def test_threshold_rule_compares_the_bound_and_falls_back_to_the_point_value():
+    rule = {
+        "name": "low_recall", "source": "performance", "type": "threshold", "metric": "recall",
+        "op": "<", "value": 0.6, "bound": "upper", "category": "performance", "severity": "high",
+        "message": "Recall below 0.6",
+    }
+    result = evaluate_rules([rule], {"performance": _performance()}, fired_only=False)
+
+    assert result["value"].tolist() == [0.9, 0.8, 0.5]
+    assert result["fired"].tolist() == [False, False, True]
+
+
+def test_count_gap_and_rate_of_change_rules():
+    drift = prepare_source(pd.DataFrame({
+        "timestamp": ["2024-01-01"] * 3 + ["2024-01-02"] * 3,
+        "batch": ["b0"] * 3 + ["b1"] * 3,
+        "feature": ["a", "b", "c"] * 2,
+        "drift_level": ["HIGH", "LOW", "HIGH", "LOW", "LOW", "LOW"],
+        "drift_score": [0.3, 0.01, 0.4, 0.25, 0.01, 0.05],
+    }), ["batch", "feature"])
+    bias = prepare_source(pd.DataFrame({
+        "timestamp": ["2024-01-01"] * 4,
+        "batch": ["b0"] * 4,
+        "feature": ["gender", "gender", "Partner", "Partner"],
+        "group": ["Female", "Male", "No", "Yes"],
+        "recall": [0.8, 0.5, 0.7, 0.65],
+    }), ["batch", "feature", "group"])
+
+    defaults = {"category": "c", "severity": "medium", "message": "m"}
+    rules = [
+        {**defaults, "name": "high_drift", "source": "drift", "type": "count",
+         "where": {"drift_level": "HIGH"}, "detail": "feature", "op": ">=", "value": 2},
+        {**defaults, "name": "recall_gap", "source": "bias", "type": "gap", "metric": "recall",
+         "group_by": "feature", "op": ">", "value": 0.1},
+        {**defaults, "name": "psi_jump", "source": "drift", "type": "rate_of_change",
+         "metric": "drift_score", "op": "<", "value": -0.2},
+    ]
+    fired = evaluate_rules(rules, {"drift": drift, "bias": bias})
+
+    assert fired[["rule", "batch", "key"]].values.tolist() == [
+        ["high_drift", "b0", ""], ["recall_gap", "b0", "gender"], ["psi_jump", "b1", "c"],
+    ]
+    assert fired.loc[fired["rule"] == "high_drift", "detail"].item() == "a, c"
+    assert fired.loc[fired["rule"] == "recall_gap", "value"].item() == pytest.approx(0.3)
+
+
+def test_where_comparisons_can_pass_missing_values():
+    frame = prepare_source(pd.DataFrame({
+        "timestamp": ["2024-01-01"] * 3,
+        "batch": ["b0"] * 3,
+        "feature": ["a", "b", "c"],
+        "drift_level": ["HIGH"] * 3,
+        "p_value": [0.01, 0.5, np.nan],
+    }), ["batch", "feature"])
+    rule = {
+        "name": "significant_drift", "source": "drift", "type": "count", "category": "drift",
+        "severity": "high", "message": "m", "op": ">", "value": 0,
+        "where": {"drift_level": "HIGH", "p_value": {"<": 0.05, "missing": "pass"}},
+    }
+
+    assert evaluate_rules([rule], {"drift": frame}, fired_only=False)["value"].item() == 2
@@ -0,0 +1,64 @@
+"""
+Threshold curves and out-of-sample threshold recommendations of
+threshold_analysis.py. Run from the repository root: python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "monitoring" / "scripts"))
+
+from threshold_analysis import CURVE_GRID, TARGET_PRECISION, earlier_curves, threshold_records  # noqa: E402
+
+
+def _batch(seed: int, n: int = 400) -> tuple:
+    rng = np.random.default_rng(seed)
+    churn = rng.random(n) < 0.3
+    scores = np.clip(rng.normal(np.where(churn, 0.65, 0.4), 0.15), 0, 1)
+    return pd.Series(np.where(churn, "Yes", "No")), {"v1.0": (scores >= 0.5, scores)}
+
+
+NO_HISTORY = pd.DataFrame(columns=["batch", "model_version", "threshold", "precision", "recall", "f1"])
+
+
+def _curves(batches) -> pd.DataFrame:
+    curves = []
+    for seed, batch in enumerate(batches):
+        y_true, predictions = _batch(seed)
+        curves += threshold_records(batch, y_true, predictions, {}, history=NO_HISTORY)[1]
+    return pd.concat(curves, ignore_index=True)
+
+
+def test_first_batch_is_recommended_in_sample():
+    y_true, predictions = _batch(0)
+    summaries, curves = threshold_records("production_batch_0", y_true, predictions, {}, history=NO_HISTORY)
+
+    assert summaries[0]["recommended_fit"] == "in_sample"
+    assert summaries[0]["recommended_precision"] >= TARGET_PRECISION
+    assert curves[0]["threshold"].tolist() == CURVE_GRID.tolist()
+
+
+def test_later_batches_use_a_grid_threshold_fit_on_earlier_batches():
+    history = _curves(["production_batch_0", "production_batch_1", "production_batch_10"])
+    y_true, predictions = _batch(5)
+
+    summary = threshold_records("production_batch_2", y_true, predictions, {}, history=history)[0][0]
+
+    assert summary["recommended_fit"] == "earlier_batches"
+    assert summary["recommended_threshold"] in CURVE_GRID
+    # Precision and recall are measured on this batch at that threshold
+    scores = predictions["v1.0"][1]
+    alerts = scores >= summary["recommended_threshold"]
+    assert summary["recommended_precision"] == (y_true[alerts] == "Yes").mean()
+
+
+def test_earlier_curves_follow_the_numeric_batch_order():
+    history = _curves(["production_batch_2", "production_batch_10", "production_batch_9"])
+
+    earlier = earlier_curves(history, "production_batch_10", "v1.0")
+
+    assert sorted(earlier["batch"].unique()) == ["production_batch_2", "production_batch_9"]
+    assert earlier_curves(history, "production_batch_10", "v2.0").empty